@@ -1,19 +1,216 @@
-from final import analyze_text, analyze_text_sentencewise
-from flask import Flask, request, jsonify
+import os
+import logging
+import threading
+import startup  # first, so start-up timing covers the imports below
+import cache
+import cascade
+import core
+import incremental
+import jobs
+import scheduler
+import sources
+from final import cached_analysis, preload_specs
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 app = Flask(__name__)
 
+# Share forward passes between concurrent requests (see scheduler.py)
+scheduler.configure(enabled=os.environ.get("ETHOS_MICROBATCH", "1").lower() in ("1", "on", "true"))
+
 CORS(app)
 
+def start_warm_up() -> None:
+    """Preload and warm every model in the background (ETHOS_WARM_UP=0 disables it; see startup.py)."""
+    startup.start_background(preload_specs())
+
+def create_app():
+    """
+    WSGI entry point (gunicorn "analyze:create_app()"): the app, with its models warming up
+    in the background. Importing this module loads nothing.
+    """
+    start_warm_up()
+    return app
+
+@app.route("/api/health", methods=["GET"])
+def health():
+    """Liveness: the process is up (models may still be loading)."""
+    return jsonify({"status": "ok"})
+
+@app.route("/api/ready", methods=["GET"])
+def ready():
+    """Readiness: 200 once every model is loaded and warm, 503 before that (or if preloading failed)."""
+    state = startup.STARTUP.to_dict()
+    return jsonify(state), 200 if state["ready"] else 503
+
+def request_source(data):
+    """
+    The request's source: the registered session named by 'source_id', else 'source_text'.
+    None if the source_id is unknown or its session has been evicted.
+    """
+    if data.get("source_id"):
+        return sources.get_store().get(data["source_id"])
+    return data.get("source_text", "")
+
+UNKNOWN_SOURCE = {"error": "unknown or expired source_id; register the source again via POST /api/sources"}
+
 @app.route("/api/analyze", methods=["POST"])
 def analyze():
     data = request.get_json()
-    source = data.get("source_text", "")
+    source = request_source(data)
+    if source is None:
+        return jsonify(UNKNOWN_SOURCE), 404
     candidate = data.get("candidate_text", "")
-    result = analyze_text_sentencewise(source, candidate)
+    result = cached_analysis(source, candidate)
     return jsonify({"analysis": result})
 
+@app.route("/api/sources", methods=["POST"])
+def register_source():
+    """
+    Register a source document once (split, tokenized and indexed up front); later
+    analyze / job requests can send its 'source_id' instead of 'source_text'.
+    """
+    data = request.get_json()
+    session = sources.get_store().register(data.get("source_text", ""))
+    return jsonify(session.to_dict()), 201
+
+@app.route("/api/sources", methods=["GET"])
+def source_stats():
+    return jsonify(sources.get_store().to_dict())
+
+@app.route("/api/sources/<source_id>", methods=["GET"])
+def source_info(source_id):
+    session = sources.get_store().get(source_id)
+    if session is None:
+        return jsonify(UNKNOWN_SOURCE), 404
+    return jsonify(session.to_dict())
+
+@app.route("/api/sources/<source_id>", methods=["DELETE"])
+def delete_source(source_id):
+    if not sources.get_store().delete(source_id):
+        return jsonify(UNKNOWN_SOURCE), 404
+    return "", 204
+
+_state_store = None
+_state_store_lock = threading.Lock()
+
+def get_state_store() -> incremental.StateStore:
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            _state_store = incremental.store_from_env()
+        return _state_store
+
+@app.route("/api/analyze/incremental", methods=["POST"])
+def analyze_edit():
+    """
+    Re-analyze an edited text. Send the 'revision' from the previous response to
+    only score changed sentences; without (or with an expired) revision the text
+    is analyzed in full. Returns the analysis and a new revision id.
+    """
+    data = request.get_json()
+    source = request_source(data)
+    if source is None:
+        return jsonify(UNKNOWN_SOURCE), 404
+    store = get_state_store()
+    previous = store.get(data.get("revision"))
+    result = incremental.analyze_incremental(source, data.get("candidate_text", ""),
+                                             {"state": previous} if previous else None)
+    revision = store.put(result.pop("state"))
+    return jsonify({"analysis": result, "revision": revision, "incremental": previous is not None})
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> jobs.JobQueue:
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            # Jobs register their state, so the revision in their 'done' event can be edited incrementally
+            _job_queue = jobs.queue_from_env(states=get_state_store())
+        return _job_queue
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    data = request.get_json()
+    source = request_source(data)
+    if source is None:
+        return jsonify(UNKNOWN_SOURCE), 404
+    try:
+        job = get_job_queue().submit(source, data.get("candidate_text", ""))
+    except jobs.QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    return jsonify({
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
+        "stream_url": f"/api/jobs/{job.id}/stream",
+    }), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.to_dict(include_results=request.args.get("results") == "1"))
+
+@app.route("/api/jobs/<job_id>/stream", methods=["GET"])
+def job_stream(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    events = (jobs.sse_format(event, data) for event, data in job.events())
+    return Response(stream_with_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/jobs", methods=["GET"])
+def job_queue_stats():
+    return jsonify(get_job_queue().stats())
+
+@app.route("/api/models", methods=["GET"])
+def models():
+    registry = core.MODEL_REGISTRY
+    return jsonify({
+        "loaded": registry.memory_usage(),
+        "total_bytes": registry.total_bytes(),
+        "stats": registry.stats,
+    })
+
+@app.route("/api/cache", methods=["GET"])
+def cache_stats():
+    score_cache = cache.get_cache()
+    return jsonify(score_cache.stats() if score_cache is not None else {"enabled": False})
+
+@app.route("/api/scheduler", methods=["GET"])
+def scheduler_stats():
+    return jsonify({"enabled": scheduler.enabled(), "batchers": scheduler.metrics()})
+
+@app.route("/api/cascade", methods=["GET"])
+def cascade_stats():
+    return jsonify({"enabled": cascade.enabled(), **cascade.get_config()._asdict(), **cascade.stats()})
+
+@app.route("/api/trace", methods=["GET"])
+def trace_stats():
+    return jsonify(core.INSTRUMENTATION.snapshot())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Stage latencies and work counters in the Prometheus text format."""
+    lines = [core.INSTRUMENTATION.prometheus_text().rstrip("\n"),
+             "# TYPE ethos_model_bytes gauge",
+             f"ethos_model_bytes {core.MODEL_REGISTRY.total_bytes()}"]
+    score_cache = cache.get_cache()
+    if score_cache is not None:
+        lines += ["# TYPE ethos_score_cache_entries gauge",
+                  f"ethos_score_cache_entries {score_cache.stats()['memory_entries']}"]
+    return Response("\n".join(line for line in lines if line) + "\n",
+                    mimetype="text/plain; version=0.0.4")
+
 # For local testing
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    logging.basicConfig(level=logging.INFO)  # start-up report and ETHOS_TRACE_LOG spans are logged
+    debug = os.environ.get("ETHOS_DEBUG", "1") != "0"
+    # The debug reloader runs this script twice: a file-watching parent and the serving
+    # child (WERKZEUG_RUN_MAIN=true). Only the child serves requests, so only it warms up.
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up()
+    app.run(debug=debug, port=5000)
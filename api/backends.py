@@ -0,0 +1,236 @@
+"""
+backends.py
+CPU inference backends for the scorer models, plus a harness comparing them.
+
+Backends (selected per ModelSpec, see core.ModelSpec.configured):
+ - pytorch → the Hugging Face pipeline as-is (reference)
+ - int8    → torch dynamic int8 quantization of every nn.Linear (weights int8,
+             activations quantized on the fly); ~4x smaller linear layers, no export step
+ - onnx    → model exported once to ONNX and run with ONNX Runtime (optional dependency:
+             pip install onnxruntime). Exports are cached in ETHOS_ONNX_DIR.
+
+The same pipeline object is returned in every case, with its `.model` swapped, so
+pipeline calls, nli.NLIEngine and the score cache work unchanged. Quantized / exported
+models carry their own cache_identity, so their scores never mix with the fp32 ones.
+
+Environment:
+ ETHOS_BACKEND=<name>              default backend for every scorer
+ ETHOS_<SCORER>_BACKEND=<name>     per scorer (ETHOS_NLI, ETHOS_FORMALITY, ETHOS_LOGOS_NLI, ETHOS_EMOTION)
+ ETHOS_<SCORER>_MODEL=<name>       swap in another checkpoint, e.g. a distilled NLI model
+ ETHOS_ONNX_DIR=<path>             export cache (default ~/.cache/ethos/onnx)
+
+Comparison harness:
+ python backends.py --backends pytorch,int8,onnx
+"""
+import os
+import re
+import time
+import argparse
+from typing import Any, Dict, List, Sequence
+import numpy as np
+import torch
+from transformers import pipeline
+from transformers.modeling_outputs import SequenceClassifierOutput
+import core
+
+BACKENDS = ("pytorch", "int8", "onnx")
+ONNX_DIR = os.environ.get("ETHOS_ONNX_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ethos", "onnx"))
+
+
+def load(spec: core.ModelSpec):
+    """Pipeline for spec with its model converted to spec.backend."""
+    if spec.backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {spec.backend!r}")
+    pipe = pipeline(spec.task, model=spec.model, **dict(spec.options))
+    if spec.backend == "int8":
+        quantize_int8(pipe)
+    elif spec.backend == "onnx":
+        pipe.model = OnnxSequenceClassifier.export(pipe.model, pipe.tokenizer, spec)
+    return pipe
+
+
+def _base_identity(model) -> str:
+    config = model.config
+    name = getattr(config, "name_or_path", None) or getattr(config, "_name_or_path", "model")
+    return f"{name}@{getattr(config, '_commit_hash', None) or 'local'}"
+
+
+# -----------------------------
+# int8 (dynamic quantization)
+# -----------------------------
+def quantize_int8(pipe):
+    """Quantize the pipeline's nn.Linear layers to int8 in place."""
+    model = pipe.model.eval()
+    identity = _base_identity(model)
+    fp32_bytes = core.model_nbytes(model)
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    # Packed int8 weights are neither parameters nor buffers; count them explicitly
+    packed = 0
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._packed_params._weight_bias()
+            packed += weight.numel() + (bias.numel() * bias.element_size() if bias is not None else 0)
+    model.memory_bytes = core.model_nbytes(model) + packed
+    model.fp32_bytes = fp32_bytes
+    model.cache_identity = f"{identity}+int8"
+    return pipe
+
+
+# -----------------------------
+# ONNX Runtime
+# -----------------------------
+class OnnxSequenceClassifier:
+    """
+    Drop-in for a transformers sequence-classification model, backed by an
+    ONNX Runtime session. Exposes what the pipeline and NLIEngine use: config,
+    device, parameters(), eval() and __call__(**inputs).logits.
+    """
+
+    def __init__(self, path: str, config, identity: str, num_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("the onnx backend needs onnxruntime: pip install onnxruntime") from e
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.config = config
+        self.device = torch.device("cpu")
+        self.memory_bytes = os.path.getsize(path)
+        self.cache_identity = f"{identity}+onnx"
+
+    @classmethod
+    def export(cls, model, tokenizer, spec: core.ModelSpec) -> "OnnxSequenceClassifier":
+        """Export model to ONNX (once per model revision) and open a session on it."""
+        identity = _base_identity(model)
+        path = os.path.join(ONNX_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", identity) + ".onnx")
+        if not os.path.exists(path):
+            os.makedirs(ONNX_DIR, exist_ok=True)
+            sample = tokenizer("An example premise.", "An example hypothesis.", return_tensors="pt")
+            names = list(sample.keys())
+            axes = {name: {0: "batch", 1: "sequence"} for name in names}
+            axes["logits"] = {0: "batch"}
+            model.eval()
+            tmp = path + ".tmp"
+            with torch.inference_mode():
+                torch.onnx.export(model, (dict(sample),), tmp, input_names=names, output_names=["logits"],
+                                  dynamic_axes=axes, opset_version=14)
+            os.replace(tmp, path)
+        return cls(path, model.config, identity, torch.get_num_threads())
+
+    def __call__(self, **inputs) -> SequenceClassifierOutput:
+        feed = {k: v.cpu().numpy() for k, v in inputs.items() if k in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+    forward = __call__
+
+    def eval(self) -> "OnnxSequenceClassifier":
+        return self
+
+    def parameters(self):
+        yield torch.empty(0, device=self.device)
+
+    def can_generate(self) -> bool:
+        return False
+
+
+# -----------------------------
+# Accuracy / latency comparison
+# -----------------------------
+def _example_runs() -> List[tuple]:
+    """(dimension, case name, spec, fn(model) → score) for the example cases of each scorer."""
+    import ethos
+    import logos
+    import pathos
+
+    runs = []
+    for case in ethos.EXAMPLE_CASES:
+        runs.append(("ethos", case["name"], ethos.NLI_MODEL_SPEC,
+                     lambda m, c=case: ethos.compute_factual_consistency(c["source"], c["candidate"], m)))
+        runs.append(("formality", case["name"], ethos.FORMALITY_MODEL_SPEC,
+                     lambda m, c=case: ethos.compute_formality(c["candidate"], m)))
+    for case in logos.EXAMPLE_CASES:
+        runs.append(("logos", case["name"], logos.NLI_MODEL_SPEC,
+                     lambda m, c=case: logos.compute_logical_coherence(c["text"], m)))
+    for case in pathos.EXAMPLE_CASES:
+        runs.append(("pathos", case["name"], pathos.EMOTION_MODEL_SPEC,
+                     lambda m, c=case: pathos.compute_pathos_score(c["text"], m)))
+    return runs
+
+
+def compare(backends: Sequence[str] = BACKENDS, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Run every example case on each backend. Reports model load time and size,
+    per-case median latency and score, and the score drift against the first backend.
+    The score cache is bypassed so every call really runs the model.
+    """
+    import cache
+
+    saved_cache = cache.get_cache()
+    cache.set_cache(None)
+    runs = _example_runs()
+    report: Dict[str, Any] = {}
+    try:
+        for backend in backends:
+            specs = list(dict.fromkeys(spec.with_backend(backend) for _, _, spec, _ in runs))
+            t0 = time.perf_counter()
+            models = {spec: core.get_model(spec) for spec in specs}
+            load_seconds = time.perf_counter() - t0
+            cases = []
+            for dimension, name, spec, fn in runs:
+                model = models[spec.with_backend(backend)]
+                fn(model)  # warm-up
+                latencies = []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    score = fn(model)
+                    latencies.append(time.perf_counter() - t0)
+                cases.append({"dimension": dimension, "case": name, "score": float(score),
+                              "latency_ms": round(1000 * float(np.median(latencies)), 2)})
+            report[backend] = {
+                "load_seconds": round(load_seconds, 2),
+                "model_bytes": {core._key_name(s): core.model_nbytes(m) for s, m in models.items()},
+                "cases": cases,
+            }
+            for spec in specs:
+                core.MODEL_REGISTRY.evict(spec)
+    finally:
+        cache.set_cache(saved_cache)
+
+    reference = report[backends[0]]["cases"] if backends else []
+    for backend in backends:
+        for case, ref in zip(report[backend]["cases"], reference):
+            case["drift"] = round(case["score"] - ref["score"], 4)
+            case["speedup"] = round(ref["latency_ms"] / case["latency_ms"], 2) if case["latency_ms"] else None
+        drifts = [abs(c["drift"]) for c in report[backend]["cases"]]
+        report[backend]["max_abs_drift"] = max(drifts, default=0.0)
+        report[backend]["total_latency_ms"] = round(sum(c["latency_ms"] for c in report[backend]["cases"]), 2)
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Compare scorer accuracy / latency across inference backends")
+    parser.add_argument("--backends", default="pytorch,int8,onnx",
+                        help="Comma-separated backends; the first is the drift reference")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    core.suppress_transformers_warnings()
+    report = compare([b.strip() for b in args.backends.split(",")], args.repeats)
+    for backend, info in report.items():
+        print(f"\n=== {backend} === load {info['load_seconds']}s, "
+              f"total {info['total_latency_ms']} ms, max |drift| {info['max_abs_drift']}")
+        for name, nbytes in info["model_bytes"].items():
+            print(f"  {name}: {nbytes / 2**20:.1f} MiB")
+        for c in info["cases"]:
+            print(f"  {c['dimension']:<10} {c['case']:<36} score={c['score']:.4f} "
+                  f"drift={c['drift']:+.4f} {c['latency_ms']} ms (x{c['speedup']})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,15 @@
+"""
+benchmarks
+End-to-end and per-stage latency benchmarks for the analysis pipeline.
+
+Synthetic transcripts of increasing size (10 → 1000 sentences) are timed through
+sentence splitting, ConceptNet enrichment (against a local stub server), each
+model stage and the full analyze_text / analyze_text_sentencewise paths.
+Results (p50/p95 latency, throughput, peak RSS) are saved as JSON so runs from
+different commits can be compared.
+
+Run from the api/ directory:
+ python -m benchmarks run -o bench.json                    # tiny offline stand-in models
+ python -m benchmarks run --real-models -o bench.json      # the actual scorer models
+ python -m benchmarks compare baseline.json bench.json     # flag regressions
+"""
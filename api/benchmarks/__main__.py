@@ -0,0 +1,99 @@
+"""
+benchmarks/__main__.py
+Command line entry point: python -m benchmarks {run,compare} ...
+"""
+import sys
+import json
+import argparse
+import core
+from benchmarks import harness
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def _names(value: str):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def cmd_run(args) -> int:
+    core.suppress_transformers_warnings()
+    core.configure_splitter(args.splitter)
+    if args.real_models:
+        import final
+        final.warm_up_models()
+    else:
+        from benchmarks import stand_ins
+        stand_ins.install(args.hidden_size, args.layers)
+    report = harness.run(
+        args.sizes, repeats=args.repeats, stages=args.stages, splitters=args.splitters,
+        max_full_sentences=args.max_full_sentences, conceptnet_delay=args.conceptnet_delay,
+        seed=args.seed, models="real" if args.real_models else "stand-in", cache_modes=args.caches,
+    )
+    report["meta"]["splitter"] = args.splitter
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {len(report['results'])} results to {args.output}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    baseline, current = harness.load_report(args.baseline), harness.load_report(args.current)
+    print(f"baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('models')})  →  "
+          f"current {current['meta'].get('commit')} ({current['meta'].get('models')})")
+    rows = harness.compare(baseline, current, args.threshold)
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"[{r['size']:>5}] {r['stage'] + '/' + r['variant'] + ' (' + r['caches'] + ')':<47} "
+              f"{r['baseline_p50_ms']:>10.2f} → {r['current_p50_ms']:>10.2f} ms  x{r['ratio']:<6} "
+              f"rss {r['rss_delta_mb']:+.1f} MiB{flag}")
+    regressions = sum(r["regression"] for r in rows)
+    print(f"{len(rows)} comparable results, {regressions} regressions (> {args.threshold:.0%} slower)")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--sizes", type=_ints, default=[10, 50, 100, 500, 1000], help="Sentence counts, e.g. 10,100,1000")
+    run.add_argument("--repeats", type=int, default=5, help="Timed runs per stage and size")
+    run.add_argument("--stages", type=_names, default=list(harness.STAGES),
+                     help=f"Comma-separated subset of {','.join(harness.STAGES)}")
+    run.add_argument("--splitter", default="sentencizer", choices=core.SPLITTER_MODES,
+                     help="Splitter used by the model and analyze stages")
+    run.add_argument("--splitters", type=_names, default=["regex", "sentencizer"],
+                     help="Modes timed by the split stage")
+    run.add_argument("--max-full-sentences", type=int, default=200,
+                     help="Largest transcript for analyze_text (all sentence pairs → quadratic)")
+    run.add_argument("--conceptnet-delay", type=float, default=0.0, help="Stub server latency per request (s)")
+    run.add_argument("--real-models", action="store_true", help="Use the actual scorer models instead of stand-ins")
+    run.add_argument("--hidden-size", type=int, default=32, help="Stand-in model width")
+    run.add_argument("--layers", type=int, default=2, help="Stand-in model depth")
+    run.add_argument("--caches", type=_names, default=list(harness.CACHE_MODES),
+                     help="cold (caches cleared before every run), warm (kept), or both")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("-o", "--output", help="Write the JSON report here")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Compare two JSON reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Relative p50 slowdown counted as a regression")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    unknown = set(getattr(args, "stages", ())) - set(harness.STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    unknown = set(getattr(args, "caches", ())) - set(harness.CACHE_MODES)
+    if unknown:
+        parser.error(f"unknown cache modes: {', '.join(sorted(unknown))}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+benchmarks/harness.py
+Stage timings, latency percentiles, peak RSS and result comparison.
+
+Every stage is run `repeats` times per transcript size after one untimed warm-up
+run, and reported twice:
+ cold → the sentence-split memo, NLI token-id caches and ConceptNet LRUs are
+        cleared before every run, so each repeat does the full work
+ warm → those caches keep what the warm-up run (and earlier repeats) left in them
+The score cache is disabled throughout.
+"""
+import os
+import re
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+import torch
+import cache
+import core
+import final
+import knowledge
+import logos
+import nli
+from benchmarks import synthetic
+
+STAGES = ("split", "conceptnet", "models", "analyze_text", "analyze_text_sentencewise")
+CACHE_MODES = ("cold", "warm")
+
+
+# -----------------------------
+# Measurement helpers
+# -----------------------------
+def _reset_peak_rss() -> None:
+    """Reset the kernel's peak-RSS counter (Linux); elsewhere peaks are process-wide."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last reset, in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(seconds: List[float], items: int, unit: str) -> Dict[str, Any]:
+    """p50 / p95 / mean latency in ms, and throughput in `unit`s per second at p50."""
+    arr = np.asarray(seconds)
+    p50 = float(np.percentile(arr, 50))
+    return {
+        "items": items,
+        "unit": unit,
+        "repeats": len(seconds),
+        "p50_ms": round(1000 * p50, 3),
+        "p95_ms": round(1000 * float(np.percentile(arr, 95)), 3),
+        "mean_ms": round(1000 * float(arr.mean()), 3),
+        "throughput": round(items / p50, 2) if p50 > 0 else None,
+    }
+
+
+def measure(fn: Callable[[], Any], repeats: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """Wall times of `repeats` calls to fn (after one warm-up call); setup runs untimed before each."""
+    if setup:
+        setup()
+    fn()
+    times = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def clear_caches(*backends: knowledge.KnowledgeBackend) -> None:
+    """Forget what earlier runs left behind: sentence splits, NLI token ids, ConceptNet lookups."""
+    core.clear_split_cache()
+    nli.clear_token_caches()
+    for backend in (knowledge.get_backend(),) + backends:
+        if isinstance(backend, knowledge.CachedKnowledge):
+            backend.clear()
+
+
+def _setup(caches: str, *backends: knowledge.KnowledgeBackend) -> Optional[Callable[[], None]]:
+    return (lambda: clear_caches(*backends)) if caches == "cold" else None
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def bench_split(text: str, n: int, repeats: int, splitters: Sequence[str], caches: str) -> List[Dict[str, Any]]:
+    rows = []
+    for mode in splitters:
+        row = {"stage": "split", "variant": mode, "size": n, "caches": caches}
+        try:
+            row.update(summarize(measure(lambda: core.split_sentences(text, mode), repeats, _setup(caches)),
+                                 n, "sentences"))
+        except Exception as e:  # e.g. spaCy model / punkt data not installed
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+    return rows
+
+
+def bench_conceptnet(text: str, n: int, repeats: int, stub_url: str, caches: str) -> List[Dict[str, Any]]:
+    """Enrichment of the whole transcript against the stub server, uncached and cached."""
+    rows = []
+    uncached = knowledge.HTTPConceptNet(stub_url)
+    nouns = len(set(re.findall(r"\b[A-Z][a-z]+\b", text)))
+    rows.append({"stage": "conceptnet", "variant": "http", "size": n, "caches": caches, **summarize(
+        measure(lambda: logos.enrich_with_conceptnet(text, backend=uncached), repeats, _setup(caches)),
+        nouns, "nouns")})
+    cached = knowledge.CachedKnowledge(uncached)
+    rows.append({"stage": "conceptnet", "variant": "http+cache", "size": n, "caches": caches, **summarize(
+        measure(lambda: logos.enrich_with_conceptnet(text, backend=cached), repeats, _setup(caches, cached)),
+        nouns, "nouns")})
+    return rows
+
+
+def bench_models(source: str, text: str, n: int, repeats: int, caches: str) -> List[Dict[str, Any]]:
+    """One batched call per model over everything the sentence-wise pipeline plans for text."""
+    work = final.new_work()
+    final.plan_sentences(source, core.split_sentences(text), work)
+    rows = []
+    for kind in final.WORK_KINDS:
+        inputs = work[kind].inputs
+        rows.append({"stage": "models", "variant": kind, "size": n, "caches": caches, **summarize(
+            measure(lambda: final.run_kind(kind, inputs), repeats, _setup(caches)), len(inputs), "inputs")})
+    return rows
+
+
+def bench_analyze(source: str, text: str, n: int, repeats: int, sentencewise: bool,
+                  caches: str) -> List[Dict[str, Any]]:
+    if sentencewise:
+        stage, fn = "analyze_text_sentencewise", lambda: final.analyze_text_sentencewise(source, text)
+    else:
+        stage, fn = "analyze_text", lambda: final.analyze_text(source, text)
+    return [{"stage": stage, "variant": "end_to_end", "size": n, "caches": caches,
+             **summarize(measure(fn, repeats, _setup(caches)), n, "sentences")}]
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: Sequence[int], repeats: int = 5, stages: Sequence[str] = STAGES,
+        splitters: Sequence[str] = ("regex", "sentencizer"), max_full_sentences: int = 200,
+        conceptnet_delay: float = 0.0, seed: int = 0, models: str = "stand-in",
+        cache_modes: Sequence[str] = CACHE_MODES, log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Benchmark every stage at every transcript size, cold and / or warm (see module
+    docstring). analyze_text scores all sentence pairs of the transcript
+    (quadratic), so it is skipped above max_full_sentences.
+    """
+    previous_cache = cache.get_cache()
+    cache.set_cache(None)
+    source = synthetic.make_source()
+    results: List[Dict[str, Any]] = []
+    try:
+        with knowledge.StubConceptNetServer(synthetic.isa_relations(), delay=conceptnet_delay) as stub:
+            knowledge.set_backend(knowledge.CachedKnowledge(knowledge.HTTPConceptNet(stub.url)))
+            for n in sizes:
+                text = synthetic.make_transcript(n, seed)
+                for stage in stages:
+                    if stage == "analyze_text" and n > max_full_sentences:
+                        log(f"[{n:>5}] {stage}: skipped (> {max_full_sentences} sentences)")
+                        continue
+                    for caches in cache_modes:
+                        clear_caches()  # warm runs start from their own warm-up, not the previous stage
+                        _reset_peak_rss()
+                        if stage == "split":
+                            rows = bench_split(text, n, repeats, splitters, caches)
+                        elif stage == "conceptnet":
+                            rows = bench_conceptnet(text, n, repeats, stub.url, caches)
+                        elif stage == "models":
+                            rows = bench_models(source, text, n, repeats, caches)
+                        else:
+                            rows = bench_analyze(source, text, n, repeats, stage == "analyze_text_sentencewise",
+                                                 caches)
+                        peak = peak_rss_mb()
+                        for row in rows:
+                            row["peak_rss_mb"] = peak
+                            log(format_row(row))
+                        results.extend(rows)
+    finally:
+        cache.set_cache(previous_cache)
+        knowledge.set_backend(None)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "models": models,
+            "sizes": list(sizes),
+            "repeats": repeats,
+            "cache_modes": list(cache_modes),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    name = f"[{row['size']:>5}] {row['stage']}/{row['variant']} ({row.get('caches', 'warm')})"
+    if "error" in row:
+        return f"{name:<55} error: {row['error']}"
+    return (f"{name:<55} p50 {row['p50_ms']:>10.2f} ms  p95 {row['p95_ms']:>10.2f} ms  "
+            f"{row['throughput']:>10} {row['unit']}/s  peak {row['peak_rss_mb']} MiB")
+
+
+# -----------------------------
+# Regression comparison
+# -----------------------------
+def _index(report: Dict[str, Any]) -> Dict[tuple, Dict[str, Any]]:
+    # Reports from before the cold / warm split ran with warm token and ConceptNet caches
+    return {(r["stage"], r["variant"], r["size"], r.get("caches", "warm")): r
+            for r in report["results"] if "error" not in r}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    p50 latency ratio (current / baseline) for every stage present in both reports;
+    rows slower by more than `threshold` are marked as regressions.
+    """
+    old, new = _index(baseline), _index(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key]["p50_ms"] / old[key]["p50_ms"] if old[key]["p50_ms"] else float("inf")
+        rows.append({
+            "stage": key[0], "variant": key[1], "size": key[2], "caches": key[3],
+            "baseline_p50_ms": old[key]["p50_ms"], "current_p50_ms": new[key]["p50_ms"],
+            "ratio": round(ratio, 3),
+            "rss_delta_mb": round(new[key].get("peak_rss_mb", 0) - old[key].get("peak_rss_mb", 0), 1),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,91 @@
+"""
+benchmarks/stand_ins.py
+Tiny, randomly initialised stand-ins for the scorer models, so the benchmarks
+run offline and in seconds. They exercise the real pipeline, tokenizer, batching
+and aggregation code paths; only the transformer itself is (much) smaller.
+Scores are meaningless, timings of everything around the model are not.
+
+    install()        → into the shared model registry (this process)
+    save(directory)  → as model directories, for processes that load models by path
+                       (point ETHOS_*_MODEL at them before the scorers are imported)
+"""
+import os
+from typing import Dict, List, Optional
+import torch
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+from transformers import BertConfig, BertForSequenceClassification, PreTrainedTokenizerFast, pipeline
+import core
+from benchmarks import synthetic
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]"]
+FORMALITY_LABELS = ["formal", "informal"]
+EMOTION_LABELS = ["sadness", "joy", "love", "anger", "fear", "surprise"]
+# Kind of scorer model → its labels (save() writes one directory per kind)
+KIND_LABELS = {"nli": list(core.NLI_LABELS), "formality": FORMALITY_LABELS, "emotion": EMOTION_LABELS}
+
+
+def make_tokenizer() -> PreTrainedTokenizerFast:
+    vocab = {w: i for i, w in enumerate(SPECIAL_TOKENS + synthetic.VOCABULARY)}
+    tok = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tok.normalizer = normalizers.Lowercase()
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    tok.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", pair="[CLS] $A [SEP] $B [SEP]",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])],
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]", pad_token="[PAD]",
+                                   cls_token="[CLS]", sep_token="[SEP]", model_max_length=512)
+
+
+def make_pipeline(labels: List[str], top_k: Optional[int] = None, hidden_size: int = 32,
+                  num_layers: int = 2, seed: int = 0, name: Optional[str] = None):
+    """
+    text-classification pipeline around a small random BERT with the given labels.
+    name becomes the model's name_or_path, i.e. its score cache identity (cache.model_identity).
+    """
+    tokenizer = make_tokenizer()
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=hidden_size, num_hidden_layers=num_layers,
+        num_attention_heads=2, intermediate_size=2 * hidden_size,
+        num_labels=len(labels), id2label=dict(enumerate(labels)), label2id={l: i for i, l in enumerate(labels)},
+    )
+    with torch.random.fork_rng():
+        torch.manual_seed(seed)
+        model = BertForSequenceClassification(config).eval()
+    if name:
+        model.config.name_or_path = name
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=top_k)
+
+
+def install(hidden_size: int = 32, num_layers: int = 2) -> None:
+    """Put a stand-in for every scorer model into the shared registry."""
+    # Imported here: their model specs read the environment, which save() users set first
+    import cascade
+    import ethos
+    import final
+    import logos
+    import pathos
+
+    labels = {
+        ethos.NLI_MODEL_SPEC: list(core.NLI_LABELS),
+        logos.NLI_MODEL_SPEC: list(core.NLI_LABELS),
+        ethos.FORMALITY_MODEL_SPEC: FORMALITY_LABELS,
+        pathos.EMOTION_MODEL_SPEC: EMOTION_LABELS,
+        cascade.CHEAP_NLI_SPEC: list(core.NLI_LABELS),
+    }
+    for seed, spec in enumerate(dict.fromkeys(final.MODEL_SPECS + [cascade.CHEAP_NLI_SPEC])):
+        name = f"stand-in-{hidden_size}x{num_layers}-{seed}/{spec.model}"
+        core.MODEL_REGISTRY.put(spec, make_pipeline(labels[spec], dict(spec.options).get("top_k"),
+                                                    hidden_size, num_layers, seed, name))
+
+
+def save(directory: str, hidden_size: int = 32, num_layers: int = 2) -> Dict[str, str]:
+    """Save one stand-in per kind (KIND_LABELS) under directory, unless already there; returns kind → path."""
+    paths = {}
+    for seed, (kind, labels) in enumerate(KIND_LABELS.items()):
+        path = paths[kind] = os.path.join(directory, kind)
+        if not os.path.exists(os.path.join(path, "config.json")):
+            stand_in = make_pipeline(labels, hidden_size=hidden_size, num_layers=num_layers, seed=seed)
+            stand_in.model.save_pretrained(path)
+            stand_in.tokenizer.save_pretrained(path)
+    return paths
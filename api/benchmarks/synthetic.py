@@ -0,0 +1,65 @@
+"""
+benchmarks/synthetic.py
+Seeded synthetic transcripts for the benchmarks.
+
+Sentences mix the shapes the scorers care about: plain factual claims about
+capitalised entities (ConceptNet enrichment), syllogisms (logos preprocessing),
+informal asides (formality) and emotional outbursts (pathos).
+"""
+import random
+from typing import List
+
+NAMES = ["Socrates", "Paris", "London", "Einstein", "Marie", "Rome", "Newton", "Ada", "Tokyo", "Darwin"]
+THINGS = ["tower", "bridge", "theory", "river", "museum", "engine", "garden", "library", "market", "station"]
+KINDS = ["humans", "cities", "scientists", "buildings", "machines", "writers"]
+QUALITIES = ["mortal", "old", "famous", "useful", "large", "curious"]
+YEARS = ["1889", "1905", "1969", "2001", "1492", "1776"]
+FEELINGS = ["amazing", "terrible", "inspiring", "unacceptable", "wonderful", "frightening"]
+
+TEMPLATES = [
+    "{name} is located near the {thing}.",
+    "The {thing} in {name} was completed in {year}.",
+    "All {kind} are {quality}.",
+    "Therefore, {name} is {quality}.",
+    "If the {thing} is {quality}, then {name} is {quality}.",
+    "Yeah, that {thing} in {name} was kind of {quality}, honestly!",
+    "I think it is {feeling} that the {thing} was built in {year}!",
+    "The {thing} is not in {name}.",
+    "Most {kind} visit the {thing} every year.",
+    "Is the {thing} in {name} really {quality}?",
+]
+
+# Every word the templates can produce (used to build the stand-in tokenizers)
+VOCABULARY = sorted({
+    word.strip(".,!?").lower()
+    for template in TEMPLATES for word in template.split() if "{" not in word
+} | {w.lower() for w in NAMES + THINGS + KINDS + QUALITIES + YEARS + FEELINGS})
+
+
+def make_sentence(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(
+        name=rng.choice(NAMES), thing=rng.choice(THINGS), kind=rng.choice(KINDS),
+        quality=rng.choice(QUALITIES), year=rng.choice(YEARS), feeling=rng.choice(FEELINGS),
+    )
+
+
+def make_sentences(n_sentences: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [make_sentence(rng) for _ in range(n_sentences)]
+
+
+def make_transcript(n_sentences: int, seed: int = 0) -> str:
+    """Candidate transcript with n_sentences sentences (same seed → same text)."""
+    return " ".join(make_sentences(n_sentences, seed))
+
+
+def make_source(n_sentences: int = 20, seed: int = 1) -> str:
+    """Reference source text the candidate is checked against."""
+    return make_transcript(n_sentences, seed)
+
+
+def isa_relations() -> dict:
+    """IsA table for the stub ConceptNet server, covering every generated name."""
+    kinds = {"Socrates": "human", "Einstein": "scientist", "Marie": "scientist", "Newton": "scientist",
+             "Darwin": "scientist", "Ada": "mathematician"}
+    return {name: [kinds.get(name, "city")] for name in NAMES}
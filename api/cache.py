@@ -0,0 +1,301 @@
+"""
+cache.py
+Content-addressed cache for model outputs (NLI probabilities, formality scores,
+emotion distributions) and whole analyses.
+
+Keys are SHA-256 hashes of (kind, model name, model revision, input), so the same
+sentence or sentence pair is only scored once per model revision — across requests
+and, with the on-disk tier, across restarts.
+Whole analyses are keyed by a fingerprint of every setting that changes them
+(final.analysis_config: model specs, splitter, logos pair mode, knowledge backend,
+cascade); results computed while a ConceptNet lookup failed are not cached.
+
+Tiers:
+ - memory → LRU with optional TTL (always on unless disabled)
+ - disk   → SQLite file with TTL and size-based eviction (ETHOS_CACHE_DB)
+
+Environment:
+ ETHOS_CACHE=off           disable caching entirely
+ ETHOS_CACHE_SIZE=<n>      memory entries (default 100000)
+ ETHOS_CACHE_TTL=<sec>     expiry for both tiers (default: none)
+ ETHOS_CACHE_DB=<path>     enable the SQLite tier
+ ETHOS_CACHE_DB_SIZE=<n>   disk entries (default 1000000)
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import core
+
+
+def model_identity(model) -> Optional[str]:
+    """
+    'name@revision' for a pipeline / engine / torch model, or None when the model
+    cannot be identified (its outputs are then not cached).
+    Wrappers can set a `cache_identity` attribute to override this; a plain
+    string is taken as the identity itself.
+    """
+    if isinstance(model, str):
+        return model
+    identity = getattr(model, "cache_identity", None)
+    if identity:
+        return identity
+    inner = getattr(model, "model", model)
+    identity = getattr(inner, "cache_identity", None)
+    if identity:
+        return identity
+    config = getattr(inner, "config", None)
+    name = getattr(config, "name_or_path", None) or getattr(config, "_name_or_path", None)
+    if not name:
+        return None
+    return f"{name}@{getattr(config, '_commit_hash', None) or 'local'}"
+
+
+def make_key(kind: str, model_id: str, payload: Any) -> str:
+    blob = json.dumps([kind, model_id, payload], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Tiers
+# -----------------------------
+class MemoryTier:
+    """Thread-safe LRU with optional TTL."""
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        now, found = time.time(), {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                value, stored = entry
+                if self.ttl is not None and now - stored > self.ttl:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (value, now)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteTier:
+    """On-disk key → JSON value store with TTL and least-recently-accessed eviction."""
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_accessed ON scores (accessed)")
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        now, found, expired = time.time(), {}, []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start:start + 500])
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, stored FROM scores WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, value, stored in rows:
+                    if self.ttl is not None and now - stored > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+            if found:
+                self._conn.executemany("UPDATE scores SET accessed = ? WHERE key = ?",
+                                       [(now, k) for k in found])
+            if expired:
+                self._conn.executemany("DELETE FROM scores WHERE key = ?", [(k,) for k in expired])
+            self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, value, stored, accessed) VALUES (?, ?, ?, ?)",
+                [(k, json.dumps(v), now, now) for k, v in items.items()],
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM scores WHERE key IN "
+                    "(SELECT key FROM scores ORDER BY accessed LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM scores")
+            self._conn.commit()
+
+
+# -----------------------------
+# Two-tier cache
+# -----------------------------
+class ScoreCache:
+    """Memory LRU in front of an optional disk tier, with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 100_000, ttl: Optional[float] = None,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 1_000_000):
+        self.memory = MemoryTier(max_entries, ttl)
+        self.disk = SQLiteTier(disk_path, disk_max_entries, ttl) if disk_path else None
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        found = self.memory.get_many(keys)
+        memory_hits = len(found)
+        disk_hits = 0
+        if self.disk is not None and len(found) < len(keys):
+            from_disk = self.disk.get_many([k for k in keys if k not in found])
+            if from_disk:
+                self.memory.put_many(from_disk)
+                found.update(from_disk)
+                disk_hits = len(from_disk)
+        with self._lock:
+            self.counters["memory_hits"] += memory_hits
+            self.counters["disk_hits"] += disk_hits
+            self.counters["hits"] += memory_hits + disk_hits
+            self.counters["misses"] += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        self.memory.put_many(items)
+        if self.disk is not None:
+            self.disk.put_many(items)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        counters["memory_entries"] = len(self.memory)
+        counters["memory_evictions"] = self.memory.evictions
+        if self.disk is not None:
+            counters["disk_entries"] = len(self.disk)
+            counters["disk_evictions"] = self.disk.evictions
+        return counters
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_default_cache: Optional[ScoreCache] = None
+_initialized = False
+_default_lock = threading.Lock()
+
+
+def cache_from_env() -> Optional[ScoreCache]:
+    if os.environ.get("ETHOS_CACHE", "").lower() in ("0", "off", "false", "none"):
+        return None
+    ttl = os.environ.get("ETHOS_CACHE_TTL")
+    return ScoreCache(
+        max_entries=int(os.environ.get("ETHOS_CACHE_SIZE", "100000")),
+        ttl=float(ttl) if ttl else None,
+        disk_path=os.environ.get("ETHOS_CACHE_DB") or None,
+        disk_max_entries=int(os.environ.get("ETHOS_CACHE_DB_SIZE", "1000000")),
+    )
+
+
+def get_cache() -> Optional[ScoreCache]:
+    """Process-wide cache (None when disabled)."""
+    global _default_cache, _initialized
+    with _default_lock:
+        if not _initialized:
+            _default_cache = cache_from_env()
+            _initialized = True
+        return _default_cache
+
+
+def _reset_after_fork() -> None:
+    """A forked child must not share the parent's SQLite connection: rebuild the cache on first use."""
+    global _default_cache, _initialized, _default_lock
+    _default_lock = threading.Lock()
+    _default_cache, _initialized = None, False
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def set_cache(score_cache: Optional[ScoreCache]) -> None:
+    """Replace the process-wide cache (None disables caching)."""
+    global _default_cache, _initialized
+    with _default_lock:
+        _default_cache = score_cache
+        _initialized = True
+
+
+def cached_map(kind: str, model, inputs: Sequence[Any],
+               compute: Callable[[List[Any]], List[Any]]) -> List[Any]:
+    """
+    compute(inputs) with per-input caching: cached inputs are looked up, the rest
+    are computed in one batch and stored. Inputs must be JSON-serializable and
+    outputs JSON round-trippable.
+    """
+    score_cache = get_cache()
+    model_id = model_identity(model) if score_cache is not None else None
+    if model_id is None or not inputs:
+        return list(compute(list(inputs)))
+
+    keys = [make_key(kind, model_id, x) for x in inputs]
+    found = score_cache.get_many(keys)
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    core.count("score_cache_hits", len(keys) - len(missing), kind=kind)
+    core.count("score_cache_misses", len(missing), kind=kind)
+    if missing:
+        first = {k: i for i, k in reversed(list(enumerate(keys)))}
+        computed = compute([inputs[first[k]] for k in missing])
+        fresh = dict(zip(missing, computed))
+        score_cache.put_many(fresh)
+        found.update(fresh)
+    return [found[k] for k in keys]
@@ -0,0 +1,325 @@
+"""
+cascade.py
+Cheap-first NLI scoring: decide the easy pairs cheaply and escalate only the
+uncertain ones to the large NLI model.
+
+Stages (run in order, each only on the pairs the previous stages left open):
+ lexical → word overlap. A pair is decided when its content words do not overlap
+           at all (→ NEUTRAL), or when it is a near-verbatim copy: word Jaccard >= high
+           and the same negation (→ ENTAILMENT). Pairs between the two are uncertain.
+ model   → a small NLI model (CHEAP_NLI_SPEC). A pair is decided when the small
+           model's top label probability is >= confidence.
+Whatever is still undecided is scored by the large model the caller passed.
+
+    probs = cascade.predict_probs(nli_model, pairs)   # same shape as nli.predict_probs
+
+Environment:
+ ETHOS_CASCADE=off|lexical|model|lexical,model   stages (default off)
+ ETHOS_CASCADE_LOW=<x>         content-word overlap at or below which a pair is unrelated (default 0)
+ ETHOS_CASCADE_HIGH=<x>        word Jaccard at or above which a pair is near-verbatim (default 0.9)
+ ETHOS_CASCADE_CONFIDENCE=<p>  small-model probability needed to skip the large model (default 0.9)
+ ETHOS_CASCADE_NLI_MODEL / ETHOS_CASCADE_NLI_BACKEND   the small model
+
+CLI (escalation rate, speed-up and score drift against the large model alone):
+ python cascade.py --stages lexical,model [--high 0.9] [--confidence 0.9] [--json]
+"""
+import os
+import re
+import time
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+import core
+import nli
+
+Pair = Tuple[str, str]
+
+CASCADE_STAGES = ("lexical", "model")
+CHEAP_NLI_SPEC = core.ModelSpec.of(
+    "text-classification", "cross-encoder/nli-distilroberta-base", top_k=None
+).configured("ETHOS_CASCADE_NLI")
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+NEGATIONS = frozenset({"not", "no", "never", "nor", "none", "nobody", "nothing", "neither", "nowhere", "cannot"})
+STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with from as into about over after before
+is are was were be been being am do does did has have had will would shall should can could may might must
+it its this that these those there here he she they we you i me him her them us my your his their our
+which who whom whose what when where why how all any each some such than too very just also only
+""".split())
+
+
+class CascadeConfig(NamedTuple):
+    stages: Tuple[str, ...] = ()
+    low: float = 0.0
+    high: float = 0.9
+    confidence: float = 0.9
+
+
+def config_from_env() -> CascadeConfig:
+    stages = os.environ.get("ETHOS_CASCADE", "off").lower()
+    return CascadeConfig(
+        stages=parse_stages(stages),
+        low=float(os.environ.get("ETHOS_CASCADE_LOW", "0")),
+        high=float(os.environ.get("ETHOS_CASCADE_HIGH", "0.9")),
+        confidence=float(os.environ.get("ETHOS_CASCADE_CONFIDENCE", "0.9")),
+    )
+
+
+def parse_stages(value: str) -> Tuple[str, ...]:
+    if value in ("", "0", "off", "false", "none"):
+        return ()
+    stages = tuple(s.strip() for s in value.split(",") if s.strip())
+    unknown = [s for s in stages if s not in CASCADE_STAGES]
+    if unknown:
+        raise ValueError(f"unknown cascade stage(s) {unknown}; choose from {CASCADE_STAGES}")
+    return stages
+
+
+_config = config_from_env()
+
+
+def configure(config: Optional[CascadeConfig] = None, **overrides) -> CascadeConfig:
+    """Replace the process-wide cascade configuration (fields not given keep their value)."""
+    global _config
+    _config = (config or _config)._replace(**overrides)
+    return _config
+
+
+def get_config() -> CascadeConfig:
+    return _config
+
+
+def enabled() -> bool:
+    return bool(_config.stages)
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def _words(text: str) -> Tuple[frozenset, frozenset, bool]:
+    """(all words, content words, negated) of a sentence."""
+    words = frozenset(_WORD.findall(text.lower()))
+    negated = any(w in NEGATIONS or w.endswith("n't") for w in words)
+    # Plural-insensitive, so 'tower' / 'towers' count as overlap
+    content = frozenset(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                        for w in words - STOPWORDS - NEGATIONS)
+    return words, content, negated
+
+
+def lexical_stage(pairs: Sequence[Pair], config: CascadeConfig) -> Tuple[np.ndarray, np.ndarray]:
+    """Probabilities and decided-mask from word overlap alone (see module docstring)."""
+    memo: Dict[str, Tuple[frozenset, frozenset, bool]] = {}
+    probs = np.zeros((len(pairs), len(core.NLI_LABELS)))
+    decided = np.zeros(len(pairs), dtype=bool)
+    for k, (premise, hypothesis) in enumerate(pairs):
+        wa, ca, na = memo.get(premise) or memo.setdefault(premise, _words(premise))
+        wb, cb, nb = memo.get(hypothesis) or memo.setdefault(hypothesis, _words(hypothesis))
+        if ca and cb and len(ca & cb) / min(len(ca), len(cb)) <= config.low:
+            probs[k, core.NEUTRAL] = 1.0
+            decided[k] = True
+        elif wa and wb and na == nb and len(wa & wb) / len(wa | wb) >= config.high:
+            probs[k, core.ENTAILMENT] = 1.0
+            decided[k] = True
+    return probs, decided
+
+
+def model_stage(pairs: Sequence[Pair], config: CascadeConfig, cheap_model=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Small-model probabilities; a pair is decided when its top label is confident enough."""
+    probs = nli.predict_probs(cheap_model or core.get_model(CHEAP_NLI_SPEC), pairs)
+    return probs, probs.max(axis=1) >= config.confidence
+
+
+# -----------------------------
+# Escalation statistics
+# -----------------------------
+class CascadeStats:
+    """Pairs seen, decided per stage and escalated to the large model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.pairs = 0
+            self.decided: Dict[str, int] = {stage: 0 for stage in CASCADE_STAGES}
+            self.escalated = 0
+            self.stage_seconds: Dict[str, float] = {stage: 0.0 for stage in CASCADE_STAGES + ("large",)}
+
+    def record(self, stage: str, pairs: int, decided: int, seconds: float) -> None:
+        with self._lock:
+            if stage == "large":
+                self.escalated += pairs
+            else:
+                self.decided[stage] += decided
+            self.stage_seconds[stage] += seconds
+        core.count("cascade_pairs", pairs, stage=stage)
+
+    def add_pairs(self, n: int) -> None:
+        with self._lock:
+            self.pairs += n
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pairs": self.pairs,
+                "decided": dict(self.decided),
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / self.pairs, 4) if self.pairs else None,
+                "stage_seconds": {k: round(v, 4) for k, v in self.stage_seconds.items()},
+            }
+
+
+STATS = CascadeStats()
+
+
+def stats() -> Dict[str, Any]:
+    return STATS.to_dict()
+
+
+# -----------------------------
+# Cascade
+# -----------------------------
+def predict_probs(nli_model, pairs: Sequence[Pair], batch_size: Optional[int] = None,
+                  config: Optional[CascadeConfig] = None, cheap_model=None) -> np.ndarray:
+    """
+    nli.predict_probs through the configured cascade: (pairs, core.NLI_LABELS) probabilities,
+    from the cheapest stage that is confident about each pair, else from nli_model.
+    """
+    config = config or _config
+    if not config.stages or not pairs:
+        return nli.predict_probs(nli_model, pairs, batch_size)
+
+    STATS.add_pairs(len(pairs))
+    probs = np.zeros((len(pairs), len(core.NLI_LABELS)))
+    pending = np.arange(len(pairs))
+    for stage in config.stages:
+        todo = [pairs[i] for i in pending]
+        t0 = time.perf_counter()
+        with core.span(f"cascade.{stage}", pairs=len(todo)) as s:
+            if stage == "lexical":
+                stage_probs, decided = lexical_stage(todo, config)
+            else:
+                stage_probs, decided = model_stage(todo, config, cheap_model)
+            s.set(decided=int(decided.sum()))
+        STATS.record(stage, len(todo), int(decided.sum()), time.perf_counter() - t0)
+        probs[pending[decided]] = stage_probs[decided]
+        pending = pending[~decided]
+        if not len(pending):
+            break
+
+    if len(pending):
+        t0 = time.perf_counter()
+        probs[pending] = nli.predict_probs(nli_model, [pairs[i] for i in pending], batch_size)
+        STATS.record("large", len(pending), 0, time.perf_counter() - t0)
+    return probs
+
+
+# -----------------------------
+# Comparison against the large model alone
+# -----------------------------
+def _example_pairs() -> List[Tuple[str, List[Pair]]]:
+    """NLI pairs of the built-in ethos and logos examples, as the scorers would build them."""
+    import ethos
+    import logos
+    groups = []
+    for case in ethos.EXAMPLE_CASES:
+        src = core.split_sentences(case["source"])
+        pairs = [(c, s) for c in core.split_sentences(case["candidate"]) for s in src]
+        groups.append((f"ethos: {case['name']}", pairs))
+    for case in logos.EXAMPLE_CASES:
+        groups.append((f"logos: {case['name']}", logos.coherence_pairs(case["text"], enrich=False)))
+    return groups
+
+
+def compare(config: CascadeConfig, groups: Optional[List[Tuple[str, List[Pair]]]] = None,
+            nli_model=None, cheap_model=None, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Score each group of pairs with the large model alone and through the cascade.
+    Reports the escalation rate, median latencies and speed-up, and the drift of the
+    ethos support score (pair_scores mean) and logos coherence for each group.
+    The score cache is bypassed so every call really runs the models.
+    """
+    import cache
+    import ethos
+
+    groups = groups if groups is not None else _example_pairs()
+    nli_model = nli_model or core.get_model(ethos.NLI_MODEL_SPEC)
+    if "model" in config.stages and cheap_model is None:
+        cheap_model = core.get_model(CHEAP_NLI_SPEC)
+
+    def timed(fn: Callable[[], np.ndarray]) -> Tuple[np.ndarray, float]:
+        fn()  # warm-up
+        times, out = [], None
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        return out, float(np.median(times))
+
+    saved_cache = cache.get_cache()
+    cache.set_cache(None)
+    rows = []
+    try:
+        for name, pairs in groups:
+            full, full_s = timed(lambda: nli.predict_probs(nli_model, pairs))
+            STATS.reset()
+            fast, fast_s = timed(lambda: predict_probs(nli_model, pairs, config=config, cheap_model=cheap_model))
+            run = STATS.to_dict()
+            rows.append({
+                "group": name,
+                "pairs": len(pairs),
+                "escalation_rate": round(run["escalated"] / run["pairs"], 4) if run["pairs"] else None,
+                "full_ms": round(1000 * full_s, 2),
+                "cascade_ms": round(1000 * fast_s, 2),
+                "speedup": round(full_s / fast_s, 2) if fast_s else None,
+                "support_drift": round(float(core.pair_scores(fast).mean() - core.pair_scores(full).mean()), 4)
+                if len(pairs) else 0.0,
+                "coherence_drift": round(core.coherence_score(fast) - core.coherence_score(full), 4),
+                "max_pair_drift": round(float(np.abs(core.pair_scores(fast) - core.pair_scores(full)).max()), 4)
+                if len(pairs) else 0.0,
+            })
+    finally:
+        cache.set_cache(saved_cache)
+        STATS.reset()
+
+    total_pairs = sum(r["pairs"] for r in rows)
+    full_ms, fast_ms = sum(r["full_ms"] for r in rows), sum(r["cascade_ms"] for r in rows)
+    return {
+        "config": config._asdict(),
+        "groups": rows,
+        "pairs": total_pairs,
+        "escalation_rate": round(sum(r["escalation_rate"] * r["pairs"] for r in rows if r["pairs"]) / total_pairs, 4)
+        if total_pairs else None,
+        "speedup": round(full_ms / fast_ms, 2) if fast_ms else None,
+        "max_abs_support_drift": max((abs(r["support_drift"]) for r in rows), default=0.0),
+        "max_abs_coherence_drift": max((abs(r["coherence_drift"]) for r in rows), default=0.0),
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Compare cascade scoring against the large NLI model alone")
+    parser.add_argument("--stages", default="lexical,model", help="Comma-separated: lexical, model")
+    parser.add_argument("--low", type=float, default=_config.low)
+    parser.add_argument("--high", type=float, default=_config.high)
+    parser.add_argument("--confidence", type=float, default=_config.confidence)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    core.suppress_transformers_warnings()
+    config = CascadeConfig(parse_stages(args.stages), args.low, args.high, args.confidence)
+    report = compare(config, repeats=args.repeats)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for row in report["groups"]:
+            print(f"{row['group']:<50} pairs {row['pairs']:>4}  escalated {row['escalation_rate']}  "
+                  f"speed-up {row['speedup']}x  support drift {row['support_drift']:+.4f}  "
+                  f"coherence drift {row['coherence_drift']:+.4f}")
+        print(f"overall: escalation rate {report['escalation_rate']}, speed-up {report['speedup']}x, "
+              f"max drift support {report['max_abs_support_drift']} / coherence {report['max_abs_coherence_drift']}")
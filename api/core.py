@@ -1,37 +1,471 @@
 # core.py
-import spacy
-import nltk
-from nltk.tokenize import sent_tokenize
-from typing import List, Dict, Tuple
-from transformers import logging
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import logging as std_logging
+import json
+import functools
+import threading
 import time
-from collections import defaultdict
+import itertools
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+# torch, transformers, spaCy and NLTK are imported where they are first used, so
+# importing the app is fast and their cost moves into start-up preloading (startup.py)
+
+# -----------------------------
+# LRU cache helper
+# -----------------------------
+class LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+# Spans time named stages (split, conceptnet.lookup, nli.tokenize, nli.forward,
+# plan, assemble, ...); counters count work (pairs scored, cache hits, ...).
+# Both are aggregated in-process (served as Prometheus text by the Flask app)
+# and every finished span is handed to the attached sinks.
+#   ETHOS_METRICS=off         → spans and counters become no-ops
+#   ETHOS_TRACE_LOG=<level>   → LoggingSink, one 'ethos.trace' log line per span
+#   ETHOS_TRACE_FILE=<path>   → JSONTraceSink (Chrome trace format: chrome://tracing, Perfetto)
+logger = std_logging.getLogger("ethos")
+
+# Upper bounds (seconds) of the span duration histogram buckets
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Span:
+    """One timed stage; use as a context manager (see Instrumentation.span)."""
+    __slots__ = ("name", "attrs", "start", "duration", "thread", "parent", "_owner")
+
+    def __init__(self, owner: "Instrumentation", name: str, attrs: Dict[str, Any]):
+        self._owner = owner
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.parent: Optional[str] = None
+
+    def set(self, **attrs) -> None:
+        """Attach attributes discovered while the span runs (sizes, hit counts, ...)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        stack = self._owner._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.duration = time.perf_counter() - self.start
+        stack = self._owner._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self._owner._finish(self)
+
+
+class _NullSpan:
+    """Stand-in returned while instrumentation is disabled."""
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class LoggingSink:
+    """Logs every finished span (name, duration, attributes)."""
+
+    def __init__(self, level: int = std_logging.INFO, log: Optional[std_logging.Logger] = None):
+        self.level = level
+        self.log = log or std_logging.getLogger("ethos.trace")
+
+    def on_span(self, span: Span) -> None:
+        if self.log.isEnabledFor(self.level):
+            self.log.log(self.level, "%s %.2f ms %s", span.name, 1000 * span.duration, span.attrs)
+
+
+class JSONTraceSink:
+    """
+    Appends spans as Chrome trace 'complete' events. The file is a JSON array whose
+    closing bracket is optional for trace viewers, so it stays loadable while written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._pid = os.getpid()
+
+    def on_span(self, span: Span) -> None:
+        event = {
+            "name": span.name, "ph": "X", "pid": self._pid, "tid": span.thread,
+            "ts": round(span.start * 1e6, 1), "dur": round(span.duration * 1e6, 1),
+            "args": {k: v if isinstance(v, (int, float, str, bool)) or v is None else str(v)
+                     for k, v in span.attrs.items()},
+        }
+        line = json.dumps(event) + ",\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Instrumentation:
+    """Span timings, counters and sinks for the whole process."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.sinks: List[Any] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._spans: Dict[str, List[float]] = {}  # name → [count, total, max, *bucket counts]
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name: str, **attrs):
+        """Context manager timing one stage: `with core.span("nli.forward", batch=32): ...`"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator wrapping every call of a function in a span."""
+        def decorate(fn):
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to the counter name{labels}."""
+        if not self.enabled or not value:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            stats = self._spans.get(span.name)
+            if stats is None:
+                stats = self._spans[span.name] = [0, 0.0, 0.0] + [0] * len(SPAN_BUCKETS)
+            stats[0] += 1
+            stats[1] += span.duration
+            stats[2] = max(stats[2], span.duration)
+            for i, bound in enumerate(SPAN_BUCKETS):
+                if span.duration <= bound:
+                    stats[3 + i] += 1
+                    break
+        for sink in self.sinks:
+            try:
+                sink.on_span(span)
+            except Exception:
+                logger.exception("instrumentation sink %r failed", sink)
+
+    def add_sink(self, sink) -> None:
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink) -> None:
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-span count / total / mean / max (ms) and every counter."""
+        with self._lock:
+            spans = {name: list(stats) for name, stats in self._spans.items()}
+            counters = dict(self._counters)
+        return {
+            "spans": {
+                name: {"count": int(s[0]), "total_ms": round(1000 * s[1], 3),
+                       "mean_ms": round(1000 * s[1] / s[0], 3) if s[0] else 0.0, "max_ms": round(1000 * s[2], 3)}
+                for name, s in sorted(spans.items())
+            },
+            "counters": {
+                name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else ""): value
+                for (name, labels), value in sorted(counters.items())
+            },
+        }
+
+    def prometheus_text(self, prefix: str = "ethos") -> str:
+        """Counters and span histograms in the Prometheus text exposition format."""
+        with self._lock:
+            spans = {name: list(stats) for name, stats in self._spans.items()}
+            counters = dict(self._counters)
+
+        def fmt(labels) -> str:
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{metric}{fmt(labels)} {value:g}")
+        if spans:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, s in sorted(spans.items()):
+                cumulative = 0
+                for bound, n in zip(SPAN_BUCKETS, s[3:]):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {int(s[0])}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {s[1]:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {int(s[0])}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._spans.clear()
+
+
+def instrumentation_from_env() -> Instrumentation:
+    inst = Instrumentation(enabled=os.environ.get("ETHOS_METRICS", "").lower() not in ("0", "off", "false"))
+    level = os.environ.get("ETHOS_TRACE_LOG")
+    if level:
+        inst.add_sink(LoggingSink(std_logging.getLevelName(level.upper()) if not level.isdigit() else int(level)))
+    path = os.environ.get("ETHOS_TRACE_FILE")
+    if path:
+        inst.add_sink(JSONTraceSink(path))
+    return inst
+
+
+INSTRUMENTATION = instrumentation_from_env()
+
+
+def span(name: str, **attrs):
+    """Time a stage on the process-wide instrumentation (see Instrumentation.span)."""
+    return INSTRUMENTATION.span(name, **attrs)
+
+
+def traced(name: Optional[str] = None):
+    return INSTRUMENTATION.traced(name)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    INSTRUMENTATION.count(name, value, **labels)
+
 
 # -----------------------------
 # Sentence splitting utilities
 # -----------------------------
-def _split_sentences_spacy(text: str) -> List[str]:
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text)
-    return [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+# Modes:
+#   spacy       → en_core_web_sm dependency parser (tagger/ner/lemmatizer disabled)
+#   senter      → en_core_web_sm statistical sentence recognizer only (faster)
+#   sentencizer → blank English pipeline with rule-based sentencizer (fast, no model)
+#   regex       → split after . ! ? followed by whitespace (fastest)
+#   nltk        → punkt tokenizer
+SPLITTER_MODES = ("spacy", "senter", "sentencizer", "regex", "nltk")
+SPACY_MODEL = "en_core_web_sm"
+_SPACY_MODES = ("spacy", "senter", "sentencizer")
+_splitter_config = {"mode": os.environ.get("ETHOS_SPLITTER", "spacy")}
+_split_cache = LRUCache(maxsize=int(os.environ.get("ETHOS_SPLIT_CACHE_SIZE", "4096")))
+_punkt_ready = threading.Event()
+_REGEX_SENT_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def splitter_mode() -> str:
+    return _splitter_config["mode"]
+
+
+def configure_splitter(mode: Optional[str] = None, cache_size: Optional[int] = None) -> None:
+    """Select the default splitting mode and/or resize the memo cache."""
+    if mode is not None:
+        if mode not in SPLITTER_MODES:
+            raise ValueError(f"mode must be one of {SPLITTER_MODES}")
+        _splitter_config["mode"] = mode
+    if cache_size is not None:
+        _split_cache.maxsize = cache_size
+        _split_cache.clear()
+
+
+def clear_split_cache() -> None:
+    """Forget memoized splits (e.g. to time cold splitting)."""
+    _split_cache.clear()
+
+
+def _load_spacy(mode: str):
+    import spacy
+    if mode == "sentencizer":
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        return nlp
+    if mode == "senter":
+        nlp = spacy.load(SPACY_MODEL, exclude=["parser", "tagger", "attribute_ruler", "lemmatizer", "ner"])
+        nlp.enable_pipe("senter")
+        return nlp
+    return spacy.load(SPACY_MODEL, exclude=["tagger", "attribute_ruler", "lemmatizer", "ner"])
+
+
+def get_spacy_pipeline(mode: str = "spacy"):
+    """spaCy pipeline for a splitting mode, loaded once per process."""
+    return MODEL_REGISTRY.get(("spacy", SPACY_MODEL, mode), lambda: _load_spacy(mode))
+
+
+def _ensure_punkt() -> None:
+    if _punkt_ready.is_set():
+        return
+    import nltk
+    for resource in ("punkt", "punkt_tab"):
+        try:
+            nltk.data.find(f"tokenizers/{resource}")
+        except LookupError:
+            nltk.download(resource, quiet=True)
+    _punkt_ready.set()
+
+
+def _clean(sents: Iterable[str]) -> List[str]:
+    return [s.strip() for s in sents if s.strip()]
+
+
+def _split_sentences_spacy(text: str, mode: str = "spacy") -> List[str]:
+    doc = get_spacy_pipeline(mode)(text)
+    return _clean(sent.text for sent in doc.sents)
 
 def _split_sentences_nltk(text: str) -> List[str]:
-    nltk.download("punkt", quiet=True)
-    return [s.strip() for s in sent_tokenize(text) if s.strip()]
+    _ensure_punkt()
+    from nltk.tokenize import sent_tokenize
+    return _clean(sent_tokenize(text))
+
+def _split_sentences_regex(text: str) -> List[str]:
+    return _clean(_REGEX_SENT_BOUNDARY.split(text.strip()))
 
-def split_sentences(text: str) -> List[str]:
-    """Try spaCy first, fallback to NLTK."""
+def _split_uncached(text: str, mode: str) -> List[str]:
+    if mode == "regex":
+        return _split_sentences_regex(text)
+    if mode == "nltk":
+        return _split_sentences_nltk(text)
     try:
-        return _split_sentences_spacy(text)
+        return _split_sentences_spacy(text, mode)
     except Exception:
         return _split_sentences_nltk(text)
 
+def split_sentences(text: str, mode: Optional[str] = None, memoize: bool = True) -> List[str]:
+    """
+    Split text into sentences using the configured mode (spaCy by default,
+    falling back to NLTK). Splits are memoized, so the same text is only split once
+    (memoize=False for one-off texts such as streaming buffers).
+    """
+    mode = mode or _splitter_config["mode"]
+    if not memoize:
+        with span("split", mode=mode, chars=len(text)):
+            return _split_uncached(text, mode)
+    key = (mode, text)
+    cached = _split_cache.get(key)
+    if cached is None:
+        with span("split", mode=mode, chars=len(text)):
+            cached = tuple(_split_uncached(text, mode))
+        _split_cache.put(key, cached)
+    return list(cached)
+
+def split_sentences_batch(texts: List[str], mode: Optional[str] = None, batch_size: int = 64) -> List[List[str]]:
+    """Split many documents at once; uncached spaCy splits go through nlp.pipe."""
+    mode = mode or _splitter_config["mode"]
+    results: List[Optional[Tuple[str, ...]]] = [_split_cache.get((mode, t)) for t in texts]
+    todo = [i for i, r in enumerate(results) if r is None]
+
+    if todo and mode in _SPACY_MODES:
+        try:
+            nlp = get_spacy_pipeline(mode)
+            docs = nlp.pipe((texts[i] for i in todo), batch_size=batch_size)
+            for i, doc in zip(todo, docs):
+                results[i] = tuple(_clean(sent.text for sent in doc.sents))
+        except Exception:
+            pass
+
+    for i in todo:
+        if results[i] is None:
+            results[i] = tuple(_split_uncached(texts[i], mode))
+        _split_cache.put((mode, texts[i]), results[i])
+    return [list(r) for r in results]
+
 # -----------------------------
 # NLI helpers
 # -----------------------------
+# Canonical NLI label names; every NLI model's labels are mapped onto these
+NLI_LABELS = ("CONTRADICTION", "NEUTRAL", "ENTAILMENT")
+
+
+def canonical_label(label: str) -> str:
+    """
+    Upper-cased label, with NLI variants ('entailment', 'Entail', 'contradiction', ...)
+    mapped onto NLI_LABELS so models with different label spellings are interchangeable.
+    """
+    upper = str(label).strip().upper()
+    for name in NLI_LABELS:
+        if upper.startswith(name[:6]):
+            return name
+    return upper
+
+
 def label_probs_from_pipeline_output(entry: List[Dict[str, float]]) -> Dict[str, float]:
     """Convert pipeline outputs to dict of label → prob."""
-    return {x["label"].upper(): float(x["score"]) for x in entry}
+    return {canonical_label(x["label"]): float(x["score"]) for x in entry}
 
 def pair_score_from_probs(probs: Dict[str, float]) -> Tuple[float, str]:
     """
@@ -45,6 +479,100 @@ def pair_score_from_probs(probs: Dict[str, float]) -> Tuple[float, str]:
     dominant_label = max(probs, key=probs.get)
     return pair_score, dominant_label
 
+# -----------------------------
+# Vectorized scoring
+# -----------------------------
+# Model outputs travel as float arrays of shape (inputs, labels) with a fixed
+# column order (NLI_LABELS for NLI models); label → prob dicts are only built
+# for JSON output.
+NLI_INDEX = {label: i for i, label in enumerate(NLI_LABELS)}
+CONTRADICTION, NEUTRAL, ENTAILMENT = (NLI_INDEX[label] for label in NLI_LABELS)
+
+
+def model_labels(model, normalize: Callable[[str], str] = canonical_label) -> Optional[List[str]]:
+    """Output labels of a classification pipeline / model in class-id order (None if unknown)."""
+    config = getattr(getattr(model, "model", model), "config", None)
+    id2label = getattr(config, "id2label", None)
+    if not id2label:
+        return None
+    return [normalize(id2label[i]) for i in sorted(id2label)]
+
+
+def probs_array(rows: Iterable[Dict[str, float]], labels: Sequence[str] = NLI_LABELS) -> np.ndarray:
+    """(rows, len(labels)) array from label → prob dicts; labels outside `labels` are dropped."""
+    index = {label: j for j, label in enumerate(labels)}
+    rows = list(rows)
+    out = np.zeros((len(rows), len(labels)))
+    for r, row in enumerate(rows):
+        for label, p in row.items():
+            j = index.get(label)
+            if j is not None:
+                out[r, j] = p
+    return out
+
+
+def align_columns(probs: np.ndarray, labels: Sequence[str], target: Sequence[str] = NLI_LABELS) -> np.ndarray:
+    """Reorder the columns of probs (named by `labels`) into `target` order; missing labels are 0."""
+    probs = np.asarray(probs, dtype=np.float64).reshape(len(probs), len(labels))
+    if list(labels) == list(target):
+        return probs
+    index = {label: j for j, label in enumerate(labels)}
+    out = np.zeros((len(probs), len(target)))
+    for j, label in enumerate(target):
+        if label in index:
+            out[:, j] = probs[:, index[label]]
+    return out
+
+
+def probs_to_dicts(probs: np.ndarray, labels: Sequence[str] = NLI_LABELS) -> List[Dict[str, float]]:
+    """Label → prob dict per row (the JSON / legacy representation)."""
+    return [dict(zip(labels, row)) for row in np.asarray(probs).tolist()]
+
+
+def pair_scores(probs: np.ndarray) -> np.ndarray:
+    """pair_score_from_probs for every row of an NLI_LABELS-ordered array."""
+    probs = np.asarray(probs, dtype=np.float64).reshape(-1, len(NLI_LABELS))
+    return probs[:, ENTAILMENT] + 0.5 * probs[:, NEUTRAL]
+
+
+def coherence_score(probs: np.ndarray) -> float:
+    """Mean entailment minus mean contradiction over the rows, normalized to [0, 1] (0.5 for no rows)."""
+    probs = np.asarray(probs, dtype=np.float64).reshape(-1, len(NLI_LABELS))
+    if not len(probs):
+        return 0.5
+    raw = probs[:, ENTAILMENT].mean() - probs[:, CONTRADICTION].mean()
+    return round(float((raw + 1) / 2), 4)
+
+
+def group_means(values: np.ndarray, groups: Sequence[Sequence[int]], default: float = 0.0) -> np.ndarray:
+    """
+    Mean of values[ids] for every id list in groups, without a Python loop per value:
+    shape (len(groups),) for 1-d values, (len(groups), k) for (n, k) values.
+    Empty groups get `default`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.fromiter((len(g) for g in groups), dtype=np.intp, count=len(groups))
+    ids = np.fromiter(itertools.chain.from_iterable(groups), dtype=np.intp, count=int(lengths.sum()))
+    owner = np.repeat(np.arange(len(groups)), lengths)
+    picked = values[ids]
+    if values.ndim == 1:
+        sums = np.bincount(owner, weights=picked, minlength=len(groups))
+        counts = lengths
+    else:
+        sums = np.zeros((len(groups), values.shape[1]))
+        for j in range(values.shape[1]):
+            sums[:, j] = np.bincount(owner, weights=picked[:, j], minlength=len(groups))
+        counts = lengths[:, None]
+    means = sums / np.maximum(counts, 1)
+    means[lengths == 0] = default
+    return means
+
+# -----------------------------
+# Batching defaults
+# -----------------------------
+# Inputs per forward pass for the batched pipeline calls (formality, emotion)
+BATCH_SIZE = int(os.environ.get("ETHOS_BATCH_SIZE", "16"))
+
 # -----------------------------
 # Timing helper
 # -----------------------------
@@ -52,13 +580,193 @@ def elapsed_time(t0: float) -> float:
     return round(time.time() - t0, 3)
 
 # -----------------------------
-# Default dict helper for dynamic labels
+# Transformers logging silence
 # -----------------------------
-def dynamic_label_dict() -> defaultdict:
-    return defaultdict(float)
+def suppress_transformers_warnings():
+    from transformers import logging
+    logging.set_verbosity_error()
 
 # -----------------------------
-# Transformers logging silence
+# Model registry
 # -----------------------------
-def suppress_transformers_warnings():
-    logging.set_verbosity_error()
\ No newline at end of file
+class ModelSpec(NamedTuple):
+    """Hashable description of a model: task + model name + task options + inference backend."""
+    task: str
+    model: str
+    options: Tuple[Tuple[str, Any], ...] = ()
+    backend: str = "pytorch"  # see backends.py: pytorch | int8 | onnx
+
+    @classmethod
+    def of(cls, task: str, model: str, **options) -> "ModelSpec":
+        return cls(task, model, tuple(sorted(options.items())))
+
+    def configured(self, prefix: str) -> "ModelSpec":
+        """
+        Apply environment overrides: <prefix>_MODEL swaps the model (e.g. a smaller NLI
+        checkpoint), <prefix>_BACKEND (or ETHOS_BACKEND for all scorers) picks the backend.
+        """
+        return self._replace(
+            model=os.environ.get(f"{prefix}_MODEL", self.model),
+            backend=os.environ.get(f"{prefix}_BACKEND", os.environ.get("ETHOS_BACKEND", self.backend)),
+        )
+
+    def with_backend(self, backend: str) -> "ModelSpec":
+        return self._replace(backend=backend)
+
+    def load(self):
+        if self.backend == "pytorch":
+            from transformers import pipeline
+            return pipeline(self.task, model=self.model, **dict(self.options))
+        import backends
+        return backends.load(self)
+
+
+def model_nbytes(obj) -> int:
+    """Bytes held by the parameters and buffers of a pipeline / torch module."""
+    module = getattr(obj, "model", obj)
+    explicit = getattr(module, "memory_bytes", None)  # set by non-pytorch backends
+    if explicit is not None:
+        return int(explicit)
+    if not hasattr(module, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in module.parameters())
+    if hasattr(module, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+    return int(total)
+
+
+class ModelRegistry:
+    """
+    Process-wide, thread-safe cache of loaded models.
+    Models are loaded lazily on first use (once, even under concurrent callers)
+    and optionally evicted least-recently-used when max_models / max_bytes is exceeded.
+    """
+
+    def __init__(self, max_models: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._sizes: Dict[Any, int] = {}
+        self._lock = threading.RLock()
+        self._load_locks: Dict[Any, threading.Lock] = {}
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def get(self, key, loader: Optional[Callable[[], Any]] = None):
+        """Return the model for key, loading it with loader (or key.load()) on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return self._entries[key]
+            with span("model.load", model=_key_name(key)):
+                obj = loader() if loader is not None else key.load()
+            self.put(key, obj)
+            with self._lock:
+                self.stats["loads"] += 1
+                self._load_locks.pop(key, None)
+        return obj
+
+    def put(self, key, obj) -> None:
+        """Register an already-built model under key (replacing any previous one)."""
+        size = model_nbytes(obj)
+        with self._lock:
+            self._entries[key] = obj
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._evict(keep=key)
+
+    def evict(self, key) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            del self._entries[key]
+            self._sizes.pop(key, None)
+            self.stats["evictions"] += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def configure(self, max_models: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        with self._lock:
+            self.max_models = max_models
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self, keep=None) -> None:
+        def over_limit():
+            if self.max_models is not None and len(self._entries) > self.max_models:
+                return True
+            if self.max_bytes is not None and sum(self._sizes.values()) > self.max_bytes:
+                return True
+            return False
+
+        for key in list(self._entries):
+            if not over_limit():
+                break
+            if key != keep:
+                self.evict(key)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def keys(self) -> List[Any]:
+        with self._lock:
+            return list(self._entries)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Parameter + buffer bytes per loaded model, most recently used last."""
+        with self._lock:
+            return {_key_name(k): self._sizes.get(k, 0) for k in self._entries}
+
+    def warm_up(self, specs: Iterable[ModelSpec], dummy_input: str = "Warm-up sentence.") -> Dict[str, float]:
+        """Load each spec and run one dummy inference. Returns seconds spent per model."""
+        timings = {}
+        for spec in specs:
+            t0 = time.time()
+            model = self.get(spec)
+            model(dummy_input)
+            timings[_key_name(spec)] = elapsed_time(t0)
+        return timings
+
+
+def _key_name(key) -> str:
+    if isinstance(key, ModelSpec):
+        suffix = "" if key.backend == "pytorch" else f"[{key.backend}]"
+        return f"{key.task}:{key.model}{suffix}"
+    return str(key)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+MODEL_REGISTRY = ModelRegistry(
+    max_models=_env_int("ETHOS_MAX_MODELS"),
+    max_bytes=_env_int("ETHOS_MAX_MODEL_BYTES"),
+)
+
+
+def get_model(spec: ModelSpec):
+    """Shared (loaded once per process) model for spec."""
+    return MODEL_REGISTRY.get(spec)
+
+
+def warm_up(specs: Iterable[ModelSpec]) -> Dict[str, float]:
+    return MODEL_REGISTRY.warm_up(specs)
@@ -1,74 +1,116 @@
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Tuple
-from transformers import pipeline, logging
+from typing import List, Dict, Optional
 import time
+import cache
+import cascade
 import core
+import nli
+import scheduler
+import sources
+
+NLI_MODEL_SPEC = nli.scorer_spec(core.ModelSpec.of(
+    "text-classification", "roberta-large-mnli", top_k=None
+).configured("ETHOS_NLI"))
+FORMALITY_MODEL_SPEC = core.ModelSpec.of(
+    "text-classification", "s-nlp/roberta-base-formality-ranker", top_k=1
+).configured("ETHOS_FORMALITY")
 
 
 # -----------------------------
 # Factual Consistency (Ethos)
 # -----------------------------
-def compute_factual_consistency(source_text: str, candidate_text: str, nli_model=None) -> float:
+def _support_scores(source: sources.Source, src_sents: List[str], cand_sents: List[str], nli_model,
+                    top_k: Optional[int], method: str, batch_size: Optional[int]) -> List[np.ndarray]:
+    """NLI support scores per candidate sentence against its (retrieved) source sentences."""
+    with core.span("ethos.retrieval", method=method, sources=len(src_sents), candidates=len(cand_sents)):
+        neighbours = sources.source_index(source, src_sents, method).top_k(cand_sents, top_k)
+    pairs = [(cand, src_sents[j]) for cand, idx in zip(cand_sents, neighbours) for j in idx]
+    scores = core.pair_scores(cascade.predict_probs(nli_model, pairs, batch_size))
+    return np.split(scores, np.cumsum([len(idx) for idx in neighbours])[:-1])
+
+
+def compute_factual_consistency(source_text: sources.Source, candidate_text: str, nli_model=None,
+                                batch_size: Optional[int] = None, top_k: Optional[int] = None,
+                                aggregate: str = "mean", retrieval_method: str = "tfidf") -> float:
     """
     Compute factual consistency score between source and candidate.
+    All (candidate, source) sentence pairs are scored in batches by nli.NLIEngine.
+    top_k        → only score each candidate sentence against its k most similar source sentences
+    aggregate    → 'mean' over all scored pairs, or 'max' = mean of per-candidate-sentence max support
+    source_text may be a registered sources.SourceSession (not re-split or re-indexed).
     """
+    if aggregate not in ("mean", "max"):
+        raise ValueError("aggregate must be 'mean' or 'max'")
     core.suppress_transformers_warnings()
     if nli_model is None:
-        nli_model = pipeline("text-classification", model="roberta-large-mnli", top_k=None)
+        nli_model = core.get_model(NLI_MODEL_SPEC)
 
-    src_sents = core.split_sentences(source_text)
+    src_sents = sources.source_sentences(source_text)
     cand_sents = core.split_sentences(candidate_text)
 
     if not src_sents or not cand_sents:
         return 0.0
 
-    pair_scores = []
-    for cand in cand_sents:
-        for src in src_sents:
-            output = nli_model(f"{cand} </s></s> {src}")[0]
-            probs = core.label_probs_from_pipeline_output(output)
-            score, _ = core.pair_score_from_probs(probs)
-            pair_scores.append(score)
-
-    return float(np.mean(pair_scores))
+    per_candidate = _support_scores(source_text, src_sents, cand_sents, nli_model, top_k, retrieval_method, batch_size)
+    if aggregate == "max":
+        return float(np.mean([scores.max() for scores in per_candidate]))
+    return float(np.concatenate(per_candidate).mean())
 
 
 # -----------------------------
 # Formality
 # -----------------------------
+def formality_from_result(result: Dict) -> float:
+    """Formality ranker output → score in [0,1], inverted for 'informal' predictions."""
+    label = result["label"].lower()
+    score = float(result["score"])
+
+    # Invert if the predicted label is 'informal'
+    if label == "informal":
+        score = 1 - score
+
+    return max(0.0, min(1.0, score))
+
+
+def _formality_batch(formality_model, sentences: List[str], batch_size: Optional[int] = None) -> List[float]:
+    def compute(todo):
+        with core.span("formality.forward", inputs=len(todo)):
+            outputs = formality_model(todo, batch_size=batch_size or core.BATCH_SIZE)
+        core.count("formality_inputs_scored", len(todo))
+        return [formality_from_result(out[0] if isinstance(out, list) else out) for out in outputs]
+
+    return cache.cached_map("formality", formality_model, sentences, compute)
+
+
+def formality_scores(sentences: List[str], formality_model=None, batch_size: Optional[int] = None) -> List[float]:
+    """
+    Adjusted formality score per sentence, in one batched pipeline call
+    (shared with concurrent callers when micro-batching is enabled).
+    """
+    if not sentences:
+        return []
+    if formality_model is None:
+        formality_model = core.get_model(FORMALITY_MODEL_SPEC)
+    if batch_size is not None:
+        return _formality_batch(formality_model, list(sentences), batch_size)
+    return scheduler.run("formality", formality_model, _formality_batch, list(sentences))
+
+
 def compute_formality(text: str, formality_model=None, verbose: bool = False) -> float:
     """
     Compute an average formality score (0 to 1) using the pretrained formality ranker.
     Higher → more formal writing.
     Automatically inverts scores for 'informal' predictions.
     """
-    if formality_model is None:
-        formality_model = pipeline(
-            "text-classification",
-            model="s-nlp/roberta-base-formality-ranker",
-            top_k=1
-        )
-
     sentences = core.split_sentences(text)
     if not sentences:
         return 0.0
 
-    scores = []
-    for s in sentences:
-        result = formality_model(s)[0][0]
-        label = result["label"].lower()
-        score = float(result["score"])
+    scores = formality_scores(sentences, formality_model)
 
-        # Invert if the predicted label is 'informal'
-        if label == "informal":
-            score = 1 - score
-
-        score = max(0.0, min(1.0, score))
-        scores.append(score)
-
-        if verbose:
-            print(f"[{label}] {s} → adjusted_score={score:.3f}")
+    if verbose:
+        for s, score in zip(sentences, scores):
+            print(f"{s} → adjusted_score={score:.3f}")
 
     return float(np.mean(scores))
 
@@ -76,48 +118,52 @@ def compute_formality(text: str, formality_model=None, verbose: bool = False) ->
 # -----------------------------
 # Combined Evaluation
 # -----------------------------
-def analyze_ethos_formality(source: str, candidate: str):
+def analyze_ethos_formality(source: str, candidate: str, verbose: bool = False):
     start = time.time()
-    print("---- Ethos & Formality Evaluation ----")
-    print("Source:", source)
-    print("Candidate:", candidate)
-    print("--------------------------------------")
-
-    ethos_score = compute_factual_consistency(source, candidate)
-    formality_score = compute_formality(candidate)
+    if verbose:
+        print("---- Ethos & Formality Evaluation ----")
+        print("Source:", source)
+        print("Candidate:", candidate)
+        print("--------------------------------------")
+
+    with core.span("ethos.analyze"):
+        ethos_score = compute_factual_consistency(source, candidate)
+        formality_score = compute_formality(candidate)
     elapsed = core.elapsed_time(start)
 
-    print(f"Ethos (Factual Consistency) Score: {ethos_score:.3f}")
-    print(f"Formality Score: {formality_score:.3f}")
-    print(f"Runtime: {elapsed} s")
+    if verbose:
+        print(f"Ethos (Factual Consistency) Score: {ethos_score:.3f}")
+        print(f"Formality Score: {formality_score:.3f}")
+        print(f"Runtime: {elapsed} s")
     return (0.6*ethos_score+0.4*formality_score,ethos_score, formality_score)
 
 
 # -----------------------------
 # Example test cases
 # -----------------------------
+EXAMPLE_CASES = [
+    {
+        "name": "Highly consistent & formal",
+        "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
+        "candidate": "The Eiffel Tower, situated in Paris, was completed in 1889."
+    },
+    {
+        "name": "Consistent but informal",
+        "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
+        "candidate": "Yeah, that big tower in Paris was built in 1889!"
+    },
+    {
+        "name": "Inconsistent & informal",
+        "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
+        "candidate": "The Eiffel Tower is in London, dude!"
+    }
+]
+
+
 if __name__ == "__main__":
-    tests = [
-        {
-            "name": "Highly consistent & formal",
-            "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
-            "candidate": "The Eiffel Tower, situated in Paris, was completed in 1889."
-        },
-        {
-            "name": "Consistent but informal",
-            "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
-            "candidate": "Yeah, that big tower in Paris was built in 1889!"
-        },
-        {
-            "name": "Inconsistent & informal",
-            "source": "The Eiffel Tower is located in Paris. It was completed in 1889.",
-            "candidate": "The Eiffel Tower is in London, dude!"
-        }
-    ]
-
-    for t in tests:
+    for t in EXAMPLE_CASES:
         print(f"\n=== Test: {t['name']} ===")
-        result = analyze_ethos_formality(t["source"], t["candidate"])
+        result = analyze_ethos_formality(t["source"], t["candidate"], verbose=True)
         print("Expected trends:")
         print(" - High factual consistency → Ethos near 1.0")
         print(" - Informal tone → Formality near 0.2–0.4")
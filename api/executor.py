@@ -0,0 +1,164 @@
+"""
+executor.py
+Run the independent ethos / logos / pathos scorers concurrently and time each one.
+
+Modes (ETHOS_EXECUTOR):
+ - serial  → one after another (reference behaviour)
+ - thread  → thread pool; torch releases the GIL inside kernels so dimensions overlap.
+             Each worker thread sets its own intra-op thread count (OpenMP thread
+             counts are per calling thread).
+ - process → process pool; each worker sets its torch thread counts and preloads
+             the models once in its initializer. Tasks must be picklable, so a registered
+             SourceSession cannot be passed (send its text instead).
+
+One pool serves every caller, so it is sized for `concurrency` analyses running at once
+(three dimension tasks each); with fewer workers, concurrent requests queue behind each
+other. The torch threads of all workers together stay within the CPU budget
+(intra_op_threads_for). With micro-batching on (scheduler.py) the forward passes run on
+the batcher threads, which split the same budget by the same rule.
+
+Parallelism knobs:
+ - concurrency      (ETHOS_EXECUTOR_CONCURRENCY) → analyses served at once (default 4)
+ - max_workers      (ETHOS_EXECUTOR_WORKERS)  → inter-task parallelism (default 3 × concurrency)
+ - intra_op_threads (ETHOS_INTRA_OP_THREADS)  → torch threads inside each task (default budget // max_workers)
+ - inter_op_threads (ETHOS_INTER_OP_THREADS)  → torch inter-op pool size (process-wide, set once)
+ - ETHOS_TORCH_THREADS                        → CPU budget of the process (default cpus; serve.py
+                                                sets each worker's share)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import core
+
+EXECUTOR_MODES = ("serial", "thread", "process")
+DIMENSIONS = 3  # ethos, logos and pathos: the tasks one analysis runs at once
+DEFAULT_CONCURRENCY = 4
+
+# name → (callable, args) or (callable, args, kwargs)
+Tasks = Dict[str, Tuple]
+
+
+def _set_torch_threads(intra_op_threads: Optional[int], inter_op_threads: Optional[int]) -> None:
+    import torch
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            pass  # can only be set once, before any inter-op work has started
+
+
+def cpu_budget() -> int:
+    """Cores the inference threads of this process share."""
+    return _env_int("ETHOS_TORCH_THREADS") or os.cpu_count() or 1
+
+
+def intra_op_threads_for(parallel: int) -> int:
+    """Torch threads for each of `parallel` threads running forward passes at once, within the CPU budget."""
+    return max(1, cpu_budget() // max(parallel, 1))
+
+
+def _init_process_worker(intra_op_threads, inter_op_threads, preload_specs) -> None:
+    _set_torch_threads(intra_op_threads, inter_op_threads)
+    if preload_specs:
+        core.warm_up(preload_specs)
+
+
+def _timed(fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def _unpack(task: Tuple) -> Tuple[Callable, tuple, dict]:
+    fn, args = task[0], tuple(task[1]) if len(task) > 1 else ()
+    kwargs = task[2] if len(task) > 2 else {}
+    return fn, args, kwargs
+
+
+def _reject_sessions(tasks: "Tasks") -> None:
+    """A SourceSession holds locks and model-bound indexes and cannot be sent to a worker process."""
+    import sources
+    for name, task in tasks.items():
+        _, args, kwargs = _unpack(task)
+        if any(isinstance(arg, sources.SourceSession) for arg in (*args, *kwargs.values())):
+            raise TypeError(f"task '{name}': a SourceSession cannot be passed to the process executor; "
+                            "pass the source text or use the thread executor")
+
+
+class ScorerExecutor:
+    """Runs a dict of named tasks and reports the wall time of each."""
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None,
+                 intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None,
+                 preload_specs: Iterable[core.ModelSpec] = (), concurrency: int = DEFAULT_CONCURRENCY):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"mode must be one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.concurrency = concurrency
+        self.max_workers = max_workers or DIMENSIONS * self.concurrency
+        # Every worker may run a forward pass at once: together they must not oversubscribe the cores
+        self.intra_op_threads = intra_op_threads or intra_op_threads_for(self.max_workers)
+        self.inter_op_threads = inter_op_threads
+        self.preload_specs = list(preload_specs)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == "thread":
+                _set_torch_threads(None, self.inter_op_threads)
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_set_torch_threads,
+                    initargs=(self.intra_op_threads, None),
+                )
+            elif self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_process_worker,
+                    initargs=(self.intra_op_threads, self.inter_op_threads, self.preload_specs),
+                )
+        return self._pool
+
+    def run(self, tasks: Tasks) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Execute every task; returns (results by name, seconds by name).
+        Timings also include 'total' (wall time of the whole run).
+        """
+        t0 = time.perf_counter()
+        results, timings = {}, {}
+        if self.mode == "serial":
+            for name, task in tasks.items():
+                results[name], timings[name] = _timed(*_unpack(task))
+        else:
+            if self.mode == "process":
+                _reject_sessions(tasks)
+            pool = self._get_pool()
+            futures = {name: pool.submit(_timed, *_unpack(task)) for name, task in tasks.items()}
+            for name, future in futures.items():
+                results[name], timings[name] = future.result()
+        timings["total"] = time.perf_counter() - t0
+        return results, {k: round(v, 4) for k, v in timings.items()}
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def executor_from_env(preload_specs: Iterable[core.ModelSpec] = ()) -> ScorerExecutor:
+    return ScorerExecutor(
+        mode=os.environ.get("ETHOS_EXECUTOR", "thread"),
+        max_workers=_env_int("ETHOS_EXECUTOR_WORKERS"),
+        intra_op_threads=_env_int("ETHOS_INTRA_OP_THREADS"),
+        inter_op_threads=_env_int("ETHOS_INTER_OP_THREADS"),
+        preload_specs=preload_specs,
+        concurrency=_env_int("ETHOS_EXECUTOR_CONCURRENCY") or DEFAULT_CONCURRENCY,
+    )
@@ -2,23 +2,68 @@
 final.py
 CLI + modular interface for analyzing a text for Ethos, Logos, Pathos.
 
+Environment:
+ ETHOS_LOGOS_PAIR_MODE=<mode>   logos pairing per sentence (default full; see logos.generate_sentence_pairs)
+
 Dependencies:
  - ethos.py
  - logos.py
  - pathos.py
 """
 import os
+import glob
+import hashlib
+import time
 import argparse
 import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import cache
+import cascade
+import core
+import executor as executor_mod
+import knowledge
+import nli
 import ethos
 import logos
 import pathos
+import sources
+
+# Every model analyze_text / analyze_text_sentencewise may touch (the NLI
+# specs coincide when ETHOS_SHARED_NLI is set)
+MODEL_SPECS = list(dict.fromkeys([
+    ethos.NLI_MODEL_SPEC,
+    ethos.FORMALITY_MODEL_SPEC,
+    logos.NLI_MODEL_SPEC,
+    pathos.EMOTION_MODEL_SPEC,
+]))
+
+
+def preload_specs() -> List[core.ModelSpec]:
+    """MODEL_SPECS plus the cascade's small NLI model while its 'model' stage is on (see cascade.py)."""
+    if "model" in cascade.get_config().stages:
+        return list(dict.fromkeys(MODEL_SPECS + [cascade.CHEAP_NLI_SPEC]))
+    return list(MODEL_SPECS)
+
+
+# Pairing strategy for the per-sentence logos pairs (see logos.generate_sentence_pairs)
+LOGOS_PAIR_MODE = os.environ.get("ETHOS_LOGOS_PAIR_MODE", "full")
+
+
+def warm_up_models():
+    """
+    Load every model into the shared registry and run one dummy inference each,
+    so the first real request does not pay the loading cost.
+    Returns seconds spent per model.
+    """
+    return core.warm_up(preload_specs())
 
 
 # -----------------------------
 # Aggregate scoring functions
 # -----------------------------
-def compute_ethos_score(source_text: str, candidate_text: str, nli_model=None, formality_model=None):
+def compute_ethos_score(source_text: sources.Source, candidate_text: str, nli_model=None, formality_model=None):
     """
     Weighted Ethos: 0.6 factual_consistency + 0.4 formality
     """
@@ -45,14 +90,36 @@ def compute_pathos_score(text: str, emotion_model=None):
 # -----------------------------
 # Full analysis function
 # -----------------------------
-def analyze_text(source_text: str, candidate_text: str):
+_executor: Optional[executor_mod.ScorerExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> executor_mod.ScorerExecutor:
+    """Process-wide scorer executor configured from the environment (see executor.py)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = executor_mod.executor_from_env(preload_specs=preload_specs())
+        return _executor
+
+
+def analyze_text(source_text: sources.Source, candidate_text: str,
+                 executor: Optional[executor_mod.ScorerExecutor] = None, report_timings: bool = False):
     """
-    Returns a dictionary with ethos, logos, pathos scores
+    Returns a dictionary with ethos, logos, pathos scores.
+    The three dimensions run concurrently on the executor; with report_timings
+    the per-dimension wall times are added under 'timings'.
     """
     result = {}
-    ethos_score, factual, formal = compute_ethos_score(source_text, candidate_text)
-    logos_score = compute_logos_score(candidate_text)
-    pathos_score = compute_pathos_score(candidate_text)
+    with core.span("analyze_text", chars=len(candidate_text)):
+        scores, timings = (executor or get_executor()).run({
+            "ethos": (compute_ethos_score, (source_text, candidate_text)),
+            "logos": (compute_logos_score, (candidate_text,)),
+            "pathos": (compute_pathos_score, (candidate_text,)),
+        })
+    ethos_score, factual, formal = scores["ethos"]
+    logos_score = scores["logos"]
+    pathos_score = scores["pathos"]
 
     result["ethos"] = {
         "score": ethos_score,
@@ -61,56 +128,475 @@ def analyze_text(source_text: str, candidate_text: str):
     }
     result["logos"] = round(logos_score, 4)
     result["pathos"] = round(pathos_score, 4)
+    if report_timings:
+        result["timings"] = timings
     return result
 
-def analyze_text_sentencewise(source_text: str, candidate_text: str):
+# -----------------------------
+# Single-pass sentence-level pipeline
+# -----------------------------
+# Sentence-wise analysis is done in three phases so every model runs once per document:
+#   plan     → split source/candidate once and collect every model input
+#   run      → one batched call per model over its unique inputs
+#   assemble → rebuild the per-sentence and overall JSON from the outputs
+WORK_KINDS = ("ethos_nli", "formality", "logos_nli", "emotion")
+
+
+class WorkList:
+    """Unique inputs for one model; add() returns each input's position in the batch."""
+
+    def __init__(self):
+        self.inputs: List[Any] = []
+        self._index: Dict[Any, int] = {}
+
+    def add(self, items) -> List[int]:
+        ids = []
+        for item in items:
+            idx = self._index.get(item)
+            if idx is None:
+                idx = self._index[item] = len(self.inputs)
+                self.inputs.append(item)
+            ids.append(idx)
+        return ids
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+
+def new_work() -> Dict[str, WorkList]:
+    return {kind: WorkList() for kind in WORK_KINDS}
+
+
+def plan_sentences(source_text: sources.Source, sentences: List[str],
+                   work: Dict[str, WorkList]) -> List[Dict[str, Any]]:
     """
-    Returns a dictionary with:
-    - overall scores
-    - sentence-wise breakdown for each sentence in candidate_text
+    Register the model inputs each candidate sentence needs; returns one plan item per sentence.
+    source_text may be a registered sources.SourceSession (its sentences are reused).
     """
-    sentences = ethos.core.split_sentences(candidate_text)
-    sentence_results = []
-
+    src_sents = sources.source_sentences(source_text)
+    logos.prefetch_conceptnet(sentences)
+    plan = []
     for sent in sentences:
-        ethos_score, factual, formal = ethos.analyze_ethos_formality(source_text, sent)
-        logos_score = logos.compute_logical_coherence(sent)
-        pathos_score = pathos.compute_pathos_score(sent)
-
-        sentence_results.append({
+        sub_sents = core.split_sentences(sent)
+        plan.append({
             "sentence": sent,
-            "ethos": {
-                "score": ethos_score,
-                "factual_consistency": round(factual, 4),
-                "formality": round(formal, 4)
-            },
-            "logos": round(logos_score, 4),
-            "pathos": round(pathos_score, 4)
+            "ethos_nli": work["ethos_nli"].add((c, s) for c in sub_sents for s in src_sents),
+            "formality": work["formality"].add(sub_sents),
+            "logos_nli": work["logos_nli"].add(logos.coherence_pairs(sent, mode=LOGOS_PAIR_MODE)),
+            "emotion": work["emotion"].add(sub_sents),
         })
+    return plan
+
+
+def _ethos_pair_scores(model, pairs):
+    return core.pair_scores(cascade.predict_probs(model, pairs))
+
+
+# kind → (default model, batched scorer(model, inputs) → outputs). Outputs are arrays
+# with one row per input: pair support scores, formality scores, NLI probabilities
+# (core.NLI_LABELS columns) and emotion probabilities (pathos.EMOTION_LABELS columns)
+_RUNNERS = {
+    "ethos_nli": (ethos.NLI_MODEL_SPEC, _ethos_pair_scores),
+    "formality": (ethos.FORMALITY_MODEL_SPEC, lambda model, xs: np.asarray(ethos.formality_scores(xs, model))),
+    "logos_nli": (logos.NLI_MODEL_SPEC, cascade.predict_probs),
+    "emotion": (pathos.EMOTION_MODEL_SPEC, lambda model, xs: pathos.emotion_probs(xs, model)),
+}
+_OUTPUT_WIDTHS = {"ethos_nli": None, "formality": None,
+                  "logos_nli": len(core.NLI_LABELS), "emotion": len(pathos.EMOTION_LABELS)}
+
+
+def empty_output(kind: str) -> np.ndarray:
+    width = _OUTPUT_WIDTHS[kind]
+    return np.zeros(0) if width is None else np.zeros((0, width))
+
+
+def run_kind(kind: str, inputs: List[Any], models: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """Run one model over all of its inputs (loads the model only if there is work)."""
+    if not inputs:
+        return empty_output(kind)
+    spec, runner = _RUNNERS[kind]
+    model = (models or {}).get(kind) or core.get_model(spec)
+    with core.span(f"run.{kind}", inputs=len(inputs)):
+        return runner(model, inputs)
+
+
+# Models grouped by rhetorical dimension; dimensions run concurrently
+DIMENSION_KINDS = {
+    "ethos": ("ethos_nli", "formality"),
+    "logos": ("logos_nli",),
+    "pathos": ("emotion",),
+}
+# Same, when ethos and logos share one NLI model: both NLI kinds go in one call
+SHARED_NLI_KINDS = {
+    "nli": ("ethos_nli", "logos_nli"),
+    "formality": ("formality",),
+    "pathos": ("emotion",),
+}
+
+
+def nli_shared(models: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether the ethos and logos NLI work runs on the same model."""
+    models = models or {}
+    if "ethos_nli" in models or "logos_nli" in models:
+        return models.get("ethos_nli") is models.get("logos_nli")
+    return ethos.NLI_MODEL_SPEC == logos.NLI_MODEL_SPEC
+
+
+def run_shared_nli(ethos_pairs: List[Any], logos_pairs: List[Any],
+                   models: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """Both scorers' NLI pairs in one deduplicated batched call on the shared model."""
+    merged = WorkList()
+    ethos_ids, logos_ids = merged.add(ethos_pairs), merged.add(logos_pairs)
+    if not merged.inputs:
+        return {"ethos_nli": empty_output("ethos_nli"), "logos_nli": empty_output("logos_nli")}
+    model = (models or {}).get("ethos_nli") or core.get_model(ethos.NLI_MODEL_SPEC)
+    with core.span("run.shared_nli", inputs=len(merged.inputs)):
+        probs = cascade.predict_probs(model, merged.inputs)
+    return {
+        "ethos_nli": core.pair_scores(probs[np.asarray(ethos_ids, dtype=np.intp)]),
+        "logos_nli": probs[np.asarray(logos_ids, dtype=np.intp)],
+    }
 
-    # Compute overall scores for candidate text
-    overall = {}
 
-    # Compute averages for ethos subcomponents
-    avg_ethos_score = sum(r["ethos"]["score"] for r in sentence_results) / len(sentence_results)
-    avg_factual = sum(r["ethos"]["factual_consistency"] for r in sentence_results) / len(sentence_results)
-    avg_formal = sum(r["ethos"]["formality"] for r in sentence_results) / len(sentence_results)
+def run_kinds(inputs_by_kind: Dict[str, List[Any]], models: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    core.suppress_transformers_warnings()
+    if "ethos_nli" in inputs_by_kind and "logos_nli" in inputs_by_kind and nli_shared(models):
+        inputs_by_kind = dict(inputs_by_kind)
+        outputs = run_shared_nli(inputs_by_kind.pop("ethos_nli"), inputs_by_kind.pop("logos_nli"), models)
+        outputs.update((kind, run_kind(kind, inputs, models)) for kind, inputs in inputs_by_kind.items())
+        return outputs
+    return {kind: run_kind(kind, inputs, models) for kind, inputs in inputs_by_kind.items()}
 
-    # Add overall ethos, logos, pathos
-    overall["ethos"] = {
-        "score": round(avg_ethos_score, 4),
-        "factual_consistency": round(avg_factual, 4),
-        "formality": round(avg_formal, 4)
+
+def run_work(work: Dict[str, WorkList], models: Optional[Dict[str, Any]] = None,
+             executor: Optional[executor_mod.ScorerExecutor] = None,
+             timings: Optional[Dict[str, float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Execute each model once over its collected inputs, one executor task per dimension.
+    The executor's wall times of this run are added to timings when given.
+    """
+    groups = SHARED_NLI_KINDS if nli_shared(models) else DIMENSION_KINDS
+    tasks = {
+        dim: (run_kinds, ({kind: work[kind].inputs for kind in kinds}, models))
+        for dim, kinds in groups.items()
     }
-    overall["logos"] = round(sum(r["logos"] for r in sentence_results) / len(sentence_results), 4)
-    overall["pathos"] = round(sum(r["pathos"] for r in sentence_results) / len(sentence_results), 4)
+    results, run_timings = (executor or get_executor()).run(tasks)
+    if timings is not None:
+        for name, seconds in run_timings.items():
+            timings[name] = round(timings.get(name, 0.0) + seconds, 4)
+    return {kind: outputs for dim_outputs in results.values() for kind, outputs in dim_outputs.items()}
+
+
+def plan_components(plan: List[Dict[str, Any]], outputs: Dict[str, np.ndarray]) -> List[Dict[str, float]]:
+    """
+    Unrounded per-sentence scores (factual, formality, logos, pathos) for every plan item,
+    averaged over each sentence's output rows in one vectorized pass per kind.
+    """
+    if not plan:
+        return []
+    factual = core.group_means(outputs["ethos_nli"], [item["ethos_nli"] for item in plan])
+    formality = core.group_means(outputs["formality"], [item["formality"] for item in plan])
+    logos_probs = core.group_means(outputs["logos_nli"], [item["logos_nli"] for item in plan])
+    emotions = core.group_means(outputs["emotion"], [item["emotion"] for item in plan])
+    # Pairless sentences average to zeros, i.e. the neutral 0.5 for logos and pathos
+    coherence = (logos_probs[:, core.ENTAILMENT] - logos_probs[:, core.CONTRADICTION] + 1) / 2
+    columns = zip(factual.tolist(), formality.tolist(), coherence.tolist(),
+                  pathos.pathos_scores(emotions).tolist())
+    return [{"factual": f, "formality": fm, "logos": lg, "pathos": pt} for f, fm, lg, pt in columns]
+
+
+def sentence_result(sentence: str, components: Dict[str, float]) -> Dict[str, Any]:
+    """Per-sentence result, identical in shape to the original sentence-by-sentence loop."""
+    factual, formal = components["factual"], components["formality"]
+    ethos_score = 0.6 * factual + 0.4 * formal
+
+    return {
+        "sentence": sentence,
+        "ethos": {
+            "score": ethos_score,
+            "factual_consistency": round(factual, 4),
+            "formality": round(formal, 4)
+        },
+        "logos": round(components["logos"], 4),
+        "pathos": round(components["pathos"], 4)
+    }
+
+
+def assemble_plan(plan: List[Dict[str, Any]], outputs: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Per-sentence results for a whole plan (see plan_components)."""
+    return [sentence_result(item["sentence"], components)
+            for item, components in zip(plan, plan_components(plan, outputs))]
+
+
+def overall_from_sentences(sentence_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Average the sentence-wise scores into the 'overall' block."""
+    if not sentence_results:
+        means = [0.0] * 5
+    else:
+        # One (sentences, 5) matrix: ethos score, factual, formality, logos, pathos
+        means = np.array([(r["ethos"]["score"], r["ethos"]["factual_consistency"], r["ethos"]["formality"],
+                           r["logos"], r["pathos"]) for r in sentence_results]).mean(axis=0).tolist()
+    avg_ethos_score, avg_factual, avg_formal, avg_logos, avg_pathos = means
 
     return {
+        "ethos": {
+            "score": round(avg_ethos_score, 4),
+            "factual_consistency": round(avg_factual, 4),
+            "formality": round(avg_formal, 4)
+        },
+        "logos": round(avg_logos, 4),
+        "pathos": round(avg_pathos, 4),
+    }
+
+
+def iter_sentence_results(source_text: sources.Source, candidate_text: str, chunk_size: Optional[int] = None,
+                          models: Optional[Dict[str, Any]] = None,
+                          executor: Optional[executor_mod.ScorerExecutor] = None,
+                          timings: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield sentence-wise results in candidate order. With chunk_size, sentences are
+    planned and scored chunk by chunk so early results are available sooner
+    (at the cost of smaller batches); otherwise the whole document is one batch.
+    Executor wall times are summed over the chunks into timings when given.
+    """
+    executor = executor or get_executor()
+    sentences = core.split_sentences(candidate_text)
+    step = chunk_size or max(len(sentences), 1)
+    for start in range(0, len(sentences), step):
+        work = new_work()
+        with core.span("plan", sentences=len(sentences[start:start + step])) as s:
+            plan = plan_sentences(source_text, sentences[start:start + step], work)
+            s.set(**{kind: len(work[kind]) for kind in WORK_KINDS})
+        outputs = run_work(work, models, executor, timings)
+        with core.span("assemble", sentences=len(plan)):
+            results = assemble_plan(plan, outputs)
+        yield from results
+
+
+def analyze_text_sentencewise(source_text: sources.Source, candidate_text: str, models: Optional[Dict[str, Any]] = None,
+                              executor: Optional[executor_mod.ScorerExecutor] = None,
+                              report_timings: bool = False):
+    """
+    Returns a dictionary with:
+    - overall scores
+    - sentence-wise breakdown for each sentence in candidate_text
+    Source and candidate are split once and each model runs once over the whole document.
+    models optionally overrides the pipeline per kind (see WORK_KINDS).
+    """
+    timings: Dict[str, float] = {}
+    with core.span("analyze_text_sentencewise", chars=len(candidate_text)):
+        sentence_results = list(iter_sentence_results(source_text, candidate_text, models=models,
+                                                      executor=executor, timings=timings))
+        with core.span("aggregate", sentences=len(sentence_results)):
+            overall = overall_from_sentences(sentence_results)
+
+    result = {
         "overall": overall,
         "sentencewise": sentence_results
     }
+    if report_timings:
+        result["timings"] = timings
+    return result
+
+
+
+def model_revisions() -> List[Optional[str]]:
+    """
+    cache.model_identity (name@revision) of every model an analysis runs on, loading them
+    if needed (the analysis would). None marks a model that cannot be identified.
+    """
+    return [cache.model_identity(core.get_model(spec)) for spec in preload_specs()]
+
+
+def analysis_config() -> Dict[str, Any]:
+    """The model specs and revisions and every setting that changes analysis results."""
+    cascade_config = cascade.get_config()
+    return {
+        "models": [list(spec) for spec in MODEL_SPECS],
+        "revisions": model_revisions(),
+        "splitter": core.splitter_mode(),
+        "shared_nli": nli.SHARED_NLI,
+        "logos_pair_mode": LOGOS_PAIR_MODE,
+        "knowledge": knowledge.get_backend().identity,
+        "cascade": {**cascade_config._asdict(), "cheap_model": list(cascade.CHEAP_NLI_SPEC)}
+        if cascade_config.stages else None,
+    }
+
+
+def analysis_identity() -> Optional[str]:
+    """
+    Cache identity of a whole analysis: a fingerprint of analysis_config(), so cached
+    results are dropped when a model's weights change on the hub. None when a model
+    cannot be identified (whole analyses are then not cached).
+    """
+    config = analysis_config()
+    if None in config["revisions"]:
+        return None
+    config = json.dumps(config, sort_keys=True, default=str)
+    return "analysis:" + hashlib.sha256(config.encode("utf-8")).hexdigest()[:32]
 
 
+def cached_analysis(source_text: sources.Source, candidate_text: str) -> Dict[str, Any]:
+    """
+    analyze_text_sentencewise with the whole result cached per (configuration, source,
+    candidate). Results computed while a ConceptNet lookup failed are returned but not
+    cached, so an outage does not leave unenriched results behind.
+    """
+    score_cache = cache.get_cache()
+    identity = analysis_identity() if score_cache is not None else None
+    if identity is None:
+        return analyze_text_sentencewise(source_text, candidate_text)
+    key = cache.make_key("analysis", identity, [sources.source_text(source_text), candidate_text])
+    found = score_cache.get_many([key])
+    core.count("score_cache_hits" if found else "score_cache_misses", kind="analysis")
+    if found:
+        return found[key]
+    failures = knowledge.lookup_failures()
+    result = analyze_text_sentencewise(source_text, candidate_text)
+    if knowledge.lookup_failures() == failures:
+        score_cache.put_many({key: result})
+    return result
+
+
+# -----------------------------
+# Batch corpus analysis
+# -----------------------------
+def analyze_documents(records: List[Tuple[str, str]], models: Optional[Dict[str, Any]] = None,
+                      executor: Optional[executor_mod.ScorerExecutor] = None) -> List[Dict[str, Any]]:
+    """
+    Sentence-wise analysis of many (source_text, candidate_text) documents.
+    All documents are planned into shared work lists, so each model runs once over the
+    whole group (and identical sentences / pairs across documents are scored once).
+    """
+    work = new_work()
+    candidates = core.split_sentences_batch([cand for _, cand in records])
+    plans = [plan_sentences(src, sents, work) for (src, _), sents in zip(records, candidates)]
+    outputs = run_work(work, models, executor)
+
+    results = []
+    for plan in plans:
+        sentence_results = assemble_plan(plan, outputs)
+        results.append({"overall": overall_from_sentences(sentence_results), "sentencewise": sentence_results})
+    return results
+
+
+def iter_records(spec: str, source_text: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """
+    Records {id, source_text, candidate_text} from a JSONL file, a directory or a glob.
+    JSONL lines need candidate_text (and source_text unless a shared source is given);
+    text files are used as the candidate, with the shared source or the text itself as source.
+    """
+    if os.path.isfile(spec) and spec.endswith(".jsonl"):
+        with open(spec, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                candidate = rec.get("candidate_text", rec.get("text", ""))
+                yield {
+                    "id": str(rec.get("id", line_no)),
+                    "source_text": rec.get("source_text", source_text if source_text is not None else candidate),
+                    "candidate_text": candidate,
+                }
+        return
+
+    paths = sorted(glob.glob(os.path.join(spec, "*.txt")) if os.path.isdir(spec) else glob.glob(spec))
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        yield {"id": path, "source_text": source_text if source_text is not None else text, "candidate_text": text}
+
+
+def _read_checkpoint(path: str) -> Dict[str, str]:
+    """id → 'done' or 'error' for every id a previous run finished (the last entry wins)."""
+    statuses = {}
+    if not os.path.exists(path):
+        return statuses
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                doc_id, _, status = line.rstrip("\n").partition("\t")
+                statuses[doc_id] = status or "done"
+    return statuses
+
+
+def _drop_records(path: str, ids: set) -> None:
+    """Rewrite the output without the records of ids (failed attempts that are about to be retried)."""
+    if not ids or not os.path.exists(path):
+        return
+    tmp_path = path + ".tmp"
+    with open(path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            try:
+                doc_id = json.loads(line).get("id")
+            except ValueError:
+                doc_id = None
+            if doc_id not in ids:
+                dst.write(line)
+    os.replace(tmp_path, path)
+
+
+def run_batch(spec: str, output_path: str, checkpoint_path: Optional[str] = None,
+              docs_per_batch: int = 16, source_text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stream records through one warm set of models, appending one JSON line per document
+    to output_path. Completed ids are appended to the checkpoint file, so an interrupted
+    run resumes where it stopped. Failed documents get an error line and an 'error'
+    checkpoint entry; a resumed run drops that line and retries them, so every id keeps
+    exactly one final record. Returns throughput stats.
+    """
+    checkpoint_path = checkpoint_path or output_path + ".ckpt"
+    statuses = _read_checkpoint(checkpoint_path)
+    done = {doc_id for doc_id, status in statuses.items() if status == "done"}
+    _drop_records(output_path, set(statuses) - done)
+    stats = {"documents": 0, "sentences": 0, "skipped": 0, "errors": 0}
+    start = time.time()
+
+    with open(output_path, "a", encoding="utf-8") as out, open(checkpoint_path, "a", encoding="utf-8") as ckpt:
+        def flush(group):
+            analyses = analyze_documents([(r["source_text"], r["candidate_text"]) for r in group])
+            for rec, analysis in zip(group, analyses):
+                out.write(json.dumps({"id": rec["id"], "analysis": analysis}) + "\n")
+                stats["documents"] += 1
+                stats["sentences"] += len(analysis["sentencewise"])
+            out.flush()
+            ckpt.write("".join(rec["id"] + "\n" for rec in group))
+            ckpt.flush()
+
+        def flush_safe(group):
+            try:
+                flush(group)
+            except Exception as e:
+                if len(group) > 1:
+                    # isolate the failing document(s); the others are still written and checkpointed
+                    for rec in group:
+                        flush_safe([rec])
+                    return
+                # checkpointed as failed first, so a resumed run always replaces the error line
+                ckpt.write(group[0]["id"] + "\terror\n")
+                ckpt.flush()
+                out.write(json.dumps({"id": group[0]["id"], "error": f"{type(e).__name__}: {e}"}) + "\n")
+                out.flush()
+                stats["errors"] += 1
+
+        group = []
+        for rec in iter_records(spec, source_text):
+            if rec["id"] in done:
+                stats["skipped"] += 1
+                continue
+            group.append(rec)
+            if len(group) >= docs_per_batch:
+                flush_safe(group)
+                group = []
+        if group:
+            flush_safe(group)
+
+    elapsed = max(time.time() - start, 1e-9)
+    stats["seconds"] = round(elapsed, 3)
+    stats["documents_per_second"] = round(stats["documents"] / elapsed, 3)
+    stats["sentences_per_second"] = round(stats["sentences"] / elapsed, 3)
+    return stats
+
 
 # -----------------------------
 # CLI interface
@@ -118,20 +604,39 @@ def analyze_text_sentencewise(source_text: str, candidate_text: str):
 def main():
     parser = argparse.ArgumentParser(description="Analyze text for Ethos, Logos, Pathos")
     parser.add_argument("input_file", nargs="?", default="default.txt", help="Input text file")
-    parser.add_argument("-o", "--output", default="output.txt", help="Output file to save analysis")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output file (default: output.txt, or results.jsonl in batch mode)")
+    parser.add_argument("-s", "--source", default=None, help="Source text file (default: the input text itself)")
+    parser.add_argument("--batch", metavar="PATH", default=None,
+                        help="Batch mode: directory of .txt files, glob, or JSONL of {id, source_text, candidate_text}")
+    parser.add_argument("--checkpoint", default=None, help="Batch mode: completed-ids file (default: <output>.ckpt)")
+    parser.add_argument("--docs-per-batch", type=int, default=16, help="Batch mode: documents batched per model pass")
     args = parser.parse_args()
 
+    source_text = None
+    if args.source:
+        with open(args.source, "r", encoding="utf-8") as f:
+            source_text = f.read().strip()
+
+    if args.batch:
+        output = args.output or "results.jsonl"
+        stats = run_batch(args.batch, output, args.checkpoint, args.docs_per_batch, source_text)
+        print(f"Results appended to {output}")
+        print(json.dumps(stats, indent=4))
+        return
+
     with open(args.input_file, "r", encoding="utf-8") as f:
         text = f.read().strip()
 
-    # For simplicity, we use the same text as source and candidate (can be changed)
-    analysis = analyze_text(text, text)
+    # Without --source, the same text is used as source and candidate
+    analysis = analyze_text(source_text if source_text is not None else text, text)
 
     # Write output
-    with open(args.output, "w", encoding="utf-8") as f:
+    output = args.output or "output.txt"
+    with open(output, "w", encoding="utf-8") as f:
         json.dump(analysis, f, indent=4)
 
-    print(f"Analysis saved to {args.output}")
+    print(f"Analysis saved to {output}")
     print(json.dumps(analysis, indent=4))
 
 # -----------------------------
@@ -0,0 +1,171 @@
+"""
+incremental.py
+Re-analysis of an edited transcript that only scores what the edit changed.
+
+Sentence-wise scores depend on nothing but the sentence itself (formality, emotion,
+logos pairs within the sentence) and, for factual consistency, on the NLI support
+of the sentence against each source sentence. The analysis state keeps those
+components per candidate sentence:
+
+    sentence → {subs, formality, logos, pathos, support: {source sentence → summed pair score}}
+
+On a new revision the candidate and source are diffed at sentence level:
+ - new candidate sentences are planned and scored in full
+ - kept sentences reuse their scores and only get NLI pairs against source
+   sentences they have not been scored against yet
+ - removed sentences (candidate or source) are dropped from the state
+and the 'overall' block is re-aggregated from the stored components.
+
+    result = analyze_incremental(source, candidate)             # full run, returns state
+    result = analyze_incremental(source, edited, result)        # only the edit is scored
+
+A state is only reused under the analysis identity it was computed with
+(final.analysis_identity): after a model, backend or configuration change the text
+is analyzed in full. iter_sentence_results streams a full analysis chunk by chunk
+and fills in its state on the way, so streamed jobs can be continued incrementally.
+
+The Flask app keeps states server-side under a revision id (StateStore).
+"""
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+import core
+import final
+import sources
+import executor as executor_mod
+
+STATE_VERSION = 1
+
+
+def _factual(entry: Dict[str, Any], src_sents: List[str]) -> float:
+    if not src_sents or not entry["subs"]:
+        return 0.0
+    return sum(entry["support"][s] for s in src_sents) / (entry["subs"] * len(src_sents))
+
+
+def _scored_entries(plan: List[Dict[str, Any]], components: List[Dict[str, float]],
+                    outputs: Dict[str, np.ndarray], src_sents: List[str]) -> Dict[str, Dict[str, Any]]:
+    """State entries of freshly scored plan items (see the module docstring)."""
+    entries = {}
+    for item, comp in zip(plan, components):
+        subs, n_src = len(item["formality"]), len(src_sents)
+        # ethos_nli ids are (sub-sentence, source sentence) in row-major order
+        pair_scores = outputs["ethos_nli"][np.asarray(item["ethos_nli"], dtype=np.intp)]
+        support = dict(zip(src_sents, pair_scores.reshape(subs, n_src).sum(axis=0).tolist()))
+        entries[item["sentence"]] = {"subs": subs, "formality": comp["formality"],
+                                     "logos": comp["logos"], "pathos": comp["pathos"], "support": support}
+    return entries
+
+
+def analyze_incremental(source_text: sources.Source, candidate_text: str, previous: Optional[Dict[str, Any]] = None,
+                        models: Optional[Dict[str, Any]] = None,
+                        executor: Optional[executor_mod.ScorerExecutor] = None) -> Dict[str, Any]:
+    """
+    analyze_text_sentencewise-shaped result for candidate_text, plus 'changes' (what was
+    reused / scored) and 'state' (JSON-serialisable; pass the result back as `previous`).
+    """
+    identity = final.analysis_identity()
+    state = (previous or {}).get("state") or {}
+    if state.get("version") != STATE_VERSION or identity is None or state.get("identity") != identity:
+        state = {}
+    known: Dict[str, Dict[str, Any]] = state.get("sentences", {})
+
+    src_sents = sources.source_sentences(source_text)
+    src_unique = list(dict.fromkeys(src_sents))
+    sentences = core.split_sentences(candidate_text)
+    unique = list(dict.fromkeys(sentences))
+    added = [s for s in unique if s not in known]
+    kept = [s for s in unique if s in known]
+
+    work = final.new_work()
+    with core.span("plan", sentences=len(added), incremental=True):
+        plan = final.plan_sentences(source_text, added, work)
+        # Kept sentences: only the NLI pairs against source sentences they have not seen
+        backfill = {}
+        for sentence in kept:
+            missing = [s for s in src_unique if s not in known[sentence]["support"]]
+            if missing:
+                subs = core.split_sentences(sentence)
+                ids = work["ethos_nli"].add((c, s) for s in missing for c in subs)
+                backfill[sentence] = (missing, ids, len(subs))
+    outputs = final.run_work(work, models, executor)
+
+    with core.span("assemble", sentences=len(unique), incremental=True):
+        entries = _scored_entries(plan, final.plan_components(plan, outputs), outputs, src_sents)
+        for sentence in kept:
+            entry = dict(known[sentence])
+            support = {s: v for s, v in entry["support"].items() if s in src_sents}
+            if sentence in backfill:
+                missing, ids, subs = backfill[sentence]
+                sums = outputs["ethos_nli"][np.asarray(ids, dtype=np.intp)].reshape(len(missing), subs).sum(axis=1)
+                support.update(zip(missing, sums.tolist()))
+            entry["support"] = support
+            entries[sentence] = entry
+
+        results = [final.sentence_result(s, dict(entries[s], factual=_factual(entries[s], src_sents)))
+                   for s in sentences]
+    with core.span("aggregate", sentences=len(results)):
+        overall = final.overall_from_sentences(results)
+
+    return {
+        "overall": overall,
+        "sentencewise": results,
+        "changes": {
+            "sentences": len(unique),
+            "reused": len(kept) - len(backfill),
+            "rescored_ethos": len(backfill),
+            "scored": len(added),
+            "removed": len(set(known) - set(unique)),
+            "nli_pairs": len(work["ethos_nli"]) + len(work["logos_nli"]),
+        },
+        "state": {"version": STATE_VERSION, "identity": identity, "sentences": entries},
+    }
+
+
+def iter_sentence_results(source_text: sources.Source, candidate_text: str, state: Dict[str, Any],
+                          chunk_size: Optional[int] = None, models: Optional[Dict[str, Any]] = None,
+                          executor: Optional[executor_mod.ScorerExecutor] = None) -> Iterator[Dict[str, Any]]:
+    """
+    final.iter_sentence_results that also fills `state` with the analysis state
+    analyze_incremental would return, complete once the iterator is exhausted.
+    """
+    state.update(version=STATE_VERSION, identity=final.analysis_identity(), sentences={})
+    src_sents = sources.source_sentences(source_text)
+    sentences = core.split_sentences(candidate_text)
+    step = chunk_size or max(len(sentences), 1)
+    for start in range(0, len(sentences), step):
+        work = final.new_work()
+        with core.span("plan", sentences=len(sentences[start:start + step])):
+            plan = final.plan_sentences(source_text, sentences[start:start + step], work)
+        outputs = final.run_work(work, models, executor)
+        with core.span("assemble", sentences=len(plan)):
+            components = final.plan_components(plan, outputs)
+            state["sentences"].update(_scored_entries(plan, components, outputs, src_sents))
+            results = [final.sentence_result(item["sentence"], comp) for item, comp in zip(plan, components)]
+        yield from results
+
+
+# -----------------------------
+# Server-side state store
+# -----------------------------
+class StateStore:
+    """Recent analysis states keyed by revision id (LRU)."""
+
+    def __init__(self, max_revisions: int = 256):
+        self._states = core.LRUCache(max_revisions)
+
+    def get(self, revision: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self._states.get(revision) if revision else None
+
+    def put(self, state: Dict[str, Any]) -> str:
+        revision = uuid.uuid4().hex
+        self._states.put(revision, state)
+        return revision
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+def store_from_env() -> StateStore:
+    return StateStore(int(os.environ.get("ETHOS_INCREMENTAL_STATES", "256")))
@@ -0,0 +1,195 @@
+"""
+jobs.py
+Asynchronous analysis jobs for the Flask API.
+
+A bounded pool of worker threads consumes a bounded queue of jobs. Each job runs
+final.iter_sentence_results chunk by chunk and publishes every sentence result as
+it completes, so clients can poll progress or stream results (Server-Sent Events).
+Submitting while the queue is full raises QueueFull (HTTP 429 upstream).
+With a StateStore, each job also registers its analysis state (incremental.py) and
+reports the revision id in its final event, so edits can be re-analyzed incrementally.
+"""
+import os
+import json
+import queue
+import time
+import uuid
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import final
+import incremental
+import sources
+
+
+class QueueFull(Exception):
+    """Raised when the job queue has reached its depth limit."""
+
+
+class Job:
+    """State of one analysis job; results are appended as sentences complete."""
+
+    def __init__(self, source_text: sources.Source, candidate_text: str):
+        self.id = uuid.uuid4().hex
+        self.source_text = source_text
+        self.candidate_text = candidate_text
+        self.status = "queued"  # queued → running → done | failed
+        self.total: Optional[int] = None
+        self.results: List[Dict[str, Any]] = []
+        self.overall: Optional[Dict[str, Any]] = None
+        self.revision: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def _update(self, **fields) -> None:
+        with self._cond:
+            for k, v in fields.items():
+                setattr(self, k, v)
+            self._cond.notify_all()
+
+    def _append(self, result: Dict[str, Any]) -> None:
+        with self._cond:
+            self.results.append(result)
+            self._cond.notify_all()
+
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        with self._cond:
+            info = {
+                "job_id": self.id,
+                "status": self.status,
+                "completed": len(self.results),
+                "total": self.total,
+                "error": self.error,
+                "revision": self.revision,
+                "queued_seconds": round((self.started or time.time()) - self.created, 3),
+                "run_seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            }
+            if include_results:
+                info["analysis"] = {"overall": self.overall, "sentencewise": list(self.results)}
+            return info
+
+    def events(self, heartbeat: float = 15.0) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (event, data) as the job progresses:
+        ('sentence', result) per sentence, then ('done', {'overall', 'revision'}) or ('error', message).
+        ('heartbeat', None) is yielded when nothing happened for `heartbeat` seconds.
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                if sent >= len(self.results) and not self.done:
+                    self._cond.wait(timeout=heartbeat)
+                pending = self.results[sent:]
+                status, overall, revision, error = self.status, self.overall, self.revision, self.error
+            for result in pending:
+                sent += 1
+                yield "sentence", result
+            if status == "done" and sent >= len(self.results):
+                yield "done", {"overall": overall, "revision": revision}
+                return
+            if status == "failed":
+                yield "error", error
+                return
+            if not pending:
+                yield "heartbeat", None
+
+
+class JobQueue:
+    """Bounded job queue served by a fixed pool of worker threads."""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16, chunk_size: int = 4,
+                 retention: float = 3600.0, states: Optional[incremental.StateStore] = None):
+        self.chunk_size = chunk_size
+        self.retention = retention
+        self.states = states
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"analysis-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for w in self._workers:
+            w.start()
+
+    def submit(self, source_text: sources.Source, candidate_text: str) -> Job:
+        job = Job(source_text, candidate_text)
+        self._prune()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(f"job queue is full ({self._queue.maxsize} pending)")
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.status == "running")
+            return {
+                "queued": self._queue.qsize(),
+                "queue_limit": self._queue.maxsize,
+                "running": running,
+                "workers": len(self._workers),
+                "tracked_jobs": len(self._jobs),
+            }
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+                del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job) -> None:
+        job._update(status="running", started=time.time(),
+                    total=len(final.core.split_sentences(job.candidate_text)))
+        try:
+            if self.states is None:
+                results = final.iter_sentence_results(job.source_text, job.candidate_text,
+                                                      chunk_size=self.chunk_size)
+            else:
+                state: Dict[str, Any] = {}
+                results = incremental.iter_sentence_results(job.source_text, job.candidate_text, state,
+                                                            chunk_size=self.chunk_size)
+            for result in results:
+                job._append(result)
+            revision = self.states.put(state) if self.states is not None else None
+            job._update(overall=final.overall_from_sentences(job.results), revision=revision,
+                        status="done", finished=time.time())
+        except Exception as e:
+            job._update(status="failed", error=f"{type(e).__name__}: {e}", finished=time.time())
+
+
+def sse_format(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event."""
+    if event == "heartbeat":
+        return ": keep-alive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def queue_from_env(states: Optional[incremental.StateStore] = None) -> JobQueue:
+    return JobQueue(
+        max_workers=int(os.environ.get("ETHOS_JOB_WORKERS", "2")),
+        max_queue=int(os.environ.get("ETHOS_JOB_QUEUE", "16")),
+        chunk_size=int(os.environ.get("ETHOS_JOB_CHUNK", "4")),
+        states=states,
+    )
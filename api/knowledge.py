@@ -0,0 +1,417 @@
+"""
+knowledge.py
+Pluggable ConceptNet 'IsA' lookups used by logos.enrich_with_conceptnet.
+
+Backends:
+ - SQLiteConceptNet → local on-disk IsA index built once from a ConceptNet assertions dump
+ - HTTPConceptNet   → api.conceptnet.io (or any compatible server), pooled and concurrent
+ - NullKnowledge    → no enrichment (air-gapped deployments without an index)
+Any backend can be wrapped in CachedKnowledge (in-memory LRU; failed terms are
+remembered for a short TTL so they are not retried on every request).
+HTTPConceptNet stops calling an unreachable server for a cool-down period after
+repeated failures (circuit breaker), instead of waiting out a timeout per term.
+
+The default backend is chosen from the environment:
+ ETHOS_CONCEPTNET_DB=<path>   → SQLiteConceptNet
+ ETHOS_CONCEPTNET=off         → NullKnowledge
+ ETHOS_CONCEPTNET_URL=<url>   → HTTPConceptNet against that server
+ (otherwise)                  → HTTPConceptNet against api.conceptnet.io
+
+ ETHOS_CONCEPTNET_NEGATIVE_TTL=<sec>      how long a failed term is not retried (default 30)
+ ETHOS_CONCEPTNET_BREAKER_FAILURES=<n>    consecutive HTTP failures that open the breaker (default 5)
+ ETHOS_CONCEPTNET_BREAKER_COOLDOWN=<sec>  how long it stays open before a trial request (default 30)
+"""
+import os
+import csv
+import gzip
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+import core
+
+CONCEPTNET_URL = "https://api.conceptnet.io"
+
+
+def _unique_lower(nouns: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(n.lower() for n in nouns))
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+_failures = threading.local()
+
+
+def lookup_failures() -> int:
+    """Lookups that failed on this thread so far (results computed meanwhile lack enrichment)."""
+    return getattr(_failures, "count", 0)
+
+
+class KnowledgeBackend:
+    """Maps nouns to the labels of their IsA relations."""
+
+    @property
+    def identity(self) -> str:
+        """What this backend answers from (part of analysis cache keys)."""
+        return type(self).__name__
+
+    def lookup(self, terms: List[str], limit: int) -> Dict[str, List[str]]:
+        """
+        IsA labels for unique lower-case terms. Terms whose lookup failed are
+        left out of the result (so callers can tell 'failed' from 'none found').
+        """
+        raise NotImplementedError
+
+    def isa_many(self, nouns: Iterable[str], limit: int = 1) -> Dict[str, List[str]]:
+        """IsA labels keyed by each input noun (repeated nouns are looked up once)."""
+        nouns = list(nouns)
+        terms = _unique_lower(nouns)
+        with core.span("conceptnet.lookup", backend=type(self).__name__, terms=len(terms)):
+            found = self.lookup(terms, limit)
+        if len(found) < len(terms):
+            _failures.count = lookup_failures() + len(terms) - len(found)
+        return {n: found.get(n.lower(), []) for n in nouns}
+
+    def isa(self, noun: str, limit: int = 1) -> List[str]:
+        return self.isa_many([noun], limit)[noun]
+
+
+class NullKnowledge(KnowledgeBackend):
+    identity = "none"
+
+    def lookup(self, terms: List[str], limit: int) -> Dict[str, List[str]]:
+        return {t: [] for t in terms}
+
+
+class SQLiteConceptNet(KnowledgeBackend):
+    """Read-only IsA index created by build_sqlite_index."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def identity(self) -> str:
+        return f"sqlite:{os.path.abspath(self.path)}@{int(os.path.getmtime(self.path))}"
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, terms: List[str], limit: int) -> Dict[str, List[str]]:
+        cur = self._conn().cursor()
+        found = {}
+        for term in terms:
+            rows = cur.execute(
+                "SELECT end_label FROM isa WHERE start = ? ORDER BY weight DESC LIMIT ?",
+                (term, limit),
+            ).fetchall()
+            found[term] = [r[0] for r in rows]
+        return found
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. While open, calls are refused;
+    after `cooldown` seconds one trial call is let through, and its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened: Optional[float] = None
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened >= self.cooldown:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._failures, self._opened = 0, None
+            else:
+                self._failures += 1
+                if self._trial or self._failures >= self.threshold:
+                    self._opened = time.monotonic()
+            self._trial = False
+
+
+class HTTPConceptNet(KnowledgeBackend):
+    """ConceptNet REST API with a pooled session, concurrent lookups and a circuit breaker."""
+
+    def __init__(self, base_url: str = CONCEPTNET_URL, timeout: float = 3.0, max_workers: int = 8,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    @property
+    def identity(self) -> str:
+        return f"http:{self.base_url}"
+
+    def _fetch(self, term: str, limit: int) -> Optional[List[str]]:
+        if not self.breaker.allow():
+            core.count("conceptnet_breaker_rejected", 1)
+            return None
+        try:
+            resp = self.session.get(
+                f"{self.base_url}/query",
+                params={"node": f"/c/en/{term}", "rel": "/r/IsA", "limit": limit},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            labels = [e["end"]["label"] for e in resp.json().get("edges", [])][:limit]
+        except Exception:
+            self.breaker.record(False)
+            return None
+        self.breaker.record(True)
+        return labels
+
+    def lookup(self, terms: List[str], limit: int) -> Dict[str, List[str]]:
+        if not terms:
+            return {}
+        results = self._pool.map(lambda t: self._fetch(t, limit), terms)
+        found = {t: r for t, r in zip(terms, results) if r is not None}
+        core.count("conceptnet_requests", len(terms))
+        core.count("conceptnet_failures", len(terms) - len(found))
+        return found
+
+
+class CachedKnowledge(KnowledgeBackend):
+    """
+    In-memory LRU in front of another backend. Failed lookups are not cached as
+    results, but the term is not retried for negative_ttl seconds (it stays failed).
+    """
+
+    def __init__(self, backend: KnowledgeBackend, maxsize: int = 10000, negative_ttl: float = 30.0):
+        self.backend = backend
+        self.cache = core.LRUCache(maxsize)
+        self.negative_ttl = negative_ttl
+        self._failed = core.LRUCache(maxsize)  # (term, limit) → time.monotonic() to retry at
+
+    @property
+    def identity(self) -> str:
+        return self.backend.identity
+
+    def lookup(self, terms: List[str], limit: int) -> Dict[str, List[str]]:
+        found, missing = {}, []
+        for term in terms:
+            hit = self.cache.get((term, limit))
+            if hit is None:
+                missing.append(term)
+            else:
+                found[term] = hit
+        now = time.monotonic()
+        retry = [t for t in missing if self._failed.get((t, limit), 0.0) <= now]
+        core.count("conceptnet_cache_hits", len(found))
+        core.count("conceptnet_cache_misses", len(retry))
+        core.count("conceptnet_negative_hits", len(missing) - len(retry))
+        if retry:
+            fetched = self.backend.lookup(retry, limit)
+            for term, labels in fetched.items():
+                self.cache.put((term, limit), labels)
+            if self.negative_ttl > 0:
+                for term in retry:
+                    if term not in fetched:
+                        self._failed.put((term, limit), now + self.negative_ttl)
+            found.update(fetched)
+        return found
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self._failed.clear()
+
+
+# -----------------------------
+# Default backend
+# -----------------------------
+_default_backend: Optional[KnowledgeBackend] = None
+_default_lock = threading.Lock()
+
+
+def backend_from_env() -> KnowledgeBackend:
+    db_path = os.environ.get("ETHOS_CONCEPTNET_DB")
+    if db_path:
+        backend = SQLiteConceptNet(db_path)
+    elif os.environ.get("ETHOS_CONCEPTNET", "").lower() in ("0", "off", "false", "none"):
+        return NullKnowledge()
+    else:
+        backend = HTTPConceptNet(os.environ.get("ETHOS_CONCEPTNET_URL", CONCEPTNET_URL), breaker=CircuitBreaker(
+            threshold=int(os.environ.get("ETHOS_CONCEPTNET_BREAKER_FAILURES", "5")),
+            cooldown=float(os.environ.get("ETHOS_CONCEPTNET_BREAKER_COOLDOWN", "30")),
+        ))
+    return CachedKnowledge(backend, negative_ttl=float(os.environ.get("ETHOS_CONCEPTNET_NEGATIVE_TTL", "30")))
+
+
+def get_backend() -> KnowledgeBackend:
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = backend_from_env()
+        return _default_backend
+
+
+def _reset_after_fork() -> None:
+    """A forked child gets its own backend (SQLite connections and thread pools do not survive fork)."""
+    global _default_backend, _default_lock
+    _default_lock = threading.Lock()
+    _default_backend = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def set_backend(backend: Optional[KnowledgeBackend]) -> None:
+    """Override the process-wide backend (None → rebuild from the environment on next use)."""
+    global _default_backend
+    with _default_lock:
+        _default_backend = backend
+
+
+# -----------------------------
+# Index building
+# -----------------------------
+def _term(uri: str) -> str:
+    # /c/en/socrates/n/... → socrates
+    return uri.split("/")[3]
+
+
+def build_sqlite_index(dump_path: str, db_path: str, batch_size: int = 10000) -> int:
+    """
+    Build an English IsA index from a ConceptNet 5 assertions dump
+    (tab-separated: uri, relation, start, end, json; optionally gzipped).
+    Returns the number of relations stored.
+    """
+    opener = gzip.open if dump_path.endswith(".gz") else open
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS isa")
+    conn.execute("CREATE TABLE isa (start TEXT NOT NULL, end_label TEXT NOT NULL, weight REAL)")
+
+    count, rows = 0, []
+    with opener(dump_path, "rt", encoding="utf-8") as f:
+        for record in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(record) < 5 or record[1] != "/r/IsA":
+                continue
+            if not (record[2].startswith("/c/en/") and record[3].startswith("/c/en/")):
+                continue
+            try:
+                meta = json.loads(record[4])
+            except ValueError:
+                meta = {}
+            label = meta.get("surfaceEnd") or _term(record[3]).replace("_", " ")
+            rows.append((_term(record[2]), label, float(meta.get("weight", 1.0))))
+            if len(rows) >= batch_size:
+                conn.executemany("INSERT INTO isa VALUES (?, ?, ?)", rows)
+                count += len(rows)
+                rows = []
+    if rows:
+        conn.executemany("INSERT INTO isa VALUES (?, ?, ?)", rows)
+        count += len(rows)
+    conn.execute("CREATE INDEX isa_start ON isa (start, weight DESC)")
+    conn.commit()
+    conn.close()
+    return count
+
+
+# -----------------------------
+# Local stub server (tests / benchmarks)
+# -----------------------------
+class StubConceptNetServer:
+    """
+    Minimal ConceptNet-compatible /query endpoint serving a fixed IsA table.
+    Set `failing` to answer 503 (an outage).
+        with StubConceptNetServer({"socrates": ["human"]}) as stub:
+            knowledge.set_backend(HTTPConceptNet(stub.url))
+    """
+
+    def __init__(self, relations: Dict[str, List[str]], host: str = "127.0.0.1", port: int = 0,
+                 delay: float = 0.0):
+        relations = {k.lower(): v for k, v in relations.items()}
+        self.requests = 0
+        self.failing = False
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real server: the client pools connections
+
+            def do_GET(self):
+                with stub._lock:  # handlers run on concurrent threads
+                    stub.requests += 1
+                if delay:
+                    threading.Event().wait(delay)
+                if stub.failing:
+                    self.send_error(503)
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                term = _term(query.get("node", ["/c/en/"])[0])
+                limit = int(query.get("limit", ["1"])[0])
+                edges = [{"end": {"label": label}} for label in relations.get(term, [])[:limit]]
+                body = json.dumps({"edges": edges}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StubConceptNetServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local ConceptNet IsA index")
+    parser.add_argument("dump", help="ConceptNet assertions CSV (.csv or .csv.gz)")
+    parser.add_argument("db", help="Output SQLite file")
+    args = parser.parse_args()
+    print(f"Stored {build_sqlite_index(args.dump, args.db)} IsA relations in {args.db}")
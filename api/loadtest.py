@@ -0,0 +1,470 @@
+"""
+loadtest.py
+Load generator for the /api/analyze service: throughput, latency percentiles,
+error rate and server memory as load increases, up to saturation.
+
+Payloads: recorded {"source_text", "candidate_text"} objects, one per line
+(--payloads file.jsonl, 'source_id' also accepted), or synthetic ones built
+from a fixed sentence pool (default, seeded).
+
+Targets:
+ in-process (default)  the Flask test client of analyze.app, in this process
+ --url URL             a running server (--server-pid to sample its memory)
+ --spawn N             start serve.py with N workers on a free port for the run
+
+Load, one step of the saturation curve per value:
+ --concurrency 1,2,4,8   closed loop: each client sends its next request when the previous returns
+ --rate 2,4,8            open loop: Poisson arrivals per second. Latency counts from the
+                         scheduled send time, so queueing in an overloaded server is not hidden.
+
+Payloads repeat, so for in-process and spawned targets the score cache is turned
+off (ETHOS_CACHE=off) and every request runs the models; --cache keeps it on, to
+measure the cached path instead.
+
+--stand-ins DIR builds tiny random models (no downloads) in DIR and points every
+model at them (ETHOS_*_MODEL), with the regex sentence splitter and ConceptNet off.
+The whole run is then offline and takes seconds, which is enough to compare
+service overheads (batching, serialization, workers) between two builds:
+
+    python loadtest.py --stand-ins /tmp/ethos-stand-ins --concurrency 1,2,4,8 --json new.json
+    python loadtest.py --stand-ins /tmp/ethos-stand-ins --concurrency 1,2,4,8 --baseline old.json
+
+With --baseline the run fails (exit 1) when the peak throughput drops, or the
+p95 latency of a shared step rises, by more than --tolerance (default 10%).
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINT = "/api/analyze"
+PERCENTILES = (50, 90, 95, 99)
+
+SENTENCE_POOL = (
+    "The Eiffel Tower is located in Paris.",
+    "It was completed in 1889 for the World's Fair.",
+    "The tower is made of wrought iron and is about 330 metres tall.",
+    "Millions of people visit it every year.",
+    "All humans are mortal.",
+    "Therefore, Socrates is mortal.",
+    "The sky is blue on a clear day.",
+    "The sky is not blue at night.",
+    "I can't believe how inspiring your story was!",
+    "It gave me hope for the future.",
+    "I am furious that this happened.",
+    "This is absolutely unacceptable.",
+    "Yeah, that big tower was built ages ago, dude.",
+    "Renewable energy reduces carbon emissions.",
+    "Solar panels convert sunlight into electricity.",
+    "Wind farms are often built offshore.",
+    "The committee approved the proposal after a long debate.",
+    "Nobody expected the results to be so surprising.",
+    "We must act now, before it is too late.",
+    "The data clearly supports our conclusion.",
+)
+
+
+# -----------------------------
+# Payloads
+# -----------------------------
+def synthetic_payloads(n: int = 64, source_sentences: Tuple[int, int] = (2, 5),
+                       candidate_sentences: Tuple[int, int] = (3, 8), seed: int = 0) -> List[Dict[str, str]]:
+    """Source/candidate pairs of random pool sentences; candidates reuse some source sentences."""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n):
+        source = rng.sample(SENTENCE_POOL, rng.randint(*source_sentences))
+        k = rng.randint(*candidate_sentences)
+        candidate = [rng.choice(source) if rng.random() < 0.3 else rng.choice(SENTENCE_POOL) for _ in range(k)]
+        payloads.append({"source_text": " ".join(source), "candidate_text": " ".join(candidate)})
+    return payloads
+
+
+def load_payloads(path: str) -> List[Dict[str, str]]:
+    """Recorded request bodies from a JSONL file (lines without 'candidate_text' are skipped)."""
+    payloads = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and isinstance(record.get("candidate_text"), str):
+                payloads.append({k: record[k] for k in ("source_text", "source_id", "candidate_text") if k in record})
+    if not payloads:
+        raise ValueError(f"{path}: no records with a 'candidate_text'")
+    return payloads
+
+
+# -----------------------------
+# Stand-in models
+# -----------------------------
+# Environment overrides (core.ModelSpec.configured prefixes) → stand-in
+STAND_IN_MODELS = {
+    "ETHOS_NLI_MODEL": "nli",
+    "ETHOS_LOGOS_NLI_MODEL": "nli",
+    "ETHOS_SHARED_NLI_MODEL": "nli",
+    "ETHOS_CASCADE_NLI_MODEL": "nli",
+    "ETHOS_FORMALITY_MODEL": "formality",
+    "ETHOS_EMOTION_MODEL": "emotion",
+}
+# The rest of an offline stand-in run; core reads these when it is first imported
+STAND_IN_SETTINGS = {"ETHOS_SPLITTER": "regex", "ETHOS_CONCEPTNET": "off", "TRANSFORMERS_OFFLINE": "1"}
+
+
+def build_stand_ins(directory: str, hidden_size: int = 32, layers: int = 2) -> Dict[str, str]:
+    """
+    Save the benchmark stand-in models (benchmarks/stand_ins.py) under directory,
+    once; returns the environment that selects them. This imports core, so apply
+    STAND_IN_SETTINGS first.
+    """
+    from benchmarks import stand_ins
+    paths = stand_ins.save(directory, hidden_size, layers)
+    return {**{var: paths[kind] for var, kind in STAND_IN_MODELS.items()}, **STAND_IN_SETTINGS}
+
+
+# -----------------------------
+# Targets
+# -----------------------------
+class InProcessTarget:
+    """analyze.app through the Flask test client (one client per thread)."""
+
+    name = "in-process"
+
+    def __init__(self):
+        import analyze
+        import startup
+        self.app = analyze.create_app()
+        startup.STARTUP.wait()
+        self._local = threading.local()
+
+    def post(self, payload: Dict[str, str]) -> int:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.post(ENDPOINT, json=payload).status_code
+
+    def memory(self) -> Optional[Dict[str, float]]:
+        import serve
+        return serve.process_memory(os.getpid())
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPTarget:
+    """A running server; its memory is sampled when its pid is known (master + workers)."""
+
+    name = "http"
+
+    def __init__(self, url: str, server_pid: Optional[int] = None, timeout: float = 120.0):
+        self.url = url.rstrip("/")
+        self.server_pid = server_pid
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        import requests
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def post(self, payload: Dict[str, str]) -> int:
+        return self._session().post(self.url + ENDPOINT, json=payload, timeout=self.timeout).status_code
+
+    def memory(self) -> Optional[Dict[str, float]]:
+        if self.server_pid is None:
+            return None
+        import serve
+        report = serve.memory_report(self.server_pid)
+        return {"rss_mb": report["total_rss_mb"], "pss_mb": report["total_pss_mb"], "workers": len(report["workers"])}
+
+    def close(self) -> None:
+        pass
+
+
+class SpawnedTarget(HTTPTarget):
+    """serve.py started on a free local port for the duration of the run."""
+
+    name = "spawned"
+
+    def __init__(self, workers: int, ready_timeout: float = 300.0, env: Optional[Dict[str, str]] = None):
+        import requests
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(API_DIR, "serve.py"), "--workers", str(workers), "--port", str(port)],
+            env={**os.environ, **(env or {})}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        super().__init__(f"http://127.0.0.1:{port}", self.process.pid)
+        deadline = time.monotonic() + ready_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"serve.py exited with {self.process.returncode}")
+            try:
+                if requests.get(self.url + "/api/ready", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        self.close()
+        raise RuntimeError(f"serve.py not ready after {ready_timeout:.0f} s")
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+# -----------------------------
+# Load steps
+# -----------------------------
+class _Recorder:
+    """Completed requests (finish time, latency, ok) and memory samples of one step."""
+
+    def __init__(self):
+        self.results: List[Tuple[float, float, bool]] = []
+        self.memory: List[Dict[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, finished: float, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.results.append((finished, latency, ok))
+
+
+def _send(target, payload: Dict[str, str], recorder: _Recorder, scheduled: float) -> None:
+    try:
+        ok = 200 <= target.post(payload) < 300
+    except Exception:
+        ok = False
+    finished = time.perf_counter()
+    recorder.add(finished, finished - scheduled, ok)
+
+
+def _sample_memory(target, recorder: _Recorder, stop: threading.Event, interval: float, t0: float) -> None:
+    while True:
+        sample = target.memory()
+        if sample:
+            recorder.memory.append({"t": round(time.perf_counter() - t0, 2), **sample})
+        if stop.wait(interval):
+            return
+
+
+def run_step(target, payloads: Sequence[Dict[str, str]], duration: float, concurrency: Optional[int] = None,
+             rate: Optional[float] = None, max_in_flight: int = 256, sample_interval: float = 0.5,
+             seed: int = 0) -> Dict[str, Any]:
+    """One load level (closed loop at `concurrency`, or open loop at `rate` req/s) for `duration` seconds."""
+    if (concurrency is None) == (rate is None):
+        raise ValueError("give exactly one of concurrency and rate")
+    recorder = _Recorder()
+    cycle: Iterator[Dict[str, str]] = itertools.cycle(payloads)
+    next_lock = threading.Lock()
+
+    def next_payload() -> Dict[str, str]:
+        with next_lock:
+            return next(cycle)
+
+    stop = threading.Event()
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    sampler = threading.Thread(target=_sample_memory, args=(target, recorder, stop, sample_interval, t0), daemon=True)
+    sampler.start()
+    if concurrency is not None:
+        def client() -> None:
+            while time.perf_counter() < deadline:
+                _send(target, next_payload(), recorder, time.perf_counter())
+        clients = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for c in clients:
+            c.start()
+        for c in clients:
+            c.join()
+        load = {"concurrency": concurrency}
+    else:
+        rng = random.Random(seed)
+        submitted = 0
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            scheduled = t0
+            while True:
+                scheduled += rng.expovariate(rate)
+                if scheduled >= deadline:
+                    break
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+                pool.submit(_send, target, next_payload(), recorder, scheduled)
+                submitted += 1
+        # The Poisson draw, not the nominal rate, is what the server was offered
+        load = {"rate": rate, "offered_rps": round(submitted / duration, 2)}
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    sampler.join()
+    return summarize(recorder, elapsed, load)
+
+
+def summarize(recorder: _Recorder, elapsed: float, load: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = np.array([lat for _, lat, _ in recorder.results]) * 1000
+    ok = sum(1 for _, _, good in recorder.results if good)
+    total = len(recorder.results)
+    step = {
+        **load,
+        "requests": total,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round((total - ok) / total, 4) if total else 0.0,
+        "latency_ms": {f"p{p}": round(float(np.percentile(latencies, p)), 1) for p in PERCENTILES}
+        if total else {},
+    }
+    if total:
+        step["latency_ms"]["mean"] = round(float(latencies.mean()), 1)
+        step["latency_ms"]["max"] = round(float(latencies.max()), 1)
+    if recorder.memory:
+        rss = [m["rss_mb"] for m in recorder.memory]
+        step["rss_mb"] = {"start": rss[0], "peak": max(rss), "end": rss[-1]}
+        if "pss_mb" in recorder.memory[0]:
+            # Summed RSS counts shared model pages once per process; PSS does not
+            pss = [m["pss_mb"] for m in recorder.memory]
+            step["pss_mb"] = {"start": pss[0], "peak": max(pss), "end": pss[-1]}
+        step["memory_samples"] = recorder.memory
+    return step
+
+
+def saturation(steps: List[Dict[str, Any]], min_gain: float = 0.05) -> Dict[str, Any]:
+    """
+    Peak throughput, and the knee where the service saturates. For concurrency steps
+    that is the first step whose throughput gain over the previous one is below
+    min_gain while its p95 latency is higher. For rate steps it is the first step
+    that completes less than (1 - 2 * min_gain) of the offered load.
+    """
+    if not steps:
+        return {}
+    peak = max(steps, key=lambda s: s["throughput_rps"])
+    knee = None
+    for prev, step in zip([None] + steps, steps):
+        if "offered_rps" in step:
+            saturated = step["throughput_rps"] < (1 - 2 * min_gain) * step["offered_rps"]
+        elif prev is not None and prev["throughput_rps"]:
+            gain = step["throughput_rps"] / prev["throughput_rps"] - 1
+            saturated = gain < min_gain and step["latency_ms"].get("p95", 0) > prev["latency_ms"].get("p95", 0)
+        else:
+            saturated = False
+        if saturated:
+            knee = {k: step[k] for k in ("concurrency", "rate") if k in step}
+            break
+    return {"peak_throughput_rps": peak["throughput_rps"],
+            "peak_at": {k: peak[k] for k in ("concurrency", "rate") if k in peak},
+            "knee": knee}
+
+
+def run(target, payloads: Sequence[Dict[str, str]], levels: Sequence[float], mode: str = "concurrency",
+        duration: float = 10.0, warmup: int = 4, **kwargs) -> Dict[str, Any]:
+    """Warm the target up, then run one step per load level; returns the steps and the saturation summary."""
+    for payload in list(payloads)[:warmup]:
+        target.post(payload)
+    steps = []
+    for level in levels:
+        load = {"concurrency": int(level)} if mode == "concurrency" else {"rate": float(level)}
+        steps.append(run_step(target, payloads, duration, **load, **kwargs))
+    return {"target": target.name, "mode": mode, "payloads": len(payloads), "duration": duration,
+            "steps": steps, "saturation": saturation(steps)}
+
+
+# -----------------------------
+# Baseline gate
+# -----------------------------
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """Regressions of report against a baseline report (empty if none)."""
+    failures = []
+    peak, base_peak = report["saturation"]["peak_throughput_rps"], baseline["saturation"]["peak_throughput_rps"]
+    if peak < base_peak * (1 - tolerance):
+        failures.append(f"peak throughput {peak} rps < baseline {base_peak} rps")
+    key = report["mode"]
+    base_steps = {s[key]: s for s in baseline["steps"] if key in s}
+    for step in report["steps"]:
+        base = base_steps.get(step[key])
+        if base is None or "p95" not in base["latency_ms"] or "p95" not in step["latency_ms"]:
+            continue
+        if step["latency_ms"]["p95"] > base["latency_ms"]["p95"] * (1 + tolerance):
+            failures.append(f"{key} {step[key]}: p95 {step['latency_ms']['p95']} ms > baseline "
+                            f"{base['latency_ms']['p95']} ms")
+        if step["error_rate"] > base["error_rate"] + 0.01:
+            failures.append(f"{key} {step[key]}: error rate {step['error_rate']} > baseline {base['error_rate']}")
+    return failures
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    key = report["mode"]
+    print(f"{key:>12} {'req':>6} {'rps':>8} {'err':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'rss peak':>9}")
+    for s in report["steps"]:
+        lat = s["latency_ms"]
+        print(f"{s[key]:>12} {s['requests']:>6} {s['throughput_rps']:>8} {s['error_rate']:>6} "
+              f"{lat.get('p50', '-'):>8} {lat.get('p95', '-'):>8} {lat.get('p99', '-'):>8} "
+              f"{s.get('rss_mb', {}).get('peak', '-'):>9}")
+    sat = report["saturation"]
+    print(f"peak {sat['peak_throughput_rps']} rps at {sat['peak_at']}; knee {sat['knee']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /api/analyze and find its saturation point")
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument("--url", help="Running server (default: in-process test client)")
+    target_group.add_argument("--spawn", type=int, metavar="WORKERS", help="Start serve.py with this many workers")
+    parser.add_argument("--server-pid", type=int, help="With --url: pid of the server to sample memory of")
+    load_group = parser.add_mutually_exclusive_group()
+    load_group.add_argument("--concurrency", default=None, help="Closed-loop clients per step, e.g. 1,2,4,8")
+    load_group.add_argument("--rate", default=None, help="Open-loop arrivals per second per step, e.g. 2,4,8")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--payloads", help="Recorded request bodies (JSONL); default synthetic")
+    parser.add_argument("--synthetic", type=int, default=64, help="Number of synthetic payloads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stand-ins", metavar="DIR", help="Build and use tiny offline stand-in models in DIR")
+    parser.add_argument("--cache", action="store_true", help="Keep the score cache on (repeated payloads hit it)")
+    parser.add_argument("--json", metavar="PATH", help="Write the full report here")
+    parser.add_argument("--baseline", metavar="PATH", help="Fail on regressions against this report")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.stand_ins:
+        # Before anything imports the scorers, whose model specs read the environment
+        os.environ.update(STAND_IN_SETTINGS)
+        os.environ.update(build_stand_ins(args.stand_ins))
+    if not args.cache:
+        os.environ["ETHOS_CACHE"] = "off"
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(args.synthetic, seed=args.seed)
+    mode = "rate" if args.rate else "concurrency"
+    levels = [float(v) for v in (args.rate or args.concurrency or "1,2,4,8").split(",")]
+
+    if args.spawn:
+        target = SpawnedTarget(args.spawn)
+    elif args.url:
+        target = HTTPTarget(args.url, args.server_pid)
+    else:
+        import core
+        core.suppress_transformers_warnings()
+        target = InProcessTarget()
+    try:
+        report = run(target, payloads, levels, mode, args.duration, seed=args.seed)
+    finally:
+        target.close()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare_to_baseline(report, json.load(f), args.tolerance)
+        for failure in failures:
+            print("REGRESSION:", failure)
+        sys.exit(1 if failures else 0)
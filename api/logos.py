@@ -1,28 +1,108 @@
-from transformers import pipeline, logging
-import time
+import os
+import random
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
+import cascade
 import core
-import requests, re
+import knowledge
+import nli
+import retrieval
+import re
 
-def generate_sentence_pairs(sentences: List[str], mode: str = "adjacent") -> List[Tuple[str, str]]:
+NLI_MODEL_SPEC = nli.scorer_spec(core.ModelSpec.of(
+    "text-classification", "microsoft/deberta-large-mnli", top_k=None
+).configured("ETHOS_LOGOS_NLI"))
+
+PAIR_MODES = ("adjacent", "full", "window", "similarity", "sampled", "auto")
+# Rough NLI throughput used by the 'auto' estimator (override per deployment)
+DEFAULT_PAIRS_PER_SECOND = float(os.environ.get("ETHOS_LOGOS_PAIRS_PER_SECOND", "20"))
+
+
+def generate_sentence_pairs(sentences: List[str], mode: str = "adjacent", window: int = 3,
+                            threshold: float = 0.2, budget: int = 256, seed: int = 0,
+                            neighbors: int = 5) -> List[Tuple[str, str]]:
     """
     Generate premise-hypothesis sentence pairs for logical consistency checking.
-    mode = 'adjacent' → (s1,s2), (s2,s3), ...
-    mode = 'full' → all possible ordered pairs (s_i, s_j) with i < j
+    mode = 'adjacent'   → (s1,s2), (s2,s3), ...
+    mode = 'full'       → all possible ordered pairs (s_i, s_j) with i < j
+    mode = 'window'     → (s_i, s_j) with 0 < j - i <= window
+    mode = 'similarity' → (s_i, s_j), i < j, where one is among the other's `neighbors` most
+                          TF-IDF-similar sentences with cosine similarity >= threshold
+    mode = 'sampled'    → at most `budget` pairs drawn uniformly (seeded) from the full set
     """
-    pairs = []
-    if len(sentences) < 2:
-        return pairs
+    n = len(sentences)
+    if n < 2:
+        return []
 
     if mode == "adjacent":
-        pairs = [(sentences[i], sentences[i + 1]) for i in range(len(sentences) - 1)]
+        idx = [(i, i + 1) for i in range(n - 1)]
     elif mode == "full":
-        pairs = [(sentences[i], sentences[j]) for i in range(len(sentences)) for j in range(i + 1, len(sentences))]
+        idx = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    elif mode == "window":
+        idx = [(i, j) for i in range(n) for j in range(i + 1, min(n, i + window + 1))]
+    elif mode == "similarity":
+        vecs = retrieval.TfidfVectorizer(sentences).transform(sentences)
+        index = retrieval.InvertedIndex(vecs)
+        # Top-k per sentence straight from the postings: at most n * neighbors pairs, no n x n matrix
+        found = set()
+        for i, vec in enumerate(vecs):
+            for j, _ in index.neighbors(vec, neighbors + 1, threshold):  # + 1: the sentence itself
+                if j != i:
+                    found.add((min(i, j), max(i, j)))
+        idx = sorted(found)
+    elif mode == "sampled":
+        idx = _sample_pair_indices(n, budget, seed)
     else:
-        raise ValueError("mode must be 'adjacent' or 'full'")
+        raise ValueError(f"mode must be one of {PAIR_MODES[:-1]}")
 
-    return pairs
+    return [(sentences[i], sentences[j]) for i, j in idx]
+
+
+def _sample_pair_indices(n: int, budget: int, seed: int = 0) -> List[Tuple[int, int]]:
+    """Uniform sample of (i, j), i < j, without materializing all n(n-1)/2 pairs."""
+    total = n * (n - 1) // 2
+    if budget >= total:
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+    # Row i holds pairs (i, i+1..n-1); offsets[i] = index of its first pair
+    offsets = np.cumsum([0] + [n - 1 - i for i in range(n - 1)])
+    flat = sorted(random.Random(seed).sample(range(total), budget))
+    rows = np.searchsorted(offsets, flat, side="right") - 1
+    return [(int(i), int(i + 1 + f - offsets[i])) for f, i in zip(flat, rows)]
+
+
+def count_sentence_pairs(n: int, mode: str, window: int = 3, budget: int = 256, neighbors: int = 5) -> int:
+    """Number of pairs a mode produces for n sentences (similarity: upper bound)."""
+    if n < 2:
+        return 0
+    full = n * (n - 1) // 2
+    if mode == "adjacent":
+        return n - 1
+    if mode == "window":
+        w = min(window, n - 1)
+        return w * (n - w) + w * (w - 1) // 2
+    if mode == "sampled":
+        return min(budget, full)
+    if mode == "similarity":
+        return min(n * neighbors, full)
+    return full
+
+
+def choose_pair_mode(n_sentences: int, latency_budget: float,
+                     pairs_per_second: float = DEFAULT_PAIRS_PER_SECOND) -> Tuple[str, Dict[str, int]]:
+    """
+    Pick the densest pairing strategy whose pair count fits a latency budget (seconds):
+    full → widest window → adjacent → sampled(budget).
+    Returns (mode, kwargs for generate_sentence_pairs).
+    """
+    max_pairs = max(1, int(latency_budget * pairs_per_second))
+    if count_sentence_pairs(n_sentences, "full") <= max_pairs:
+        return "full", {}
+    for w in range(n_sentences - 2, 1, -1):
+        if count_sentence_pairs(n_sentences, "window", window=w) <= max_pairs:
+            return "window", {"window": w}
+    if count_sentence_pairs(n_sentences, "adjacent") <= max_pairs:
+        return "adjacent", {}
+    return "sampled", {"budget": max_pairs}
 
 def preprocess_logic_text(text: str) -> list[str]:
     """
@@ -59,83 +139,102 @@ def preprocess_logic_text(text: str) -> list[str]:
 
     return merged
 
-def enrich_with_conceptnet(text: str, limit_per_noun: int = 1) -> str:
+def enrich_with_conceptnet(text: str, limit_per_noun: int = 1,
+                           backend: Optional[knowledge.KnowledgeBackend] = None) -> str:
     """
     Add simple ConceptNet 'IsA' relations for nouns/entities found in text.
     Returns the enriched text string.
+    Lookups go through the configured knowledge backend (see knowledge.py);
+    each distinct noun is looked up once.
     Example:
         Input: "Socrates is a man."
         Output: "Socrates is a man. Socrates is a human."
     """
-    nouns = re.findall(r"\b[A-Z][a-z]+\b", text)
-    added = []
-    for n in nouns:
-        try:
-            url = f"https://api.conceptnet.io/query?node=/c/en/{n.lower()}&rel=/r/IsA&limit={limit_per_noun}"
-            resp = requests.get(url, timeout=3).json()
-            edges = resp.get("edges", [])
-            for e in edges:
-                end = e["end"]["label"]
-                added.append(f"{n} is a {end}.")
-        except Exception:
-            continue
+    nouns = list(dict.fromkeys(re.findall(r"\b[A-Z][a-z]+\b", text)))
+    if not nouns:
+        return text
+    backend = backend or knowledge.get_backend()
+    with core.span("conceptnet.enrich", nouns=len(nouns)):
+        relations = backend.isa_many(nouns, limit_per_noun)
+    added = [f"{n} is a {end}." for n in nouns for end in relations.get(n, [])]
     if added:
         return text + " " + " ".join(added)
     return text
 
-def compute_logical_coherence(text: str, nli_model=None, mode: str = "full", verbose: bool = False) -> float:
+def prefetch_conceptnet(texts: List[str], limit_per_noun: int = 1,
+                        backend: Optional[knowledge.KnowledgeBackend] = None) -> None:
+    """Look up the nouns of many texts in one (concurrent) call so later enrichment hits the cache."""
+    nouns = [n for t in texts for n in re.findall(r"\b[A-Z][a-z]+\b", t)]
+    if nouns:
+        (backend or knowledge.get_backend()).isa_many(nouns, limit_per_noun)
+
+
+def coherence_pairs(text: str, mode: str = "full", window: int = 3, threshold: float = 0.2,
+                    budget: int = 256, latency_budget: Optional[float] = None,
+                    enrich: bool = True) -> List[Tuple[str, str]]:
+    """
+    (premise, hypothesis) pairs compute_logical_coherence scores for text:
+    ConceptNet enrichment → syllogism-aware preprocessing → pair generation.
+    """
+    expanded_text = enrich_with_conceptnet(text) if enrich else text
+    sentences = preprocess_logic_text(expanded_text)
+    pair_kwargs = {"window": window, "threshold": threshold, "budget": budget}
+    if mode == "auto":
+        mode, chosen = choose_pair_mode(len(sentences), latency_budget if latency_budget is not None else 5.0)
+        pair_kwargs.update(chosen)
+    with core.span("logos.pairs", mode=mode, sentences=len(sentences)) as s:
+        pairs = generate_sentence_pairs(sentences, mode=mode, **pair_kwargs)
+        s.set(pairs=len(pairs))
+    return pairs
+
+
+def coherence_from_probs(pair_probs: List[Dict[str, float]]) -> float:
+    """Mean entailment minus mean contradiction over pairs, normalized to [0, 1]."""
+    return core.coherence_score(core.probs_array(pair_probs))
+
+
+def compute_logical_coherence(text: str, nli_model=None, mode: str = "full", verbose: bool = False,
+                              window: int = 3, threshold: float = 0.2, budget: int = 256,
+                              latency_budget: Optional[float] = None) -> float:
     """
     Compute an internal logical coherence score using NLI entailment.
     Score ∈ [0, 1] → 1 = consistent, 0 = contradictory.
+    mode: see generate_sentence_pairs; 'auto' picks one from the sentence count
+    and latency_budget (seconds, default 5) via choose_pair_mode.
     """
-    logging.set_verbosity_error()
+    core.suppress_transformers_warnings()
     if nli_model is None:
-        nli_model = pipeline("text-classification", model="microsoft/deberta-large-mnli", top_k=None)
-
-    expanded_text = enrich_with_conceptnet(text)
+        nli_model = core.get_model(NLI_MODEL_SPEC)
 
-    sentences = preprocess_logic_text(expanded_text)  # whatever function you already have
-    pairs = generate_sentence_pairs(sentences, mode='full')
+    pairs = coherence_pairs(text, mode, window, threshold, budget, latency_budget)
+    probs = cascade.predict_probs(nli_model, pairs)
 
-    if not pairs:
-        return 0.5  # neutral default
+    if verbose:
+        for (p, h), row in zip(pairs, probs):
+            print(f"{p[:50]} → {h[:50]} | entail={row[core.ENTAILMENT]:.2f}, "
+                  f"contra={row[core.CONTRADICTION]:.2f}")
 
-    entailment_sum, contradiction_sum = 0.0, 0.0
+    return core.coherence_score(probs)
 
-    for p, h in pairs:
-        raw = nli_model(f"{p} </s></s> {h}")[0]
-        probs = core.label_probs_from_pipeline_output(raw)
-        p_entail = probs.get("ENTAILMENT", 0.0)
-        p_contra = probs.get("CONTRADICTION", 0.0)
-        entailment_sum += p_entail
-        contradiction_sum += p_contra
 
-        if verbose:
-            print(f"{p[:50]} → {h[:50]} | entail={p_entail:.2f}, contra={p_contra:.2f}")
+EXAMPLE_CASES = [
+    {
+        "name": "Fully logical chain",
+        "text": "All humans are mortal. Therefore, Socrates is mortal."
+    },
+    {
+        "name": "Contradictory logic",
+        "text": "The sky is blue. The sky is not blue."
+    },
+    {
+        "name": "Neutral / disconnected sentences",
+        "text": "The cat sat on the mat. The Eiffel Tower is in Paris."
+    }
+]
 
-    avg_entail = entailment_sum / len(pairs)
-    avg_contra = contradiction_sum / len(pairs)
-    raw_score = avg_entail - avg_contra
-    norm_score = (raw_score + 1) / 2  # normalize to [0,1]
-    return round(float(norm_score), 4)
 
 if __name__ == '__main__':
-    texts = [
-        {
-            "name": "Fully logical chain",
-            "text": "All humans are mortal. Therefore, Socrates is mortal."
-        },
-        {
-            "name": "Contradictory logic",
-            "text": "The sky is blue. The sky is not blue."
-        },
-        {
-            "name": "Neutral / disconnected sentences",
-            "text": "The cat sat on the mat. The Eiffel Tower is in Paris."
-        }
-    ]
-
-    for t in texts:
+    for t in EXAMPLE_CASES:
         print(f"\n=== {t['name']} ===")
         print(f"{t['text']}")
         score = compute_logical_coherence(t["text"])
@@ -0,0 +1,347 @@
+"""
+nli.py
+Batched NLI (premise, hypothesis) inference for the ethos and logos scorers.
+
+Instead of one forward pass per "premise </s></s> hypothesis" string, all pairs
+are tokenized as proper text pairs, sorted by length and run through the model
+in padded batches under torch.inference_mode.
+
+With ETHOS_SHARED_NLI=1 ethos and logos use one NLI model (SHARED_NLI_SPEC,
+overridable with ETHOS_SHARED_NLI_MODEL / ETHOS_SHARED_NLI_BACKEND): one copy in
+memory, one tokenizer, and one engine / micro-batch queue for both scorers.
+Labels are mapped onto core.NLI_LABELS so any MNLI-style model can be used.
+"""
+import os
+import time
+import argparse
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import cache
+import core
+import scheduler
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("ETHOS_NLI_BATCH_SIZE", "16"))
+MAX_LENGTH = 512
+# Sentences whose token ids each engine memoizes (a sentence usually appears in many pairs)
+TOKEN_CACHE_SIZE = int(os.environ.get("ETHOS_NLI_TOKEN_CACHE", "50000"))
+
+Pair = Tuple[str, str]
+
+SHARED_NLI = os.environ.get("ETHOS_SHARED_NLI", "0").lower() in ("1", "on", "true")
+SHARED_NLI_SPEC = core.ModelSpec.of(
+    "text-classification", "roberta-large-mnli", top_k=None
+).configured("ETHOS_SHARED_NLI")
+
+
+def scorer_spec(spec: core.ModelSpec) -> core.ModelSpec:
+    """The NLI model a scorer should use: its own spec, or the shared one when enabled."""
+    return SHARED_NLI_SPEC if SHARED_NLI else spec
+
+
+# -----------------------------
+# Engines
+# -----------------------------
+class NLIEngine:
+    """Batched sequence-pair classifier built from a model + tokenizer."""
+
+    def __init__(self, model, tokenizer, batch_size: int = DEFAULT_BATCH_SIZE, max_length: int = MAX_LENGTH,
+                 labels: Optional[Sequence[str]] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        if labels is None:
+            id2label = model.config.id2label
+            labels = [core.canonical_label(id2label[i]) for i in range(len(id2label))]
+        self.labels = list(labels)
+        # Fast tokenizers are not safe to call from several threads at once, and
+        # a shared engine is called by both scorers concurrently
+        self._tokenizer_lock = threading.Lock()
+        self._token_ids = core.LRUCache(TOKEN_CACHE_SIZE)
+        self._pinned: Dict[str, List[int]] = {}
+        self._pin_counts: Dict[str, int] = {}
+        self._pin_lock = threading.Lock()
+        self._template = None
+
+    @property
+    def device(self):
+        return next(self.model.parameters()).device
+
+    # -----------------------------
+    # Tokenization
+    # -----------------------------
+    def _pair_template(self):
+        """
+        Special tokens around a text pair, read off one probe encoding:
+        (prefix, middle, suffix) ids and the token type of every part.
+        False if the tokenizer's pair layout is not 'prefix A middle B suffix'.
+        """
+        if self._template is None:
+            a, b = "first probe text", "second probe text"
+            with self._tokenizer_lock:
+                a_ids = self.tokenizer(a, add_special_tokens=False)["input_ids"]
+                b_ids = self.tokenizer(b, add_special_tokens=False)["input_ids"]
+                enc = self.tokenizer(a, b)
+            ids, types = enc["input_ids"], enc.get("token_type_ids")
+            la, lb = len(a_ids), len(b_ids)
+            starts_a = [i for i in range(len(ids) - la + 1) if ids[i:i + la] == a_ids]
+            starts_b = [j for j in range(len(ids) - lb + 1) if ids[j:j + lb] == b_ids]
+            template = False
+            if starts_a and starts_b and starts_b[-1] >= starts_a[0] + la:
+                i, j = starts_a[0], starts_b[-1]
+                bounds = (0, i, i + la, j, j + lb, len(ids))
+                parts = (ids[:i], ids[i + la:j], ids[j + lb:])
+                type_parts = None if types is None else [types[lo:hi] for lo, hi in zip(bounds, bounds[1:])]
+                if type_parts is None or (len(set(type_parts[1])) <= 1 and len(set(type_parts[3])) <= 1):
+                    template = (parts, type_parts)
+            self._template = template
+        return self._template
+
+    def token_ids(self, texts: Sequence[str]) -> List[List[int]]:
+        """Token ids of each text (no special tokens); pinned and recently seen texts are not re-tokenized."""
+        out: List[Optional[List[int]]] = [None] * len(texts)
+        todo: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            ids = self._pinned.get(text)
+            if ids is None:
+                ids = self._token_ids.get(text)
+            if ids is None:
+                todo.setdefault(text, []).append(i)
+            else:
+                out[i] = ids
+        if todo:
+            with self._tokenizer_lock:
+                encoded = self.tokenizer(list(todo), add_special_tokens=False)["input_ids"]
+            for (text, positions), ids in zip(todo.items(), encoded):
+                self._token_ids.put(text, ids)
+                for i in positions:
+                    out[i] = ids
+        return out
+
+    def pin(self, texts: Iterable[str]) -> None:
+        """Keep the token ids of texts (e.g. a registered source) until unpin()."""
+        texts = list(dict.fromkeys(texts))
+        encoded = self.token_ids(texts)
+        with self._pin_lock:
+            for text, ids in zip(texts, encoded):
+                self._pinned[text] = ids
+                self._pin_counts[text] = self._pin_counts.get(text, 0) + 1
+
+    def unpin(self, texts: Iterable[str]) -> None:
+        with self._pin_lock:
+            for text in dict.fromkeys(texts):
+                count = self._pin_counts.get(text, 0) - 1
+                if count > 0:
+                    self._pin_counts[text] = count
+                else:
+                    self._pin_counts.pop(text, None)
+                    self._pinned.pop(text, None)
+
+    def encode_pairs(self, pairs: Sequence[Pair]) -> Dict[str, List[List[int]]]:
+        """
+        Model inputs for text pairs. Each distinct sentence is tokenized once (see token_ids)
+        and pairs are assembled around the tokenizer's special tokens; pairs that need
+        truncation, or tokenizers with an unusual pair layout, go through the tokenizer.
+        """
+        template = self._pair_template()
+        if not template:
+            with self._tokenizer_lock:
+                return dict(self.tokenizer([p for p, _ in pairs], [h for _, h in pairs],
+                                           truncation=True, max_length=self.max_length))
+        (prefix, middle, suffix), type_parts = template
+        n_special = len(prefix) + len(middle) + len(suffix)
+        ids = self.token_ids([text for pair in pairs for text in pair])
+        enc: Dict[str, List[List[int]]] = {"input_ids": [], "attention_mask": []}
+        if type_parts is not None:
+            enc["token_type_ids"] = []
+        too_long = []
+        for k in range(len(pairs)):
+            a, b = ids[2 * k], ids[2 * k + 1]
+            if len(a) + len(b) + n_special > self.max_length:
+                too_long.append(k)
+            input_ids = prefix + a + middle + b + suffix
+            enc["input_ids"].append(input_ids)
+            enc["attention_mask"].append([1] * len(input_ids))
+            if type_parts is not None:
+                t_pre, t_a, t_mid, t_b, t_suf = type_parts
+                enc["token_type_ids"].append(t_pre + t_a[:1] * len(a) + t_mid + t_b[:1] * len(b) + t_suf)
+        if too_long:
+            with self._tokenizer_lock:
+                truncated = self.tokenizer([pairs[k][0] for k in too_long], [pairs[k][1] for k in too_long],
+                                           truncation=True, max_length=self.max_length)
+            for key in enc:
+                for k, row in zip(too_long, truncated[key]):
+                    enc[key][k] = row
+        return enc
+
+    def predict_proba(self, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> np.ndarray:
+        """Probabilities of shape (len(pairs), len(self.labels)), in input order."""
+        probs = np.zeros((len(pairs), len(self.labels)), dtype=np.float32)
+        if not pairs:
+            return probs
+        import torch
+        batch_size = batch_size or self.batch_size
+
+        with core.span("nli.tokenize", pairs=len(pairs)):
+            enc = self.encode_pairs(pairs)
+        # Length-sorted batches keep padding (and wasted compute) to a minimum
+        order = np.argsort([len(ids) for ids in enc["input_ids"]], kind="stable")
+        device = self.device
+
+        self.model.eval()
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                idx = order[start:start + batch_size]
+                features = {k: [enc[k][i] for i in idx] for k in enc.keys()}
+                with self._tokenizer_lock:
+                    batch = self.tokenizer.pad(features, return_tensors="pt")
+                batch = {k: v.to(device) for k, v in batch.items()}
+                with core.span("nli.forward", batch=len(idx), tokens=int(batch["input_ids"].shape[1])):
+                    logits = self.model(**batch).logits
+                probs[idx] = torch.softmax(logits.float(), dim=-1).cpu().numpy()
+        core.count("nli_pairs_scored", len(pairs))
+        return probs
+
+    def predict_probs(self, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Probabilities of shape (len(pairs), len(core.NLI_LABELS)) in core.NLI_LABELS column order.
+        Rows are cached per (model revision, pair) in the shared score cache.
+        """
+        def compute(todo):
+            return core.align_columns(self.predict_proba(todo, batch_size), self.labels).tolist()
+
+        rows = cache.cached_map("nli_probs", self, [list(p) for p in pairs], compute)
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(core.NLI_LABELS))
+
+    def predict(self, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> List[Dict[str, float]]:
+        """Same per-pair label → prob dicts as core.label_probs_from_pipeline_output."""
+        return core.probs_to_dicts(self.predict_probs(pairs, batch_size))
+
+
+class CallableNLIEngine(NLIEngine):
+    """
+    Fallback for NLI callables that do not expose model/tokenizer:
+    scores one hand-joined string per pair, like the original loop.
+    """
+
+    def __init__(self, fn, batch_size: int = DEFAULT_BATCH_SIZE):
+        # Its outputs are read into core.NLI_LABELS columns, so the labels never change
+        super().__init__(None, None, batch_size, labels=core.NLI_LABELS)
+        self.fn = fn
+
+    def predict_proba(self, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> np.ndarray:
+        rows = [core.label_probs_from_pipeline_output(self.fn(f"{p} </s></s> {h}")[0]) for p, h in pairs]
+        return np.array([[row.get(label, 0.0) for label in self.labels] for row in rows],
+                        dtype=np.float32).reshape(len(rows), len(self.labels))
+
+
+_engines: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def clear_token_caches() -> None:
+    """Forget the recently seen token ids of every engine (pinned texts are kept)."""
+    for engine in list(_engines.values()):
+        token_ids = getattr(engine, "_token_ids", None)
+        if token_ids is not None:
+            token_ids.clear()
+
+
+def get_engine(nli_model) -> NLIEngine:
+    """
+    Batched engine wrapping a text-classification pipeline (cached per pipeline and shared
+    by every caller: pass a batch size to each predict call rather than setting it here).
+    """
+    if isinstance(nli_model, NLIEngine):
+        return nli_model
+    engine = _engines.get(nli_model)
+    if engine is None:
+        if hasattr(nli_model, "model") and hasattr(nli_model, "tokenizer"):
+            engine = NLIEngine(nli_model.model, nli_model.tokenizer)
+        else:
+            engine = CallableNLIEngine(nli_model)
+        _engines[nli_model] = engine
+    return engine
+
+
+def _predict_probs(nli_model, pairs: List[Pair]) -> np.ndarray:
+    return get_engine(nli_model).predict_probs(pairs)
+
+
+def predict_probs(nli_model, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> np.ndarray:
+    """
+    (pairs, core.NLI_LABELS) probability array. Routed through the shared micro-batcher
+    (see scheduler.py) when enabled, so pairs from concurrent callers share forward passes.
+    """
+    if batch_size is not None:
+        return get_engine(nli_model).predict_probs(pairs, batch_size)
+    rows = scheduler.run("nli", nli_model, _predict_probs, list(pairs))
+    return np.asarray(rows, dtype=np.float64).reshape(len(rows), len(core.NLI_LABELS))
+
+
+def predict(nli_model, pairs: Sequence[Pair], batch_size: Optional[int] = None) -> List[Dict[str, float]]:
+    """Label → prob dict per pair (predict_probs as JSON-friendly dicts)."""
+    return core.probs_to_dicts(predict_probs(nli_model, pairs, batch_size))
+
+
+# -----------------------------
+# Benchmark: per-pair loop vs batched engine
+# -----------------------------
+def _loop_predict(nli_model, pairs: Sequence[Pair]) -> List[Dict[str, float]]:
+    return [core.label_probs_from_pipeline_output(nli_model(f"{p} </s></s> {h}")[0]) for p, h in pairs]
+
+
+def benchmark(nli_model, premises: Sequence[str], hypotheses: Sequence[str],
+              batch_sizes: Sequence[int] = (1, 8, 16, 32), repeats: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    Compare pairs/second of the original per-pair loop against the batched engine,
+    and report the largest probability difference between the two.
+    """
+    pairs = [(p, h) for p in premises for h in hypotheses]
+    results = {}
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        reference = _loop_predict(nli_model, pairs)
+    loop_time = (time.perf_counter() - t0) / repeats
+    results["loop"] = {"pairs_per_second": len(pairs) / loop_time, "seconds": loop_time}
+
+    engine = get_engine(nli_model)
+    for bs in batch_sizes:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            batched = engine.predict_proba(pairs, batch_size=bs)  # uncached on purpose
+        seconds = (time.perf_counter() - t0) / repeats
+        drift = max(
+            (abs(ref.get(label, 0.0) - float(p)) for ref, row in zip(reference, batched)
+             for label, p in zip(engine.labels, row)),
+            default=0.0,
+        )
+        results[f"batched_{bs}"] = {
+            "pairs_per_second": len(pairs) / seconds,
+            "seconds": seconds,
+            "speedup": loop_time / seconds,
+            "max_abs_prob_diff": drift,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import ethos
+
+    parser = argparse.ArgumentParser(description="Benchmark batched NLI against the per-pair loop")
+    parser.add_argument("--candidates", type=int, default=8, help="Number of candidate sentences")
+    parser.add_argument("--sources", type=int, default=16, help="Number of source sentences")
+    parser.add_argument("--batch-sizes", default="1,8,16,32")
+    args = parser.parse_args()
+
+    source = "The Eiffel Tower is located in Paris. It was completed in 1889. "
+    candidate = "The Eiffel Tower, situated in Paris, was completed in 1889. "
+    src_sents = (core.split_sentences(source) * args.sources)[:args.sources]
+    cand_sents = (core.split_sentences(candidate) * args.candidates)[:args.candidates]
+
+    model = core.get_model(ethos.NLI_MODEL_SPEC)
+    sizes = [int(b) for b in args.batch_sizes.split(",")]
+    for name, stats in benchmark(model, cand_sents, src_sents, sizes).items():
+        print(name, {k: round(v, 4) for k, v in stats.items()})
@@ -2,59 +2,100 @@
 
 import time
 import numpy as np
-from transformers import pipeline, logging
+import cache
 import core
-from typing import List, Dict
+import scheduler
+from typing import List, Dict, Optional, Tuple
 
+EMOTION_MODEL_SPEC = core.ModelSpec.of(
+    "text-classification", "bhadresh-savani/distilbert-base-uncased-emotion", top_k=None
+).configured("ETHOS_EMOTION")
+
+# Fixed column order for emotion arrays, and each label's weight in the Pathos score
+# (see pathos_from_emotions): positive emotions raise it, negative / neutral lower it
+EMOTION_LABELS = ("sadness", "joy", "love", "anger", "fear", "surprise", "disgust", "neutral")
+EMOTION_WEIGHTS = {"joy": 1.0, "surprise": 1.0, "anger": -1.0, "fear": -1.0, "disgust": -1.0, "neutral": -0.5}
 
 # -----------------------------
 # Emotion / Pathos computation
 # -----------------------------
+def emotion_labels(emotion_model) -> List[str]:
+    """The model's emotion labels in class-id order (EMOTION_LABELS if it has no config)."""
+    return core.model_labels(emotion_model, str.lower) or list(EMOTION_LABELS)
+
+
+def _emotion_batch(emotion_model, sentences: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+    labels = emotion_labels(emotion_model)
+    index = {label: j for j, label in enumerate(labels)}
+
+    def compute(todo):
+        with core.span("emotion.forward", inputs=len(todo)):
+            outputs = emotion_model(todo, batch_size=batch_size or core.BATCH_SIZE)
+        core.count("emotion_inputs_scored", len(todo))
+        rows = []
+        for out in outputs:
+            row = [0.0] * len(labels)
+            for r in out:
+                j = index.get(r["label"].lower())
+                if j is not None:
+                    row[j] = float(r["score"])
+            rows.append(row)
+        return rows
+
+    return cache.cached_map("emotion_probs", emotion_model, sentences, compute)
+
+
+def emotion_matrix(sentences: List[str], emotion_model=None,
+                   batch_size: Optional[int] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Emotion probabilities of shape (len(sentences), labels) and the model's label order,
+    from one batched pipeline call (shared with concurrent callers when micro-batching is enabled).
+    """
+    if not sentences and emotion_model is None:
+        return np.zeros((0, len(EMOTION_LABELS))), list(EMOTION_LABELS)
+    if emotion_model is None:
+        emotion_model = core.get_model(EMOTION_MODEL_SPEC)
+    labels = emotion_labels(emotion_model)
+    if not sentences:
+        return np.zeros((0, len(labels))), labels
+    if batch_size is not None:
+        rows = _emotion_batch(emotion_model, list(sentences), batch_size)
+    else:
+        rows = scheduler.run("emotion", emotion_model, _emotion_batch, list(sentences))
+    return np.asarray(rows, dtype=np.float64).reshape(len(rows), len(labels)), labels
+
+
+def emotion_probs(sentences: List[str], emotion_model=None, batch_size: Optional[int] = None) -> np.ndarray:
+    """emotion_matrix in the fixed EMOTION_LABELS column order (labels outside it are dropped)."""
+    matrix, labels = emotion_matrix(sentences, emotion_model, batch_size)
+    return core.align_columns(matrix, labels, EMOTION_LABELS)
+
+
 def compute_emotion_scores(text: str, emotion_model=None, verbose: bool = False) -> Dict[str, float]:
     """
     Compute emotion distribution for input text.
     Returns dict: emotion label → average score across sentences.
     """
-    from collections import defaultdict
-    logging.set_verbosity_error()
-    if emotion_model is None:
-        emotion_model = pipeline(
-            "text-classification",
-            model="bhadresh-savani/distilbert-base-uncased-emotion",
-            top_k=None
-        )
-
+    core.suppress_transformers_warnings()
     sentences = core.split_sentences(text)
     if not sentences:
         return {}
 
-    # Use defaultdict to handle unexpected labels dynamically
-    all_scores = defaultdict(float)
-
-    for s in sentences:
-        results = emotion_model(s)[0]  # list of dicts
-        for r in results:
-            label = r["label"].lower()
-            score = float(r["score"])
-            all_scores[label] += score
-        if verbose:
+    matrix, labels = emotion_matrix(sentences, emotion_model)
+    if verbose:
+        for s, row in zip(sentences, matrix.tolist()):
             print(f"[DEBUG] Sentence: {s}")
-            print({r["label"]: round(r["score"],3) for r in results})
-
-    # Average across sentences
-    num_sents = len(sentences)
-    averaged_scores = {k: v / num_sents for k, v in all_scores.items()}
+            print({k: round(v, 3) for k, v in zip(labels, row)})
 
-    return averaged_scores
+    return dict(zip(labels, matrix.mean(axis=0).tolist()))
 
 
-def compute_pathos_score(text: str, emotion_model=None) -> float:
+def pathos_from_emotions(scores: Dict[str, float]) -> float:
     """
     Convert emotion distribution to a single Pathos score ∈ [0,1].
     Idea: Positive emotions (joy, surprise) increase persuasiveness,
     negative/neutral decrease it.
     """
-    scores = compute_emotion_scores(text, emotion_model)
     if not scores:
         return 0.5
 
@@ -67,43 +108,58 @@ def compute_pathos_score(text: str, emotion_model=None) -> float:
     return round(float(max(0.0, min(1.0, norm))), 4)
 
 
+def pathos_scores(emotions: np.ndarray, labels=EMOTION_LABELS) -> np.ndarray:
+    """pathos_from_emotions for every row of an emotion array (unrounded)."""
+    weights = np.array([EMOTION_WEIGHTS.get(label, 0.0) for label in labels])
+    return np.clip((np.asarray(emotions, dtype=np.float64) @ weights + 1) / 2, 0.0, 1.0)
+
+
+def compute_pathos_score(text: str, emotion_model=None) -> float:
+    """Single Pathos score ∈ [0,1] for text (see pathos_from_emotions)."""
+    return pathos_from_emotions(compute_emotion_scores(text, emotion_model))
+
+
 # -----------------------------
 # Combined Pathos Analysis
 # -----------------------------
-def analyze_pathos(text: str, emotion_model=None):
+def analyze_pathos(text: str, emotion_model=None, verbose: bool = False):
     start = time.time()
-    print("---- Pathos (Emotional Appeal) Evaluation ----")
-    print("Text:", text)
-    print("----------------------------------------------")
-    scores = compute_emotion_scores(text, emotion_model, verbose=True)
-    pathos_score = compute_pathos_score(text, emotion_model)
+    if verbose:
+        print("---- Pathos (Emotional Appeal) Evaluation ----")
+        print("Text:", text)
+        print("----------------------------------------------")
+    with core.span("pathos.analyze"):
+        scores = compute_emotion_scores(text, emotion_model, verbose=verbose)
+        pathos_score = pathos_from_emotions(scores)
     elapsed = round(time.time() - start, 2)
 
-    print("Emotion Scores:", {k: round(v,3) for k,v in scores.items()})
-    print("Pathos Score:", pathos_score)
-    print(f"Runtime: {elapsed} s")
+    if verbose:
+        print("Emotion Scores:", {k: round(v,3) for k,v in scores.items()})
+        print("Pathos Score:", pathos_score)
+        print(f"Runtime: {elapsed} s")
     return {"emotion_scores": scores, "pathos_score": pathos_score, "runtime": elapsed}
 
 
 # -----------------------------
 # Example Test Cases
 # -----------------------------
+EXAMPLE_CASES = [
+    {
+        "name": "Highly positive / inspiring",
+        "text": "I can’t believe how inspiring your story was — it gave me hope!"
+    },
+    {
+        "name": "Neutral / factual",
+        "text": "The Eiffel Tower is located in Paris. It was completed in 1889."
+    },
+    {
+        "name": "Angry / negative",
+        "text": "I am furious that this happened. It's absolutely unacceptable!"
+    }
+]
+
+
 if __name__ == "__main__":
-    tests = [
-        {
-            "name": "Highly positive / inspiring",
-            "text": "I can’t believe how inspiring your story was — it gave me hope!"
-        },
-        {
-            "name": "Neutral / factual",
-            "text": "The Eiffel Tower is located in Paris. It was completed in 1889."
-        },
-        {
-            "name": "Angry / negative",
-            "text": "I am furious that this happened. It's absolutely unacceptable!"
-        }
-    ]
-
-    for t in tests:
+    for t in EXAMPLE_CASES:
         print(f"\n=== Test: {t['name']} ===")
-        analyze_pathos(t["text"])
\ No newline at end of file
+        analyze_pathos(t["text"], verbose=True)
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+retrieval.py
+Index source sentences once and retrieve the most relevant ones per query sentence,
+so NLI only runs on a few likely-supporting (candidate, source) pairs.
+
+Methods:
+ - tfidf     → sparse TF-IDF (term → weight per sentence) scored through an inverted
+               index, so memory and time grow with the terms sentences share, not with
+               sentences × vocabulary (no model needed)
+ - embedding → mean-pooled sentence embeddings from a feature-extraction model
+"""
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import core
+
+EMBEDDING_MODEL_SPEC = core.ModelSpec.of("feature-extraction", "sentence-transformers/all-MiniLM-L6-v2")
+RETRIEVAL_METHODS = ("tfidf", "embedding")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Term index → weight; TF-IDF vectors are L2-normalised
+SparseVector = Dict[int, float]
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+# -----------------------------
+# Vectorizers
+# -----------------------------
+class TfidfVectorizer:
+    """Smoothed TF-IDF fitted on a fixed set of sentences; unknown query terms are dropped."""
+
+    def __init__(self, sentences: Sequence[str]):
+        docs = [Counter(tokenize(s)) for s in sentences]
+        self.vocab: Dict[str, int] = {}
+        df: Counter = Counter()
+        for doc in docs:
+            df.update(doc.keys())
+            for term in doc:
+                self.vocab.setdefault(term, len(self.vocab))
+        n = len(docs)
+        self.idf = np.ones(len(self.vocab), dtype=np.float32)
+        for term, idx in self.vocab.items():
+            self.idf[idx] = math.log((1 + n) / (1 + df[term])) + 1.0
+
+    def transform(self, sentences: Sequence[str]) -> List[SparseVector]:
+        vectors = []
+        for s in sentences:
+            weights = {}
+            for term, count in Counter(tokenize(s)).items():
+                idx = self.vocab.get(term)
+                if idx is not None:
+                    weights[idx] = count * float(self.idf[idx])
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            vectors.append({idx: w / norm for idx, w in weights.items()})
+        return vectors
+
+
+class InvertedIndex:
+    """Postings (rows, weights) per term over sparse vectors; dot products only visit shared terms."""
+
+    def __init__(self, vectors: Sequence[SparseVector]):
+        self.n_rows = len(vectors)
+        postings: Dict[int, List[List[float]]] = {}
+        for row, vec in enumerate(vectors):
+            for idx, weight in vec.items():
+                rows_weights = postings.setdefault(idx, [[], []])
+                rows_weights[0].append(row)
+                rows_weights[1].append(weight)
+        self.postings = {idx: (np.asarray(rows, dtype=np.intp), np.asarray(weights, dtype=np.float32))
+                         for idx, (rows, weights) in postings.items()}
+
+    def scores(self, queries: Sequence[SparseVector]) -> np.ndarray:
+        """Dot products of shape (len(queries), n_rows): cosine similarities for normalised vectors."""
+        out = np.zeros((len(queries), self.n_rows), dtype=np.float32)
+        for q, vec in enumerate(queries):
+            for idx, weight in vec.items():
+                posting = self.postings.get(idx)
+                if posting is not None:
+                    rows, weights = posting
+                    out[q, rows] += weight * weights  # a row appears at most once per term
+        return out
+
+    def neighbors(self, query: SparseVector, k: int, threshold: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        The k rows most similar to query with a score >= threshold, best first, as (row, score).
+        Only rows sharing a term with the query are visited; no dense row of n scores is built.
+        """
+        hits = [(self.postings[idx], weight) for idx, weight in query.items() if idx in self.postings]
+        if not hits or k <= 0:
+            return []
+        rows = np.concatenate([posting[0] for posting, _ in hits])
+        weights = np.concatenate([posting[1] * weight for posting, weight in hits])
+        touched, inverse = np.unique(rows, return_inverse=True)
+        sums = np.bincount(inverse, weights=weights)
+        keep = np.flatnonzero(sums >= threshold)
+        if len(keep) > k:
+            keep = keep[np.argpartition(-sums[keep], k - 1)[:k]]
+        keep = keep[np.argsort(-sums[keep], kind="stable")]
+        return list(zip(touched[keep].tolist(), sums[keep].tolist()))
+
+
+class EmbeddingVectorizer:
+    """Mean-pooled, L2-normalised embeddings from a shared feature-extraction pipeline."""
+
+    def __init__(self, embed_model=None):
+        self.embed_model = embed_model if embed_model is not None else core.get_model(EMBEDDING_MODEL_SPEC)
+
+    def transform(self, sentences: Sequence[str]) -> np.ndarray:
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        outputs = self.embed_model(list(sentences))
+        vecs = [np.asarray(out, dtype=np.float32).reshape(-1, np.shape(out)[-1]).mean(axis=0) for out in outputs]
+        return _normalize_rows(np.stack(vecs))
+
+
+# -----------------------------
+# Source index
+# -----------------------------
+class SourceIndex:
+    """Vectorized source sentences supporting top-k lookup for query sentences."""
+
+    def __init__(self, sentences: Sequence[str], method: str = "tfidf", embed_model=None):
+        if method not in RETRIEVAL_METHODS:
+            raise ValueError(f"method must be one of {RETRIEVAL_METHODS}")
+        self.sentences = list(sentences)
+        self.method = method
+        self.embed_model = embed_model
+        self._vectorizer = None
+        self._matrix: Optional[Union[InvertedIndex, np.ndarray]] = None  # tfidf: inverted index
+
+    def build(self) -> "SourceIndex":
+        """Vectorize the source sentences (done lazily on first lookup otherwise)."""
+        if self._matrix is None:
+            if self.method == "tfidf":
+                self._vectorizer = TfidfVectorizer(self.sentences)
+                self._matrix = InvertedIndex(self._vectorizer.transform(self.sentences))
+            else:
+                self._vectorizer = EmbeddingVectorizer(self.embed_model)
+                self._matrix = self._vectorizer.transform(self.sentences)
+        return self
+
+    def similarities(self, queries: Sequence[str]) -> np.ndarray:
+        """Cosine similarities of shape (len(queries), len(self.sentences))."""
+        if not queries or not self.sentences:
+            return np.zeros((len(queries), len(self.sentences)), dtype=np.float32)
+        self.build()
+        if self.method == "tfidf":
+            return self._matrix.scores(self._vectorizer.transform(queries))
+        return self._vectorizer.transform(queries) @ self._matrix.T
+
+    def top_k(self, queries: Sequence[str], k: Optional[int]) -> List[List[int]]:
+        """Indices of the k most similar source sentences per query (all of them if k is None)."""
+        if k is not None and k < 1:
+            raise ValueError("k must be a positive integer")
+        n = len(self.sentences)
+        if k is None or k >= n:
+            return [list(range(n)) for _ in queries]
+        sims = self.similarities(queries)
+        return [[int(i) for i in np.argsort(-row, kind="stable")[:k]] for row in sims]
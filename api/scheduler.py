@@ -0,0 +1,242 @@
+"""
+scheduler.py
+Dynamic micro-batching in front of the scorer models.
+
+Concurrent callers (HTTP requests, job workers, executor threads) submit their
+inputs to a per-model MicroBatcher. A background thread collects requests for up
+to max_wait_ms or until max_batch_size inputs are queued, runs one batched call,
+and hands each caller back its slice of the outputs. If the combined call fails,
+each request in it is re-run on its own so only the caller whose inputs fail sees
+the error.
+
+Environment:
+ ETHOS_MICROBATCH=1              enable (off by default for library use)
+ ETHOS_MICROBATCH_MAX_BATCH=<n>  inputs per combined call (default 64)
+ ETHOS_MICROBATCH_WAIT_MS=<ms>   how long to wait for more callers (default 5)
+ ETHOS_TORCH_THREADS=<n>         CPU budget split between the batcher threads, where the
+                                 forward passes run (see executor.intra_op_threads_for)
+"""
+import os
+import time
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _Request:
+    __slots__ = ("items", "future", "enqueued")
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Coalesces inputs from concurrent callers into batched calls of fn(inputs) → outputs."""
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0, torch_threads: Optional[int] = None):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.torch_threads = torch_threads
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "batches": 0, "items": 0, "wait_total": 0.0, "wait_max": 0.0,
+                         "run_total": 0.0}
+        self._thread = threading.Thread(target=self._loop, name=f"microbatch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List[Any]) -> Future:
+        """Queue inputs; the future resolves to their outputs (in order)."""
+        request = _Request(list(items))
+        if not request.items:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        return self.submit(items).result()
+
+    def close(self) -> None:
+        """Stop the batcher thread once the requests already queued have run."""
+        self._queue.put(None)
+
+    def _collect(self) -> Optional[List[_Request]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.items)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # closed: run this batch, then stop
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _loop(self) -> None:
+        if self.torch_threads:
+            import torch
+            torch.set_num_threads(self.torch_threads)  # per calling thread (see executor.py)
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            inputs = [item for request in batch for item in request.items]
+            try:
+                outputs = list(self.fn(inputs))
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                else:
+                    self._run_separately(batch)
+            else:
+                offset = 0
+                for request in batch:
+                    request.future.set_result(outputs[offset:offset + len(request.items)])
+                    offset += len(request.items)
+            self._record(batch, len(inputs), started)
+
+    def _run_separately(self, batch: List[_Request]) -> None:
+        """The combined call failed: one bad input must not fail the other callers."""
+        for request in batch:
+            try:
+                request.future.set_result(list(self.fn(request.items)))
+            except Exception as e:
+                request.future.set_exception(e)
+
+    def _record(self, batch: List[_Request], n_items: int, started: float) -> None:
+        waits = [started - r.enqueued for r in batch]
+        with self._lock:
+            m = self._metrics
+            m["requests"] += len(batch)
+            m["batches"] += 1
+            m["items"] += n_items
+            m["wait_total"] += sum(waits)
+            m["wait_max"] = max(m["wait_max"], max(waits))
+            m["run_total"] += time.perf_counter() - started
+
+    def metrics(self) -> Dict[str, float]:
+        """Batch fill rate (items per batch / max_batch_size), queue wait and batch run time."""
+        with self._lock:
+            m = dict(self._metrics)
+        batches, requests = max(m["batches"], 1), max(m["requests"], 1)
+        return {
+            "requests": m["requests"],
+            "batches": m["batches"],
+            "items": m["items"],
+            "mean_batch_size": round(m["items"] / batches, 3),
+            "fill_rate": round(m["items"] / (batches * self.max_batch_size), 4),
+            "requests_per_batch": round(m["requests"] / batches, 3),
+            "mean_queue_wait_ms": round(1000 * m["wait_total"] / requests, 3),
+            "max_queue_wait_ms": round(1000 * m["wait_max"], 3),
+            "mean_batch_run_ms": round(1000 * m["run_total"] / batches, 3),
+            "queued": self._queue.qsize(),
+            "torch_threads": self.torch_threads,
+        }
+
+
+# -----------------------------
+# Process-wide batcher registry
+# -----------------------------
+_config = {
+    "enabled": os.environ.get("ETHOS_MICROBATCH", "0").lower() in ("1", "on", "true"),
+    "max_batch_size": int(os.environ.get("ETHOS_MICROBATCH_MAX_BATCH", "64")),
+    "max_wait_ms": float(os.environ.get("ETHOS_MICROBATCH_WAIT_MS", "5")),
+    "torch_threads": None,  # None → _torch_threads_from_env(), read when a batcher starts (after a fork)
+}
+_batchers: Dict[Tuple[str, int], MicroBatcher] = {}
+_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    """A forked child has none of the parent's batcher threads: start its own on demand."""
+    global _lock
+    _lock = threading.Lock()
+    _batchers.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def configure(enabled: Optional[bool] = None, max_batch_size: Optional[int] = None,
+              max_wait_ms: Optional[float] = None, torch_threads: Optional[int] = None) -> None:
+    """Change scheduler settings; applies to batchers created afterwards."""
+    with _lock:
+        if enabled is not None:
+            _config["enabled"] = enabled
+        if max_batch_size is not None:
+            _config["max_batch_size"] = max_batch_size
+        if max_wait_ms is not None:
+            _config["max_wait_ms"] = max_wait_ms
+        if torch_threads is not None:
+            _config["torch_threads"] = torch_threads
+
+
+def _torch_threads_from_env() -> int:
+    # The ethos, logos and pathos batchers run side by side: they split the budget as executor threads do
+    import executor
+    return executor.intra_op_threads_for(executor.DIMENSIONS)
+
+
+def enabled() -> bool:
+    return _config["enabled"]
+
+
+def get_batcher(name: str, model, fn: Callable[[Any, List[Any]], List[Any]]) -> MicroBatcher:
+    """
+    Shared batcher running fn(model, inputs) — one queue per (name, model instance).
+    The batcher holds the model weakly: once the registry evicts it (and callers drop it)
+    the batcher is removed and its thread stopped.
+    """
+    key = (name, id(model))
+    with _lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            model_ref = weakref.ref(model, _discard(_batchers, key))
+            batcher = MicroBatcher(
+                f"{name}-{len(_batchers)}",
+                lambda inputs: fn(model_ref(), inputs),
+                max_batch_size=_config["max_batch_size"],
+                max_wait_ms=_config["max_wait_ms"],
+                torch_threads=_config["torch_threads"] or _torch_threads_from_env(),
+            )
+            _batchers[key] = batcher
+        return batcher
+
+
+def _discard(batchers: Dict[Tuple[str, int], MicroBatcher], key: Tuple[str, int]) -> Callable[[Any], None]:
+    """Weakref callback for a model; may run while this thread holds _lock (dict.pop is atomic)."""
+    def discard(_ref) -> None:
+        batcher = batchers.pop(key, None)
+        if batcher is not None:
+            batcher.close()
+    return discard
+
+
+def run(name: str, model, fn: Callable[[Any, List[Any]], List[Any]], inputs: List[Any]) -> List[Any]:
+    """fn(model, inputs), routed through the shared micro-batcher when scheduling is enabled."""
+    if not enabled() or not inputs:
+        return fn(model, inputs)
+    return get_batcher(name, model, fn)(inputs)
+
+
+def metrics() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {b.name: b.metrics() for b in list(_batchers.values())}
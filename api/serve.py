@@ -0,0 +1,380 @@
+"""
+serve.py
+Production entry point: load every model once, then fork worker processes that
+share the weights copy-on-write.
+
+The master process imports the app, preloads and warms all models (startup.preload),
+binds the listening socket and forks N workers. Model tensors are never written
+after loading, so the workers' pages stay shared with the master: N workers cost
+one copy of the weights plus each worker's private heap, instead of N copies.
+Each worker serves the shared socket with a threaded WSGI server (the kernel
+spreads connections across workers) and runs torch with its share of the cores.
+
+Workers are recycled gracefully. A worker stops accepting new connections,
+finishes its in-flight requests and exits, and the master forks a replacement
+from its warm state. This happens after a number of requests, when its private
+memory grows past a limit, or on SIGTERM to the worker. SIGHUP to the master
+recycles every worker, one at a time. SIGTERM / SIGINT to the master drain and
+stop all workers.
+
+    python serve.py --workers 4 --port 5000
+
+In-process state is per worker: jobs (/api/jobs), source sessions (/api/sources)
+and incremental revisions live in the worker that created them, and a follow-up
+request that lands on another worker gets a 404. Use them with one worker or
+behind a proxy that keeps a client on one worker.
+
+GET /api/workers reports the memory of the master and of every worker (RSS, and
+how much of it is shared vs private; PSS sums to the real footprint).
+
+Environment:
+ ETHOS_SERVE_HOST / ETHOS_SERVE_PORT     bind address (default 127.0.0.1:5000)
+ ETHOS_SERVE_WORKERS=<n>                 worker processes (default cpus // 2, at least 1)
+ ETHOS_SERVE_TORCH_THREADS=<n>           torch threads per worker (default cpus // workers)
+ ETHOS_SERVE_MAX_REQUESTS=<n>            recycle a worker after n requests, ±10% jitter (default 0 = never)
+ ETHOS_SERVE_MAX_PRIVATE_MB=<mb>         recycle a worker whose private memory exceeds this (default 0 = never)
+ ETHOS_SERVE_GRACEFUL_TIMEOUT=<sec>      how long in-flight requests may take to drain (default 30)
+"""
+import os
+import gc
+import sys
+import time
+import random
+import signal
+import socket
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+# Forked workers must not inherit a tokenizers thread pool from the master
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from werkzeug.wsgi import ClosingIterator
+import core
+import startup
+
+logger = logging.getLogger("ethos.serve")
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# -----------------------------
+# Memory
+# -----------------------------
+def process_memory(pid: int) -> Optional[Dict[str, float]]:
+    """RSS / PSS and its shared vs private split in MB (Linux smaps_rollup), None if unavailable."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    """Live child processes of parent (scans /proc)."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def memory_report(master_pid: int) -> Dict[str, Any]:
+    """Memory of the master and each of its workers, plus totals (PSS is the real footprint)."""
+    master = process_memory(master_pid)
+    workers = [{"pid": pid, **(process_memory(pid) or {})} for pid in child_pids(master_pid)]
+    procs = [m for m in [master] + workers if m]
+    return {
+        "master": {"pid": master_pid, **(master or {})},
+        "workers": workers,
+        "total_rss_mb": round(sum(m.get("rss_mb", 0.0) for m in procs), 1),
+        "total_pss_mb": round(sum(m.get("pss_mb", 0.0) for m in procs), 1),
+    }
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+class Worker:
+    """One forked serving process: request accounting, torch threads and graceful recycling."""
+
+    def __init__(self, app, listener: socket.socket, torch_threads: int, max_requests: int,
+                 max_private_mb: float, graceful_timeout: float):
+        self.app = app
+        self.listener = listener
+        self.torch_threads = torch_threads
+        self.max_requests = max_requests
+        self.max_private_mb = max_private_mb
+        self.graceful_timeout = graceful_timeout
+        self.pid = os.getpid()
+        self.started = time.time()
+        self.requests = 0
+        self.in_flight = 0
+        self.stop_reason: Optional[str] = None
+        self.server = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _set_thread_torch_threads(self) -> None:
+        # OpenMP thread counts are per calling thread, and each request runs on a new thread
+        if not getattr(self._local, "torch_threads_set", False):
+            import torch
+            torch.set_num_threads(self.torch_threads)
+            self._local.torch_threads_set = True
+
+    def wsgi(self, environ, start_response):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            self._set_thread_torch_threads()
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        # A request is in flight until its body is sent (event streams outlive the app call)
+        return ClosingIterator(response, self._finished)
+
+    def _finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            served = self.requests
+        if self.max_requests and served >= self.max_requests:
+            self.stop(f"served {served} requests")
+        elif self.max_private_mb:
+            memory = process_memory(self.pid)
+            if memory and memory["private_mb"] > self.max_private_mb:
+                self.stop(f"private memory {memory['private_mb']} MB")
+
+    def stop(self, reason: str) -> None:
+        """Stop accepting connections (once); serve() then drains in-flight requests and returns."""
+        with self._lock:
+            if self.stop_reason is not None or self.server is None:
+                return
+            self.stop_reason = reason
+        logger.info("Worker %d recycling: %s", self.pid, reason)
+        # shutdown() blocks until serve_forever returns, so it cannot run on a request thread
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"pid": self.pid, "requests": self.requests, "in_flight": self.in_flight,
+                "uptime_s": round(time.time() - self.started, 1), "torch_threads": self.torch_threads,
+                "max_requests": self.max_requests}
+
+    def serve(self) -> None:
+        from werkzeug.serving import make_server
+        signal.signal(signal.SIGTERM, lambda *_: self.stop("SIGTERM"))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the master handles it
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        import torch
+        torch.set_num_threads(self.torch_threads)
+        # The executor and micro-batcher threads split this worker's share of the cores (see executor.py)
+        os.environ.setdefault("ETHOS_TORCH_THREADS", str(self.torch_threads))
+        host, port = self.listener.getsockname()[:2]
+        self.server = make_server(host, port, self.wsgi, threaded=True, fd=self.listener.fileno())
+        self.server.serve_forever()
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.in_flight and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+_worker: Optional[Worker] = None
+
+
+def current_worker() -> Optional[Worker]:
+    """The Worker this process is running as (None in the master or outside serve.py)."""
+    return _worker
+
+
+# -----------------------------
+# Master
+# -----------------------------
+class Master:
+    """Preloads the app, forks the workers and keeps their number up until stopped."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5000, workers: Optional[int] = None,
+                 torch_threads: Optional[int] = None, max_requests: Optional[int] = None,
+                 max_private_mb: Optional[float] = None, graceful_timeout: Optional[float] = None):
+        cpus = os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.workers = workers or int(os.environ.get("ETHOS_SERVE_WORKERS") or max(1, cpus // 2))
+        self.torch_threads = torch_threads or int(os.environ.get("ETHOS_SERVE_TORCH_THREADS")
+                                                  or max(1, cpus // self.workers))
+        self.max_requests = max_requests if max_requests is not None else \
+            int(os.environ.get("ETHOS_SERVE_MAX_REQUESTS", "0"))
+        self.max_private_mb = max_private_mb if max_private_mb is not None else \
+            _env_float("ETHOS_SERVE_MAX_PRIVATE_MB", 0.0)
+        self.graceful_timeout = graceful_timeout if graceful_timeout is not None else \
+            _env_float("ETHOS_SERVE_GRACEFUL_TIMEOUT", 30.0)
+        self.app = None
+        self.listener: Optional[socket.socket] = None
+        self.children: Dict[int, float] = {}  # pid → fork time
+        self.running = True
+        self.to_recycle: List[int] = []
+        self.draining: Optional[int] = None
+
+    def load(self) -> None:
+        """Preload every model, then import the app (its background warm-up is then a no-op)."""
+        import torch
+        import final
+        # No OpenMP thread team in the master: GNU OpenMP is not fork-safe once it has one
+        torch.set_num_threads(1)
+        report = startup.preload(final.preload_specs())
+        if not startup.STARTUP.ready:
+            raise RuntimeError(f"model preload failed: {report.get('error')}")
+        import analyze
+        self.app = analyze.create_app()
+        self.app.add_url_rule("/api/workers", "workers", self.workers_view, methods=["GET"])
+
+    def workers_view(self):
+        from flask import jsonify
+        worker = current_worker()
+        return jsonify({"worker": worker.to_dict() if worker else None, **memory_report(os.getppid())})
+
+    def bind(self) -> None:
+        self.listener = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen(128)
+        self.port = self.listener.getsockname()[1]
+
+    def spawn(self) -> int:
+        jitter = random.randint(0, self.max_requests // 10) if self.max_requests else 0
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        global _worker
+        code = 0
+        try:
+            _worker = Worker(self.app, self.listener, self.torch_threads, self.max_requests + jitter,
+                             self.max_private_mb, self.graceful_timeout)
+            _worker.serve()
+        except Exception:
+            logger.exception("Worker %d failed", os.getpid())
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if not pid:
+                return
+            forked = self.children.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                logger.warning("Worker %d exited with %d", pid, code)
+                if forked is not None and time.monotonic() - forked < 1.0:
+                    time.sleep(1.0)  # crashing at start-up: do not fork in a tight loop
+
+    def signal_workers(self, signum: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(self, *_) -> None:
+        self.running = False
+
+    def reload(self, *_) -> None:
+        """Recycle every worker, one at a time, so the others keep serving."""
+        self.to_recycle = list(self.children)
+
+    def _recycle_next(self) -> None:
+        if self.draining in self.children:
+            return
+        self.draining = None
+        while self.to_recycle and self.draining is None:
+            pid = self.to_recycle.pop(0)
+            if pid in self.children:
+                os.kill(pid, signal.SIGTERM)
+                self.draining = pid
+
+    def run(self) -> None:
+        if self.app is None:
+            self.load()
+        if self.listener is None:
+            self.bind()
+        threads = [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+        if threads:
+            logger.warning("Forking with background threads running (%s); they do not exist in workers", threads)
+        # Keep the loaded objects out of the collector: its bookkeeping would otherwise
+        # touch (and so un-share) every page of the master's heap in each worker
+        gc.collect()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.reload)
+        logger.info("Serving on %s:%d with %d workers x %d torch threads", self.host, self.port,
+                    self.workers, self.torch_threads)
+        reported = False
+        while self.running:
+            self.reap()
+            while self.running and len(self.children) < self.workers:
+                self.spawn()
+            self._recycle_next()
+            time.sleep(0.2)
+            if not reported:
+                logger.info("Memory: %s", memory_report(os.getpid()))
+                reported = True
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Drain and stop every worker (SIGKILL after the graceful timeout)."""
+        logger.info("Stopping %d workers", len(self.children))
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 1.0
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        self.signal_workers(signal.SIGKILL)
+        self.reap()
+        if self.listener is not None:
+            self.listener.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the analysis API from pre-forked workers sharing one model copy")
+    parser.add_argument("--host", default=os.environ.get("ETHOS_SERVE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ETHOS_SERVE_PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--torch-threads", type=int, default=None, help="Torch threads per worker")
+    parser.add_argument("--max-requests", type=int, default=None, help="Recycle a worker after this many requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(name)s %(message)s")
+    core.suppress_transformers_warnings()
+    master = Master(args.host, args.port, args.workers, args.torch_threads, args.max_requests)
+    try:
+        master.run()
+    except RuntimeError as e:
+        sys.exit(str(e))
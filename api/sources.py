@@ -0,0 +1,234 @@
+"""
+sources.py
+Registered source documents, for checking one source against many candidates.
+
+Registering a source splits it into sentences once, tokenizes those sentences
+for the ethos NLI model (the ids stay pinned in the model's engine, so pairs
+against the source only tokenize the candidate side) and keeps retrieval
+indexes built on first use. Analysis functions accept the session wherever they
+take a source text:
+
+    session = get_store().register(source_text)
+    final.analyze_text_sentencewise(session, candidate_text)
+    ethos.compute_factual_consistency(session, candidate_text, top_k=3)
+
+Sessions are addressed by a content hash (registering the same text again returns
+the same session) and are evicted when idle, or least recently used when the
+store is over its session / character budget.
+
+Environment:
+ ETHOS_SOURCE_SESSIONS=<n>    sessions kept (default 64)
+ ETHOS_SOURCE_MAX_CHARS=<n>   total source characters kept (default 5000000)
+ ETHOS_SOURCE_IDLE_TTL=<sec>  evict sessions unused for this long (default 3600)
+"""
+import os
+import time
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+import core
+import retrieval
+
+
+class SourceSession:
+    """One source document with its sentence split, pinned token ids and retrieval indexes."""
+
+    def __init__(self, text: str):
+        self.id = source_id(text)
+        self.text = text
+        self.sentences: List[str] = core.split_sentences(text, memoize=False)
+        self.created = time.time()
+        self.last_used = self.created
+        self.uses = 0
+        self._engine = None
+        self._indexes: Dict[str, retrieval.SourceIndex] = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, nli_model=None) -> "SourceSession":
+        """Tokenize the sentences for the ethos NLI model and build the default retrieval index."""
+        import ethos
+        import nli
+        engine = nli.get_engine(nli_model or core.get_model(ethos.NLI_MODEL_SPEC))
+        if not isinstance(engine, nli.CallableNLIEngine):
+            engine.pin(self.sentences)
+            # Weak, so an engine whose model is evicted from the registry is not kept alive
+            self._engine = weakref.ref(engine)
+        self.index("tfidf")
+        return self
+
+    def index(self, method: str = "tfidf") -> retrieval.SourceIndex:
+        """Retrieval index over the source sentences (built once per method)."""
+        with self._lock:
+            index = self._indexes.get(method)
+            if index is None:
+                index = self._indexes[method] = retrieval.SourceIndex(self.sentences, method=method).build()
+        return index
+
+    def touch(self) -> None:
+        self.last_used = time.time()
+        self.uses += 1
+
+    def release(self) -> None:
+        """Drop the pinned token ids (called on eviction)."""
+        engine = self._engine() if self._engine is not None else None
+        if engine is not None:
+            engine.unpin(self.sentences)
+        self._engine = None
+        self._indexes.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_id": self.id,
+            "sentences": len(self.sentences),
+            "chars": len(self.text),
+            "created": round(self.created, 3),
+            "last_used": round(self.last_used, 3),
+            "uses": self.uses,
+            "indexes": sorted(self._indexes),
+        }
+
+
+Source = Union[str, SourceSession]
+
+
+def source_id(text: str) -> str:
+    return "src_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def source_text(source: Source) -> str:
+    return source.text if isinstance(source, SourceSession) else source
+
+
+def source_sentences(source: Source) -> List[str]:
+    """Sentences of a source text or session (a session is not re-split)."""
+    if isinstance(source, SourceSession):
+        return source.sentences
+    return core.split_sentences(source)
+
+
+def source_index(source: Source, sentences: List[str], method: str) -> retrieval.SourceIndex:
+    """The session's retrieval index, or a fresh one over `sentences` for plain text."""
+    if isinstance(source, SourceSession):
+        return source.index(method)
+    return retrieval.SourceIndex(sentences, method=method)
+
+
+# -----------------------------
+# Session store
+# -----------------------------
+class SourceStore:
+    """Registered sources by id, with idle expiry and LRU eviction beyond the budgets."""
+
+    def __init__(self, max_sessions: int = 64, max_chars: int = 5_000_000, idle_ttl: Optional[float] = 3600):
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, SourceSession]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"registered": 0, "reused": 0, "evicted": 0, "expired": 0}
+
+    def register(self, text: str, prepare: bool = True) -> SourceSession:
+        """Session for text, creating (and preparing) it unless already registered."""
+        sid = source_id(text)
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(sid)
+            if session is not None:
+                self._sessions.move_to_end(sid)
+                session.touch()
+                self.stats["reused"] += 1
+                return session
+        session = SourceSession(text)
+        if prepare:
+            with core.span("sources.prepare", sentences=len(session.sentences)):
+                session.prepare()
+        with self._lock:
+            existing = self._sessions.get(sid)
+            if existing is not None:  # registered concurrently
+                session.release()
+                return existing
+            self._sessions[sid] = session
+            self.stats["registered"] += 1
+            self._evict(keep=sid)
+        return session
+
+    def get(self, sid: Optional[str]) -> Optional[SourceSession]:
+        """The session for sid (marking it used), or None if unknown or evicted."""
+        if not sid:
+            return None
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(sid)
+            if session is not None:
+                self._sessions.move_to_end(sid)
+                session.touch()
+            return session
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+        if session is None:
+            return False
+        session.release()
+        return True
+
+    def _drop(self, sid: str, reason: str) -> None:
+        self._sessions.pop(sid).release()
+        self.stats[reason] += 1
+
+    def _expire(self) -> None:
+        if self.idle_ttl is None:
+            return
+        cutoff = time.time() - self.idle_ttl
+        for sid in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            self._drop(sid, "expired")
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        for sid in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and self.total_chars() <= self.max_chars:
+                break
+            if sid != keep:
+                self._drop(sid, "evicted")
+
+    def total_chars(self) -> int:
+        with self._lock:
+            return sum(len(s.text) for s in self._sessions.values())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire()
+            return {
+                "sessions": len(self._sessions),
+                "total_chars": self.total_chars(),
+                "max_sessions": self.max_sessions,
+                "max_chars": self.max_chars,
+                "idle_ttl": self.idle_ttl,
+                **self.stats,
+            }
+
+
+def store_from_env() -> SourceStore:
+    ttl = float(os.environ.get("ETHOS_SOURCE_IDLE_TTL", "3600"))
+    return SourceStore(
+        max_sessions=int(os.environ.get("ETHOS_SOURCE_SESSIONS", "64")),
+        max_chars=int(os.environ.get("ETHOS_SOURCE_MAX_CHARS", "5000000")),
+        idle_ttl=ttl if ttl > 0 else None,
+    )
+
+
+_store: Optional[SourceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SourceStore:
+    """Process-wide source store configured from the environment."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = store_from_env()
+        return _store
@@ -0,0 +1,174 @@
+"""
+startup.py
+Service start-up: preload and warm every configured model, track readiness and
+report where start-up time went.
+
+torch, transformers, spaCy and NLTK are imported lazily by the modules that use
+them, so importing the app takes well under a second. Their import cost, model
+loading and the first (slow) forward passes all happen in preload(). The service
+runs preload() in a background thread (start_background, called by
+analyze.create_app rather than on import). Until it has finished, the readiness
+endpoint answers 503, so the load balancer only routes requests to warm instances.
+
+    report = preload(final.preload_specs())      # blocking
+    start_background(final.preload_specs())      # returns at once; see STARTUP.ready
+
+Environment:
+ ETHOS_WARM_UP=0          skip preloading (ready at once; models load on first use)
+ ETHOS_WARM_UP_BATCH=<n>  dummy inputs per model in the warm-up batch (default 8)
+
+CLI (prints the start-up report):
+ python startup.py [--batch 8]
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from typing import Any, Dict, Iterable, Optional
+import core
+
+# Captured when the app first imports this module, i.e. before models are loaded
+IMPORTED_AT = time.time()
+DUMMY_SENTENCE = "This is a short warm-up sentence for the model."
+
+
+def warm_up_enabled() -> bool:
+    return os.environ.get("ETHOS_WARM_UP", "1").lower() not in ("0", "off", "false")
+
+
+def process_started_at() -> float:
+    """Wall-clock start time of this process (Linux /proc), else the import time of this module."""
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, StopIteration, IndexError):
+        return IMPORTED_AT
+
+
+def _timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return round(time.perf_counter() - t0, 3)
+
+
+def _import_heavy() -> None:
+    import torch  # noqa: F401
+    import transformers  # noqa: F401
+    core.suppress_transformers_warnings()
+
+
+def nli_specs():
+    import cascade
+    import ethos
+    import logos
+    return {ethos.NLI_MODEL_SPEC, logos.NLI_MODEL_SPEC, cascade.CHEAP_NLI_SPEC}
+
+
+def warm_model(spec: core.ModelSpec, model, batch_size: int) -> None:
+    """One dummy batch through the same call path requests use (NLI pairs via the batched engine)."""
+    import nli
+    if spec in nli_specs():
+        nli.get_engine(model).predict_proba([(DUMMY_SENTENCE, DUMMY_SENTENCE)] * batch_size, batch_size)
+    else:
+        model([DUMMY_SENTENCE] * batch_size, batch_size=batch_size)
+
+
+# -----------------------------
+# Start-up state
+# -----------------------------
+class StartupState:
+    """Readiness flag plus a timing report of the preload phases."""
+
+    def __init__(self):
+        self.status = "pending"  # pending | warming | ready | failed | disabled
+        self.report: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until preloading has finished (successfully or not)."""
+        return self._done.wait(timeout)
+
+    def preload(self, specs: Iterable[core.ModelSpec], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Import heavy libraries, load the sentence splitter and load + warm every model."""
+        batch_size = batch_size or int(os.environ.get("ETHOS_WARM_UP_BATCH", "8"))
+        started = time.time()
+        self.status = "warming"
+        report: Dict[str, Any] = {"batch_size": batch_size, "models": {}}
+        self.report = report
+        try:
+            with core.span("startup.preload"):
+                report["imports_s"] = _timed(_import_heavy)
+                report["splitter_s"] = _timed(core.split_sentences, "Warm up. The splitter.", None, False)
+                for spec in dict.fromkeys(specs):
+                    t0 = time.perf_counter()
+                    model = core.get_model(spec)
+                    loaded = time.perf_counter()
+                    warm_model(spec, model, batch_size)
+                    report["models"][core._key_name(spec)] = {
+                        "load_s": round(loaded - t0, 3),
+                        "warm_s": round(time.perf_counter() - loaded, 3),
+                        "bytes": core.model_nbytes(model),
+                    }
+            self.status = "ready"
+        except Exception as e:
+            self.status, self.error = "failed", f"{type(e).__name__}: {e}"
+            report["error"] = self.error
+            core.logger.exception("Start-up preload failed")
+        finally:
+            finished = time.time()
+            report["preload_s"] = round(finished - started, 3)
+            # Interpreter start + app imports, and everything up to ready
+            report["before_preload_s"] = round(started - process_started_at(), 3)
+            report["process_to_ready_s"] = round(finished - process_started_at(), 3)
+            self._done.set()
+        core.logger.info("Start-up %s in %.1f s (preload %.1f s): %s", self.status,
+                         report["process_to_ready_s"], report["preload_s"],
+                         {name: round(m["load_s"] + m["warm_s"], 3) for name, m in report["models"].items()})
+        return report
+
+    def start_background(self, specs: Iterable[core.ModelSpec], batch_size: Optional[int] = None) -> None:
+        """Run preload in a daemon thread (once; later calls are no-ops)."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            if not warm_up_enabled():
+                self.status = "disabled"
+                self._done.set()
+                return
+            self._thread = threading.Thread(target=self.preload, args=(list(specs), batch_size),
+                                            name="ethos-preload", daemon=True)
+            self._thread.start()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"status": self.status, "ready": self.ready, "error": self.error, "report": self.report}
+
+
+STARTUP = StartupState()
+
+
+def preload(specs: Iterable[core.ModelSpec], batch_size: Optional[int] = None) -> Dict[str, Any]:
+    return STARTUP.preload(specs, batch_size)
+
+
+def start_background(specs: Iterable[core.ModelSpec], batch_size: Optional[int] = None) -> None:
+    STARTUP.start_background(specs, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preload and warm every model, then print the start-up report")
+    parser.add_argument("--batch", type=int, default=None, help="Dummy inputs per model")
+    args = parser.parse_args()
+
+    import final
+    print(json.dumps(preload(final.preload_specs(), args.batch), indent=2))
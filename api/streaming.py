@@ -0,0 +1,206 @@
+"""
+streaming.py
+Sentence-wise analysis of arbitrarily long transcripts in bounded memory.
+
+Text is consumed chunk by chunk (file, stdin or any iterator of strings), split
+into sentences incrementally and scored in fixed-size batches through the same
+plan → run → assemble pipeline as final.analyze_text_sentencewise. Results are
+yielded as they are ready; only the current batch, the unfinished tail sentence
+and a window of recent sentences are held, so memory does not grow with the
+transcript.
+
+Logos coherence across sentences is scored on a sliding window: each sentence
+is paired with the `window` sentences before it (premise = earlier sentence).
+Overall scores are running aggregates.
+
+    analyzer = StreamingAnalyzer(source_text)
+    for result in analyzer.run(read_chunks("talk.txt")):
+        ...
+    analyzer.overall()
+
+CLI:
+ python streaming.py transcript.txt [-s source.txt] -o results.jsonl [--window 4] [--batch 32]
+"""
+import sys
+import json
+import argparse
+from collections import deque
+from typing import Any, Deque, Dict, IO, Iterable, Iterator, List, Optional, Union
+import numpy as np
+import core
+import final
+import executor as executor_mod
+
+DEFAULT_CHUNK_CHARS = 64 * 1024
+# A 'sentence' longer than this without a boundary is emitted as is
+MAX_SENTENCE_CHARS = 20_000
+
+
+def read_chunks(source: Union[str, IO[str]], chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """Text chunks from a path ('-' for stdin) or an open text file."""
+    if isinstance(source, str):
+        if source == "-":
+            yield from read_chunks(sys.stdin, chunk_chars)
+            return
+        with open(source, encoding="utf-8") as f:
+            yield from read_chunks(f, chunk_chars)
+        return
+    while True:
+        chunk = source.read(chunk_chars)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_sentences(chunks: Iterable[str], mode: Optional[str] = None,
+                   max_sentence_chars: int = MAX_SENTENCE_CHARS) -> Iterator[str]:
+    """
+    Sentences from a stream of text chunks. The last sentence of the buffer may
+    continue in the next chunk, so it is held back until more text arrives.
+    """
+    tail = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        tail += chunk
+        sentences = core.split_sentences(tail, mode, memoize=False)
+        if len(sentences) > 1:
+            yield from sentences[:-1]
+            last = sentences[-1]
+            start = tail.rfind(last)
+            tail = tail[start:] if start >= 0 else last
+        if len(tail) > max_sentence_chars:
+            yield tail.strip()
+            tail = ""
+    if tail.strip():
+        yield from core.split_sentences(tail, mode, memoize=False)
+
+
+class RunningAggregate:
+    """Constant-memory equivalent of final.overall_from_sentences, plus windowed coherence."""
+
+    def __init__(self):
+        self.n = 0
+        self.sums = {"score": 0.0, "factual_consistency": 0.0, "formality": 0.0, "logos": 0.0, "pathos": 0.0}
+        self.context_pairs = 0
+        self.context_entail = 0.0
+        self.context_contra = 0.0
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.n += 1
+        for key in ("score", "factual_consistency", "formality"):
+            self.sums[key] += result["ethos"][key]
+        self.sums["logos"] += result["logos"]
+        self.sums["pathos"] += result["pathos"]
+
+    def add_context(self, pair_probs: np.ndarray) -> None:
+        """NLI probabilities (core.NLI_LABELS columns) of window pairs."""
+        self.context_pairs += len(pair_probs)
+        self.context_entail += float(pair_probs[:, core.ENTAILMENT].sum())
+        self.context_contra += float(pair_probs[:, core.CONTRADICTION].sum())
+
+    def overall(self) -> Dict[str, Any]:
+        n = max(self.n, 1)
+        overall = {
+            "ethos": {key: round(self.sums[key] / n, 4) for key in ("score", "factual_consistency", "formality")},
+            "logos": round(self.sums["logos"] / n, 4),
+            "pathos": round(self.sums["pathos"] / n, 4),
+            "sentences": self.n,
+        }
+        if self.context_pairs:
+            # Same normalisation as logos.coherence_from_probs, over the window pairs
+            raw = (self.context_entail - self.context_contra) / self.context_pairs
+            overall["logos_context"] = round(max(0.0, min(1.0, (raw + 1) / 2)), 4)
+        return overall
+
+
+class StreamingAnalyzer:
+    """Scores a sentence stream batch by batch; see module docstring."""
+
+    def __init__(self, source_text: str, window: int = 4, batch_size: int = 32,
+                 models: Optional[Dict[str, Any]] = None,
+                 executor: Optional[executor_mod.ScorerExecutor] = None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.source_text = source_text
+        self.window = window
+        self.batch_size = batch_size
+        self.models = models
+        self.executor = executor
+        self.aggregate = RunningAggregate()
+        self._recent: Deque[str] = deque(maxlen=max(window, 0))
+
+    def _score_batch(self, sentences: List[str]) -> List[Dict[str, Any]]:
+        work = final.new_work()
+        with core.span("plan", sentences=len(sentences), streaming=True):
+            plan = final.plan_sentences(self.source_text, sentences, work)
+            context_ids = []
+            for sentence in sentences:
+                if self.window:
+                    context_ids.extend(work["logos_nli"].add((prev, sentence) for prev in self._recent))
+                    self._recent.append(sentence)
+        outputs = final.run_work(work, self.models, self.executor or final.get_executor())
+        with core.span("assemble", sentences=len(plan), streaming=True):
+            results = final.assemble_plan(plan, outputs)
+            for result in results:
+                self.aggregate.add(result)
+            self.aggregate.add_context(outputs["logos_nli"][np.asarray(context_ids, dtype=np.intp)])
+        return results
+
+    def run(self, chunks: Iterable[str], mode: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield sentence results (same shape as analyze_text_sentencewise) as text streams in."""
+        batch: List[str] = []
+        for sentence in iter_sentences(chunks, mode):
+            batch.append(sentence)
+            if len(batch) >= self.batch_size:
+                yield from self._score_batch(batch)
+                batch = []
+        if batch:
+            yield from self._score_batch(batch)
+
+    def overall(self) -> Dict[str, Any]:
+        """Running overall block for everything yielded so far."""
+        return self.aggregate.overall()
+
+
+def analyze_stream(source_text: str, chunks: Iterable[str], **kwargs) -> Iterator[Dict[str, Any]]:
+    """Generator of sentence results; the last item is {'overall': ...}."""
+    analyzer = StreamingAnalyzer(source_text, **kwargs)
+    yield from analyzer.run(chunks)
+    yield {"overall": analyzer.overall()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a long transcript through the sentence-wise analysis")
+    parser.add_argument("transcript", help="Text file to analyze ('-' for stdin)")
+    parser.add_argument("-s", "--source", help="Source text file (default: the transcript's opening text)")
+    parser.add_argument("--source-chars", type=int, default=4096,
+                        help="Without --source, how much of the transcript's start is used as source")
+    parser.add_argument("-o", "--output", help="JSONL output (default: stdout)")
+    parser.add_argument("--window", type=int, default=4, help="Previous sentences each sentence is paired with")
+    parser.add_argument("--batch", type=int, default=32, help="Sentences per scoring batch")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    args = parser.parse_args()
+
+    core.suppress_transformers_warnings()
+    chunks = read_chunks(args.transcript, args.chunk_chars)
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            source_text = f.read()
+    else:
+        first = next(chunks, "")
+        source_text = first[:args.source_chars]
+
+        def _rechain(first_chunk, rest):
+            yield first_chunk
+            yield from rest
+        chunks = _rechain(first, chunks)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for item in analyze_stream(source_text, chunks, window=args.window, batch_size=args.batch):
+            out.write(json.dumps(item, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
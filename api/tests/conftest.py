@@ -0,0 +1,65 @@
+"""
+Shared fixtures. Tests run offline against the tiny stand-in models of
+benchmarks/stand_ins.py (scores are meaningless, the code paths are real).
+"""
+import os
+import sys
+import threading
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+# Before the scorer modules are imported: they read these at import time
+os.environ.setdefault("ETHOS_SPLITTER", "regex")
+os.environ.setdefault("ETHOS_CONCEPTNET", "off")
+os.environ.setdefault("ETHOS_CACHE", "off")
+os.environ.setdefault("ETHOS_WARM_UP", "0")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def stand_ins():
+    """Every scorer model replaced by a stand-in in the shared registry."""
+    from benchmarks import stand_ins as stand_ins_mod
+    stand_ins_mod.install()
+    return stand_ins_mod
+
+
+@pytest.fixture
+def score_cache():
+    """A fresh in-memory score cache for the test, restored afterwards."""
+    import cache
+    saved = cache.get_cache()
+    fresh = cache.ScoreCache(max_entries=1000)
+    cache.set_cache(fresh)
+    yield fresh
+    cache.set_cache(saved)
+
+
+@pytest.fixture
+def nli_model(stand_ins):
+    import core
+    import ethos
+    return core.get_model(ethos.NLI_MODEL_SPEC)
+
+
+@pytest.fixture
+def call_concurrently():
+    """call_concurrently(fn, n) → the results of n threads calling fn() at the same moment."""
+    def call_concurrently(fn, n=8):
+        barrier = threading.Barrier(n)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(fn())
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+    return call_concurrently
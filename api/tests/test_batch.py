@@ -0,0 +1,67 @@
+import json
+import pytest
+import final
+
+
+def _write_records(path, n, failing=()):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            text = "The tower is in Paris. It was built in 1889." + (" BOOM" if i in failing else "")
+            f.write(json.dumps({"id": f"d{i}", "source_text": "The tower is in Paris.", "candidate_text": text}) + "\n")
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def failing_documents(monkeypatch, stand_ins):
+    """analyze_documents raises for any group containing a 'BOOM' document."""
+    real = final.analyze_documents
+
+    def analyze_documents(records, *args, **kwargs):
+        if any("BOOM" in cand for _, cand in records):
+            raise RuntimeError("bad document")
+        return real(records, *args, **kwargs)
+
+    monkeypatch.setattr(final, "analyze_documents", analyze_documents)
+
+
+def test_mid_group_failure_is_isolated(tmp_path, failing_documents):
+    records, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_records(records, 4, failing={1})
+    stats = final.run_batch(str(records), str(out), docs_per_batch=4)
+
+    lines = {line["id"]: line for line in _read_jsonl(out)}
+    assert sorted(lines) == ["d0", "d1", "d2", "d3"]
+    assert "error" in lines["d1"] and "analysis" not in lines["d1"]
+    assert all("analysis" in lines[i] for i in ("d0", "d2", "d3"))
+    assert stats["documents"] == 3 and stats["errors"] == 1
+    assert final._read_checkpoint(str(out) + ".ckpt") == {"d0": "done", "d1": "error", "d2": "done", "d3": "done"}
+
+
+def test_resume_skips_checkpointed_and_retries_failed(tmp_path, failing_documents):
+    records, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_records(records, 5, failing={3})
+    final.run_batch(str(records), str(out), docs_per_batch=2)
+
+    stats = final.run_batch(str(records), str(out), docs_per_batch=2)  # still failing
+    assert stats["skipped"] == 4 and stats["errors"] == 1
+    assert [line["id"] for line in _read_jsonl(out)].count("d3") == 1
+
+    _write_records(records, 5)  # the failing document was fixed
+    stats = final.run_batch(str(records), str(out), docs_per_batch=2)
+    assert stats["skipped"] == 4 and stats["documents"] == 1 and stats["errors"] == 0
+    lines = _read_jsonl(out)
+    assert sorted(line["id"] for line in lines) == ["d0", "d1", "d2", "d3", "d4"]  # one record per id
+    assert all("analysis" in line for line in lines)
+
+
+def test_batch_matches_single_document_analysis(tmp_path, stand_ins):
+    records, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_records(records, 3)
+    final.run_batch(str(records), str(out), docs_per_batch=2)
+    expected = final.analyze_text_sentencewise("The tower is in Paris.", "The tower is in Paris. It was built in 1889.")
+    for line in _read_jsonl(out):
+        assert line["analysis"]["overall"] == expected["overall"]
@@ -0,0 +1,127 @@
+import cache
+import cascade
+import core
+import final
+import knowledge
+
+SOURCE = "The Eiffel Tower is located in Paris. It was completed in 1889."
+CANDIDATE = "The Eiffel Tower, situated in Paris, was completed in 1889. Socrates is mortal."
+
+
+def test_memory_tier_lru_and_ttl(monkeypatch):
+    tier = cache.MemoryTier(max_entries=2)
+    tier.put_many({"a": 1, "b": 2})
+    assert tier.get_many(["a"]) == {"a": 1}  # a is now most recent
+    tier.put_many({"c": 3})
+    assert tier.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert tier.evictions == 1
+
+    clock = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: clock[0])
+    expiring = cache.MemoryTier(max_entries=10, ttl=5)
+    expiring.put_many({"k": [0.5]})
+    clock[0] += 6
+    assert expiring.get_many(["k"]) == {}
+
+
+def test_disk_tier_survives_restart_and_refills_memory(tmp_path):
+    path = str(tmp_path / "scores.db")
+    first = cache.ScoreCache(max_entries=10, disk_path=path)
+    first.put_many({"k1": [0.1, 0.9], "k2": {"x": 1}})
+
+    second = cache.ScoreCache(max_entries=10, disk_path=path)
+    assert second.get_many(["k1", "k2", "k3"]) == {"k1": [0.1, 0.9], "k2": {"x": 1}}
+    assert second.counters["disk_hits"] == 2 and second.counters["misses"] == 1
+    second.get_many(["k1"])
+    assert second.counters["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_accessed(tmp_path):
+    tier = cache.SQLiteTier(str(tmp_path / "scores.db"), max_entries=2)
+    tier.put_many({"a": 1})
+    tier.put_many({"b": 2})
+    tier.get_many(["a"])
+    tier.put_many({"c": 3})
+    assert sorted(tier.get_many(["a", "b", "c"])) == ["a", "c"]
+
+
+def test_cached_map_computes_only_misses(score_cache):
+    calls = []
+
+    def compute(todo):
+        calls.append(list(todo))
+        return [x * 2 for x in todo]
+
+    assert cache.cached_map("t", "model@1", [1, 2, 2], compute) == [2, 4, 4]
+    assert cache.cached_map("t", "model@1", [2, 3], compute) == [4, 6]
+    assert calls == [[1, 2], [3]]
+    cache.cached_map("t", "model@2", [1], compute)  # another model revision
+    assert calls[-1] == [1]
+
+
+def test_cached_analysis_hits(score_cache, stand_ins):
+    first = final.cached_analysis(SOURCE, CANDIDATE)
+    hits = score_cache.counters["hits"]
+    assert final.cached_analysis(SOURCE, CANDIDATE) == first
+    assert score_cache.counters["hits"] == hits + 1
+
+
+def test_analysis_identity_covers_configuration(monkeypatch, stand_ins):
+    base = final.analysis_identity()
+    monkeypatch.setattr(final, "LOGOS_PAIR_MODE", "adjacent")
+    assert final.analysis_identity() != base
+    monkeypatch.undo()
+
+    saved = cascade.get_config()
+    try:
+        cascade.configure(stages=("lexical",))
+        assert final.analysis_identity() != base
+    finally:
+        cascade.configure(saved)
+
+    core.configure_splitter("spacy")
+    try:
+        assert final.analysis_identity() != base
+    finally:
+        core.configure_splitter("regex")
+
+    knowledge.set_backend(knowledge.HTTPConceptNet("http://127.0.0.1:9"))
+    try:
+        assert final.analysis_identity() != base
+    finally:
+        knowledge.set_backend(None)
+    assert final.analysis_identity() == base
+
+
+def test_analysis_identity_covers_model_revisions(monkeypatch, score_cache, stand_ins):
+    base = final.analysis_identity()
+    config = core.get_model(final.MODEL_SPECS[0]).model.config
+    monkeypatch.setattr(config, "_commit_hash", "0123abcd", raising=False)
+    assert final.analysis_identity() != base
+
+    monkeypatch.setattr(cache, "model_identity", lambda model: None)
+    assert final.analysis_identity() is None
+    final.cached_analysis(SOURCE, CANDIDATE)
+    assert score_cache.stats()["memory_entries"] == 0  # an unidentified model: not cached
+
+
+class _FailingKnowledge(knowledge.KnowledgeBackend):
+    identity = "failing"
+
+    def lookup(self, terms, limit):
+        return {}  # every lookup failed
+
+
+def _analysis_key():
+    return cache.make_key("analysis", final.analysis_identity(), [SOURCE, CANDIDATE])
+
+
+def test_results_without_enrichment_are_not_cached(score_cache, stand_ins):
+    knowledge.set_backend(_FailingKnowledge())
+    try:
+        final.cached_analysis(SOURCE, CANDIDATE)
+        assert score_cache.get_many([_analysis_key()]) == {}
+    finally:
+        knowledge.set_backend(None)
+    final.cached_analysis(SOURCE, CANDIDATE)  # enrichment off: nothing can fail
+    assert _analysis_key() in score_cache.get_many([_analysis_key()])
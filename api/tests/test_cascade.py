@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import cascade
+import core
+import final
+import nli
+
+UNRELATED = ("The tower is in Paris.", "Bananas grow quickly.")
+VERBATIM = ("The tower is in Paris.", "The tower is in Paris!")
+NEGATED = ("The tower is in Paris.", "The tower is not in Paris.")
+OVERLAPPING = ("The tower is in Paris.", "The old tower was painted red.")
+
+
+@pytest.fixture
+def cheap_model(stand_ins):
+    return core.get_model(cascade.CHEAP_NLI_SPEC)
+
+
+def test_lexical_stage_decides_only_clear_pairs():
+    pairs = [UNRELATED, VERBATIM, NEGATED, OVERLAPPING]
+    probs, decided = cascade.lexical_stage(pairs, cascade.CascadeConfig(stages=("lexical",)))
+    assert decided.tolist() == [True, True, False, False]
+    assert probs[0, core.NEUTRAL] == 1.0 and probs[1, core.ENTAILMENT] == 1.0
+    assert not probs[~decided].any()
+
+
+def test_lexical_thresholds():
+    # 'tower' is 1 of 2 content words in the premise: overlap 0.5
+    loose = cascade.CascadeConfig(stages=("lexical",), low=0.5, high=1.0)
+    _, decided = cascade.lexical_stage([OVERLAPPING, VERBATIM], loose)
+    assert decided.tolist() == [True, True]
+    strict = cascade.CascadeConfig(stages=("lexical",), low=0.0, high=1.01)
+    _, decided = cascade.lexical_stage([OVERLAPPING, VERBATIM], strict)
+    assert decided.tolist() == [False, False]
+
+
+@pytest.mark.parametrize("confidence, expected", [(0.0, True), (1.01, False)])
+def test_model_stage_confidence(cheap_model, confidence, expected):
+    pairs = [UNRELATED, OVERLAPPING]
+    probs, decided = cascade.model_stage(pairs, cascade.CascadeConfig(stages=("model",), confidence=confidence),
+                                         cheap_model)
+    assert decided.tolist() == [expected] * len(pairs)
+    np.testing.assert_allclose(probs, nli.predict_probs(cheap_model, pairs))
+
+
+def test_escalated_pairs_come_from_the_large_model(nli_model):
+    pairs = [UNRELATED, OVERLAPPING, VERBATIM, NEGATED]
+    cascade.STATS.reset()
+    probs = cascade.predict_probs(nli_model, pairs, config=cascade.CascadeConfig(stages=("lexical",)))
+    large = nli.predict_probs(nli_model, pairs)
+    np.testing.assert_allclose(probs[[1, 3]], large[[1, 3]])
+    assert probs[0, core.NEUTRAL] == 1.0 and probs[2, core.ENTAILMENT] == 1.0
+    stats = cascade.stats()
+    assert stats["pairs"] == 4 and stats["decided"]["lexical"] == 2 and stats["escalated"] == 2
+
+
+def test_disabled_cascade_is_the_large_model(nli_model, cheap_model):
+    pairs = [UNRELATED, OVERLAPPING]
+    np.testing.assert_array_equal(cascade.predict_probs(nli_model, pairs, config=cascade.CascadeConfig()),
+                                  nli.predict_probs(nli_model, pairs))
+    # a confidence no pair reaches escalates everything
+    config = cascade.CascadeConfig(stages=("model",), confidence=1.01)
+    np.testing.assert_allclose(cascade.predict_probs(nli_model, pairs, config=config, cheap_model=cheap_model),
+                               nli.predict_probs(nli_model, pairs))
+
+
+def test_preload_covers_the_small_model_only_when_used(monkeypatch):
+    monkeypatch.setattr(cascade, "_config", cascade.CascadeConfig(stages=("lexical",)))
+    assert cascade.CHEAP_NLI_SPEC not in final.preload_specs()
+    monkeypatch.setattr(cascade, "_config", cascade.CascadeConfig(stages=("lexical", "model")))
+    assert cascade.CHEAP_NLI_SPEC in final.preload_specs()
+    assert set(final.MODEL_SPECS) <= set(final.preload_specs())
+
+
+def test_parse_stages():
+    assert cascade.parse_stages("off") == ()
+    assert cascade.parse_stages("lexical, model") == ("lexical", "model")
+    with pytest.raises(ValueError):
+        cascade.parse_stages("lexical,oracle")
@@ -0,0 +1,49 @@
+import time
+import pytest
+import executor
+import scheduler
+import sources
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_pool_is_sized_for_concurrent_analyses(call_concurrently):
+    pool = executor.ScorerExecutor("thread", concurrency=4)
+    assert pool.max_workers == 4 * executor.DIMENSIONS
+    tasks = {name: (_sleep, (0.2,)) for name in ("ethos", "logos", "pathos")}
+    pool.run(tasks)  # start the threads (their initializer imports torch)
+    t0 = time.perf_counter()
+    call_concurrently(lambda: pool.run(tasks), n=4)
+    assert time.perf_counter() - t0 < 0.35  # no analysis queued behind another
+    pool.shutdown()
+
+
+def test_torch_threads_stay_within_the_cpu_budget(monkeypatch):
+    monkeypatch.setenv("ETHOS_TORCH_THREADS", "24")
+    pool = executor.ScorerExecutor("thread", concurrency=4)
+    assert pool.intra_op_threads * pool.max_workers <= 24
+    assert executor.ScorerExecutor("thread", concurrency=1).intra_op_threads == 8
+    assert scheduler._torch_threads_from_env() == 8  # three batcher threads side by side
+    monkeypatch.setenv("ETHOS_TORCH_THREADS", "2")
+    assert executor.ScorerExecutor("thread").intra_op_threads == 1
+
+
+def test_process_mode_rejects_source_sessions():
+    session = sources.SourceSession("The tower is in Paris.")
+    pool = executor.ScorerExecutor("process")
+    with pytest.raises(TypeError, match="SourceSession"):
+        pool.run({"ethos": (len, (session,))})
+    with pytest.raises(TypeError, match="SourceSession"):
+        pool.run({"ethos": (len, (), {"source_text": session})})
+    assert pool._pool is None  # rejected before any worker process was started
+
+
+def test_batcher_threads_use_the_configured_torch_threads():
+    import torch
+    batcher = scheduler.MicroBatcher("threads", lambda inputs: [torch.get_num_threads()] * len(inputs),
+                                     torch_threads=1)
+    assert batcher([None]) == [1]
+    assert batcher.metrics()["torch_threads"] == 1
@@ -0,0 +1,71 @@
+import time
+import pytest
+import final
+import incremental
+
+SOURCE = "The tower is in Paris. It was built in 1889. It is made of iron."
+CANDIDATE = "The tower is in Paris. It was built in 1889. Visitors love it."
+
+
+def _assert_same_analysis(result, expected):
+    assert result["overall"] == expected["overall"]
+    assert result["sentencewise"] == expected["sentencewise"]
+
+
+def test_full_run_matches_sentencewise_analysis(stand_ins):
+    result = incremental.analyze_incremental(SOURCE, CANDIDATE)
+    _assert_same_analysis(result, final.analyze_text_sentencewise(SOURCE, CANDIDATE))
+    assert result["changes"]["scored"] == 3 and result["changes"]["reused"] == 0
+
+
+@pytest.mark.parametrize("edited", [
+    "The tower is in Paris. It was built in 1889. Visitors love it. It is very tall.",  # appended
+    "The tower is in Paris. Visitors love it.",                                           # removed
+    "The tower is in Rome. It was built in 1889. Visitors love it.",                      # changed
+    "Visitors love it. The tower is in Paris.",                                           # reordered
+])
+def test_candidate_edit_matches_full_analysis(stand_ins, edited):
+    first = incremental.analyze_incremental(SOURCE, CANDIDATE)
+    result = incremental.analyze_incremental(SOURCE, edited, first)
+    _assert_same_analysis(result, final.analyze_text_sentencewise(SOURCE, edited))
+    kept = set(final.core.split_sentences(CANDIDATE)) & set(final.core.split_sentences(edited))
+    assert result["changes"]["reused"] == len(kept)
+
+
+def test_source_edit_backfills_only_new_source_sentences(stand_ins):
+    first = incremental.analyze_incremental(SOURCE, CANDIDATE)
+    edited_source = SOURCE + " It is visited by millions."
+    result = incremental.analyze_incremental(edited_source, CANDIDATE, first)
+    _assert_same_analysis(result, final.analyze_text_sentencewise(edited_source, CANDIDATE))
+    assert result["changes"]["scored"] == 0 and result["changes"]["rescored_ethos"] == 3
+    assert result["changes"]["nli_pairs"] == 3  # one new source sentence × three candidate sentences
+
+
+def test_stale_state_version_is_ignored(stand_ins):
+    first = incremental.analyze_incremental(SOURCE, CANDIDATE)
+    first["state"]["version"] = incremental.STATE_VERSION + 1
+    result = incremental.analyze_incremental(SOURCE, CANDIDATE, first)
+    assert result["changes"]["scored"] == 3 and result["changes"]["reused"] == 0
+
+
+def test_state_from_another_configuration_is_ignored(stand_ins, monkeypatch):
+    first = incremental.analyze_incremental(SOURCE, CANDIDATE)
+    monkeypatch.setattr(final, "LOGOS_PAIR_MODE", "adjacent")
+    result = incremental.analyze_incremental(SOURCE, CANDIDATE, first)
+    assert result["changes"]["scored"] == 3 and result["changes"]["reused"] == 0
+    _assert_same_analysis(result, final.analyze_text_sentencewise(SOURCE, CANDIDATE))
+
+
+def test_state_store_singleton_is_created_once(monkeypatch, call_concurrently):
+    import analyze
+    created = []
+
+    def store_from_env():
+        time.sleep(0.05)  # widen the race window
+        created.append(incremental.StateStore())
+        return created[-1]
+
+    monkeypatch.setattr(analyze, "_state_store", None)
+    monkeypatch.setattr(incremental, "store_from_env", store_from_env)
+    results = call_concurrently(analyze.get_state_store)
+    assert len(created) == 1 and all(s is created[0] for s in results)
@@ -0,0 +1,100 @@
+import time
+import pytest
+import final
+import incremental
+import jobs
+
+SOURCE = "The tower is in Paris. It was built in 1889."
+CANDIDATE = "The tower is in Paris. It is made of iron. Visitors love it."
+
+
+def _wait(job, timeout=30.0):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.done, f"job still {job.status}"
+
+
+def test_job_results_match_synchronous_analysis(stand_ins):
+    queue = jobs.JobQueue(max_workers=1, chunk_size=2)
+    job = queue.submit(SOURCE, CANDIDATE)
+    _wait(job)
+    expected = final.analyze_text_sentencewise(SOURCE, CANDIDATE)
+    info = job.to_dict(include_results=True)
+    assert info["status"] == "done" and info["completed"] == info["total"] == 3
+    assert info["analysis"] == expected
+    assert queue.get(job.id) is job
+
+
+def test_full_queue_raises():
+    queue = jobs.JobQueue(max_workers=0, max_queue=1)  # nothing consumes the queue
+    queue.submit(SOURCE, CANDIDATE)
+    with pytest.raises(jobs.QueueFull):
+        queue.submit(SOURCE, CANDIDATE)
+    assert queue.stats()["queued"] == 1
+
+
+def test_stream_yields_every_sentence_then_done(stand_ins):
+    queue = jobs.JobQueue(max_workers=1, chunk_size=1)
+    job = queue.submit(SOURCE, CANDIDATE)
+    events = list(job.events(heartbeat=0.05))
+    sentences = [data for event, data in events if event == "sentence"]
+    assert [event for event, _ in events if event != "heartbeat"] == ["sentence"] * 3 + ["done"]
+    assert sentences == job.results and events[-1][1] == {"overall": job.overall, "revision": None}
+
+
+def test_job_registers_a_revision_for_incremental_edits(stand_ins):
+    states = incremental.StateStore()
+    queue = jobs.JobQueue(max_workers=1, chunk_size=2, states=states)
+    job = queue.submit(SOURCE, CANDIDATE)
+    event, data = list(job.events(heartbeat=0.05))[-1]
+    assert event == "done" and data["revision"] == job.revision
+    assert data["overall"] == final.analyze_text_sentencewise(SOURCE, CANDIDATE)["overall"]
+    result = incremental.analyze_incremental(SOURCE, CANDIDATE, {"state": states.get(job.revision)})
+    assert result["changes"]["reused"] == 3 and result["changes"]["nli_pairs"] == 0
+
+
+def test_failed_job_streams_error(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("scorer crashed")
+        yield
+
+    monkeypatch.setattr(final, "iter_sentence_results", broken)
+    queue = jobs.JobQueue(max_workers=1)
+    job = queue.submit(SOURCE, CANDIDATE)
+    assert list(job.events(heartbeat=0.05))[-1] == ("error", "RuntimeError: scorer crashed")
+    assert job.status == "failed"
+
+
+def test_sse_format():
+    assert jobs.sse_format("heartbeat", None) == ": keep-alive\n\n"
+    assert jobs.sse_format("done", {"a": 1}) == 'event: done\ndata: {"a": 1}\n\n'
+
+
+def test_job_queue_singleton_is_created_once(monkeypatch, call_concurrently):
+    import analyze
+    created = []
+
+    def queue_from_env(**kwargs):
+        time.sleep(0.05)  # widen the race window
+        created.append(jobs.JobQueue(max_workers=0))
+        return created[-1]
+
+    monkeypatch.setattr(analyze, "_job_queue", None)
+    monkeypatch.setattr(jobs, "queue_from_env", queue_from_env)
+    results = call_concurrently(analyze.get_job_queue)
+    assert len(created) == 1 and all(q is created[0] for q in results)
+
+
+def test_executor_singleton_is_created_once(monkeypatch, call_concurrently):
+    created = []
+
+    def executor_from_env(**kwargs):
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(final, "_executor", None)
+    monkeypatch.setattr(final.executor_mod, "executor_from_env", executor_from_env)
+    results = call_concurrently(final.get_executor)
+    assert len(created) == 1 and all(e is created[0] for e in results)
@@ -0,0 +1,65 @@
+import time
+import pytest
+import knowledge
+
+RELATIONS = {"socrates": ["human"], "paris": ["city"], "iron": ["metal"]}
+
+
+@pytest.fixture
+def stub():
+    with knowledge.StubConceptNetServer(RELATIONS) as server:
+        yield server
+
+
+def _http(stub, threshold=100, cooldown=30.0):
+    return knowledge.HTTPConceptNet(stub.url, timeout=1.0,
+                                    breaker=knowledge.CircuitBreaker(threshold, cooldown))
+
+
+def test_lookup_and_failures(stub):
+    backend = _http(stub)
+    assert backend.isa_many(["Socrates", "paris", "bread"]) == {"Socrates": ["human"], "paris": ["city"], "bread": []}
+    before = knowledge.lookup_failures()
+    stub.failing = True
+    assert backend.isa_many(["iron"]) == {"iron": []}
+    assert knowledge.lookup_failures() == before + 1
+
+
+def test_failed_terms_are_not_retried_within_the_negative_ttl(stub):
+    backend = knowledge.CachedKnowledge(_http(stub), negative_ttl=0.2)
+    stub.failing = True
+    backend.isa_many(["socrates", "paris"])
+    assert stub.requests == 2
+    backend.isa_many(["socrates", "paris"])
+    assert stub.requests == 2  # remembered as failed, still reported as failures
+    stub.failing = False
+    time.sleep(0.25)
+    assert backend.isa_many(["socrates", "paris"]) == {"socrates": ["human"], "paris": ["city"]}
+    assert stub.requests == 4
+    backend.isa_many(["socrates"])
+    assert stub.requests == 4  # positive results are cached
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers(stub):
+    backend = _http(stub, threshold=2, cooldown=0.2)
+    stub.failing = True
+    for term in ("socrates", "paris", "iron", "bread"):
+        backend.lookup([term], 1)
+    assert stub.requests == 2 and backend.breaker.is_open
+    time.sleep(0.25)
+    backend.lookup(["socrates"], 1)  # the trial request fails: open again
+    assert stub.requests == 3 and backend.breaker.is_open
+    backend.lookup(["paris"], 1)
+    assert stub.requests == 3
+    stub.failing = False
+    time.sleep(0.25)
+    assert backend.lookup(["paris"], 1) == {"paris": ["city"]}
+    assert not backend.breaker.is_open
+    assert backend.lookup(["iron", "socrates"], 1) == {"iron": ["metal"], "socrates": ["human"]}
+
+
+def test_stub_counts_concurrent_requests(stub):
+    backend = _http(stub)
+    terms = [f"term{i}" for i in range(64)]
+    backend.lookup(terms, 1)
+    assert stub.requests == len(terms)
@@ -0,0 +1,80 @@
+import numpy as np
+import core
+import nli
+
+PAIRS = [
+    ("the tower is in paris", "the tower is in london"),
+    ("all humans are mortal", "socrates is mortal"),
+    ("the sky is blue", "the sky is blue"),
+    ("a", "the committee approved the proposal after a long debate and a vote"),
+    ("the tower is in paris", "socrates is mortal"),
+]
+
+
+def _reference(model, pairs):
+    """One tokenizer call and forward pass per pair, no batching or padding."""
+    import torch
+    engine = nli.get_engine(model)
+    rows = []
+    with torch.inference_mode():
+        for p, h in pairs:
+            enc = engine.tokenizer(p, h, return_tensors="pt")
+            rows.append(torch.softmax(engine.model(**enc).logits.float(), dim=-1)[0].numpy())
+    return np.array(rows)
+
+
+def test_batched_matches_per_pair(nli_model):
+    engine = nli.get_engine(nli_model)
+    expected = _reference(nli_model, PAIRS)
+    for batch_size in (1, 2, 16):
+        np.testing.assert_allclose(engine.predict_proba(PAIRS, batch_size), expected, atol=1e-5)
+
+
+def test_predict_probs_columns_follow_nli_labels(nli_model):
+    engine = nli.get_engine(nli_model)
+    probs = nli.predict_probs(nli_model, PAIRS)
+    raw = engine.predict_proba(PAIRS)
+    assert probs.shape == (len(PAIRS), len(core.NLI_LABELS))
+    for j, label in enumerate(core.NLI_LABELS):
+        np.testing.assert_allclose(probs[:, j], raw[:, engine.labels.index(label)], atol=1e-6)
+
+
+def test_encode_pairs_matches_tokenizer(nli_model):
+    engine = nli.get_engine(nli_model)
+    enc = engine.encode_pairs(PAIRS)
+    expected = engine.tokenizer([p for p, _ in PAIRS], [h for _, h in PAIRS])
+    assert enc["input_ids"] == expected["input_ids"]
+    assert enc["token_type_ids"] == expected["token_type_ids"]
+
+
+def test_token_cache_and_pins(nli_model):
+    engine = nli.get_engine(nli_model)
+    text = "wind farms are often built offshore"
+    first = engine.token_ids([text])[0]
+    assert engine._token_ids.get(text) == first
+    engine.pin([text])
+    engine.pin([text, text])  # e.g. two sessions sharing a sentence
+    engine.unpin([text])
+    assert text in engine._pinned
+    engine.unpin([text])
+    assert text not in engine._pinned
+    assert engine.token_ids([text, text]) == [first, first]
+
+
+def test_empty_input(nli_model):
+    assert nli.predict_probs(nli_model, []).shape == (0, len(core.NLI_LABELS))
+
+
+def test_callable_engine_keeps_fixed_label_columns():
+    def fn(text):
+        # Label order and spelling vary between calls, as with different pipelines
+        if "paris" in text:
+            return [[{"label": "entailment", "score": 0.7}, {"label": "NEUTRAL", "score": 0.2},
+                     {"label": "Contradiction", "score": 0.1}]]
+        return [[{"label": "CONTRADICTION", "score": 0.6}, {"label": "ENTAILMENT", "score": 0.4}]]
+
+    engine = nli.get_engine(fn)
+    assert isinstance(engine, nli.CallableNLIEngine) and engine.labels == list(core.NLI_LABELS)
+    probs = engine.predict_probs([("the tower is in paris", "x"), ("a", "b")])
+    np.testing.assert_allclose(probs, [[0.1, 0.2, 0.7], [0.6, 0.0, 0.4]], atol=1e-6)
+    assert engine.labels == list(core.NLI_LABELS)
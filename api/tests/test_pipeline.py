@@ -0,0 +1,53 @@
+import pytest
+import core
+import ethos
+import final
+import logos
+import pathos
+
+SOURCE = "The tower is in Paris. It was built in 1889. It is made of iron."
+CANDIDATES = [
+    "The tower is in Paris. It was built in 1889. Visitors love it.",
+    "The tower is in Rome! It was not built in 1889? I hate iron towers. The tower is in Paris.",
+    "One sentence only.",
+]
+
+
+def _per_sentence_reference(source, candidate):
+    """The original orchestration: every scorer called separately on each candidate sentence."""
+    results = []
+    for sentence in core.split_sentences(candidate):
+        ethos_score, factual, formal = ethos.analyze_ethos_formality(source, sentence)
+        results.append({
+            "sentence": sentence,
+            "ethos": {"score": ethos_score, "factual_consistency": factual, "formality": formal},
+            "logos": logos.compute_logical_coherence(sentence),
+            "pathos": pathos.compute_pathos_score(sentence),
+        })
+    return results
+
+
+@pytest.mark.parametrize("candidate", CANDIDATES)
+def test_single_pass_matches_per_sentence_scoring(stand_ins, candidate):
+    result = final.analyze_text_sentencewise(SOURCE, candidate)
+    reference = _per_sentence_reference(SOURCE, candidate)
+    assert [r["sentence"] for r in result["sentencewise"]] == [r["sentence"] for r in reference]
+    for got, want in zip(result["sentencewise"], reference):
+        # Batched forward passes pad differently, and the single pass rounds to 4 places
+        for key in ("score", "factual_consistency", "formality"):
+            assert got["ethos"][key] == pytest.approx(want["ethos"][key], abs=2e-4)
+        assert got["logos"] == pytest.approx(want["logos"], abs=2e-4)
+        assert got["pathos"] == pytest.approx(want["pathos"], abs=2e-4)
+    assert result["overall"] == final.overall_from_sentences(result["sentencewise"])
+
+
+def test_empty_candidate(stand_ins):
+    result = final.analyze_text_sentencewise(SOURCE, "")
+    assert result["sentencewise"] == []
+    assert result["overall"]["logos"] == 0.0
+
+
+def test_report_timings_come_from_this_analysis(stand_ins):
+    result = final.analyze_text_sentencewise(SOURCE, CANDIDATES[1], report_timings=True)
+    assert "total" in result["timings"] and len(result["timings"]) == len(final.DIMENSION_KINDS) + 1
+    assert result["timings"]["total"] > 0
@@ -0,0 +1,61 @@
+import numpy as np
+import retrieval
+
+SOURCE = ["The tower is in Paris.", "It was built in 1889.", "The tower is made of iron.", "Paris is in France."]
+QUERIES = ["Where is the tower?", "Iron towers in Paris.", "Nothing matches here.", ""]
+
+
+def _dense_cosine(vectorizer, queries, sentences):
+    """The reference: dense TF-IDF rows, normalised, multiplied out."""
+    def dense(texts):
+        mat = np.zeros((len(texts), len(vectorizer.vocab)))
+        for row, vec in enumerate(vectorizer.transform(texts)):
+            for idx, weight in vec.items():
+                mat[row, idx] = weight
+        return mat
+    return dense(queries) @ dense(sentences).T
+
+
+def test_sparse_vectors_are_normalised_and_drop_unknown_terms():
+    vectorizer = retrieval.TfidfVectorizer(SOURCE)
+    vectors = vectorizer.transform(SOURCE + ["zebra unicorn"])
+    for vec in vectors[:-1]:
+        assert np.isclose(sum(w * w for w in vec.values()), 1.0)
+    assert vectors[-1] == {}
+
+
+def test_inverted_index_matches_dense_cosine():
+    index = retrieval.SourceIndex(SOURCE).build()
+    sims = index.similarities(QUERIES)
+    assert sims.shape == (len(QUERIES), len(SOURCE))
+    np.testing.assert_allclose(sims, _dense_cosine(index._vectorizer, QUERIES, SOURCE), atol=1e-6)
+    assert not sims[2:].any()
+
+
+def test_top_k():
+    index = retrieval.SourceIndex(SOURCE)
+    assert index.top_k(["An iron tower."], 2)[0] == [2, 0]
+    assert index.top_k(["Iron towers."], None) == [[0, 1, 2, 3]]
+
+
+def test_neighbors_match_the_dense_top_k():
+    vectorizer = retrieval.TfidfVectorizer(SOURCE)
+    vectors = vectorizer.transform(SOURCE)
+    index = retrieval.InvertedIndex(vectors)
+    dense = index.scores(vectors)
+    for q, vec in enumerate(vectors):
+        found = index.neighbors(vec, 2, threshold=0.01)
+        expected = [j for j in np.argsort(-dense[q], kind="stable") if dense[q, j] >= 0.01][:2]
+        assert [row for row, _ in found] == expected
+        np.testing.assert_allclose([score for _, score in found], dense[q, expected], atol=1e-6)
+    assert index.neighbors({}, 3) == []
+
+
+def test_similarity_pairs_are_bounded_by_neighbors():
+    import logos
+    sentences = [f"The tower number {i} is in Paris near the river." for i in range(40)]
+    dense_threshold = logos.generate_sentence_pairs(sentences, mode="similarity", threshold=0.2, neighbors=39)
+    assert len(dense_threshold) == 40 * 39 // 2  # all similar: every pair, as the dense matrix gave
+    pairs = logos.generate_sentence_pairs(sentences, mode="similarity", threshold=0.2, neighbors=3)
+    assert 0 < len(pairs) <= 40 * 3 == logos.count_sentence_pairs(40, "similarity", neighbors=3)
+    assert set(pairs) <= set(dense_threshold)
@@ -0,0 +1,119 @@
+import threading
+import time
+import numpy as np
+import scheduler
+
+
+class _Recorder:
+    """fn for a MicroBatcher: records every combined call and maps x → 10x."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.calls = []
+        self.delay = delay
+        self.fail_on = fail_on
+
+    def __call__(self, inputs):
+        self.calls.append(list(inputs))
+        time.sleep(self.delay)
+        if self.fail_on is not None and self.fail_on in inputs:
+            raise ValueError("bad input")
+        return [x * 10 for x in inputs]
+
+
+def _submit_together(submit, requests):
+    """Call submit(request) for every request from its own thread at once; returns their outputs in order."""
+    barrier = threading.Barrier(len(requests))
+    outputs = [None] * len(requests)
+
+    def call(i):
+        barrier.wait()
+        try:
+            outputs[i] = submit(requests[i])
+        except Exception as e:
+            outputs[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outputs
+
+
+def test_each_caller_gets_its_own_slice():
+    fn = _Recorder()
+    batcher = scheduler.MicroBatcher("test", fn, max_batch_size=1000, max_wait_ms=200)
+    requests = [list(range(start, start + size)) for start, size in ((0, 3), (100, 1), (200, 5), (300, 2))]
+    outputs = _submit_together(batcher, requests)
+    assert outputs == [[x * 10 for x in request] for request in requests]
+    assert len(fn.calls) < len(requests)  # callers shared forward passes
+    assert sorted(x for call in fn.calls for x in call) == sorted(x for r in requests for x in r)
+
+
+def test_collection_stops_at_max_batch_size():
+    fn = _Recorder(delay=0.05)
+    batcher = scheduler.MicroBatcher("test", fn, max_batch_size=4, max_wait_ms=200)
+    requests = [[i, i + 100] for i in range(6)]
+    outputs = _submit_together(batcher, requests)
+    assert outputs == [[x * 10 for x in request] for request in requests]
+    assert all(len(call) <= 4 for call in fn.calls) and len(fn.calls) >= 3
+    assert batcher.metrics()["requests"] == 6
+
+
+def test_failure_reaches_only_the_caller_whose_inputs_fail():
+    fn = _Recorder(fail_on=-1)
+    batcher = scheduler.MicroBatcher("test", fn, max_batch_size=1000, max_wait_ms=200)
+    requests = [[1, 2], [-1], [3]]
+    outputs = _submit_together(batcher, requests)
+    assert isinstance(outputs[1], ValueError)
+    assert outputs[0] == [10, 20] and outputs[2] == [30]
+    assert batcher([4, 5]) == [40, 50]  # the batcher survives the failure
+
+
+def test_close_stops_the_thread_after_queued_requests():
+    batcher = scheduler.MicroBatcher("test", _Recorder())
+    future = batcher.submit([1])
+    batcher.close()
+    assert future.result(timeout=1) == [10]
+    batcher._thread.join(timeout=1)
+    assert not batcher._thread.is_alive()
+
+
+def test_batcher_is_dropped_with_its_model(monkeypatch):
+    class Model:
+        def __call__(self, inputs):
+            return [x * 10 for x in inputs]
+
+    monkeypatch.setitem(scheduler._config, "enabled", True)
+    monkeypatch.setattr(scheduler, "_batchers", {})
+    model = Model()
+    assert scheduler.run("test", model, lambda m, inputs: m(inputs), [1, 2]) == [10, 20]
+    batcher = next(iter(scheduler._batchers.values()))
+    del model  # what the registry's eviction leaves behind once callers are done
+    assert scheduler._batchers == {}
+    batcher._thread.join(timeout=1)
+    assert not batcher._thread.is_alive()
+
+
+def test_empty_submit_resolves_without_a_call():
+    fn = _Recorder()
+    batcher = scheduler.MicroBatcher("test", fn)
+    assert batcher([]) == []
+    assert fn.calls == []
+
+
+def test_batched_nli_matches_direct_scoring(nli_model, monkeypatch):
+    import nli
+    monkeypatch.setitem(scheduler._config, "enabled", True)
+    monkeypatch.setitem(scheduler._config, "max_wait_ms", 50.0)
+    monkeypatch.setattr(scheduler, "_batchers", {})
+    requests = [
+        [("The tower is in Paris.", "The tower is in France.")],
+        [("It was built in 1889.", "It is old."), ("Visitors love it.", "It is popular.")],
+        [("It is made of iron.", "It is made of wood.")] * 3,
+    ]
+    direct = [nli.get_engine(nli_model).predict_probs(pairs) for pairs in requests]
+    batched = _submit_together(lambda pairs: nli.predict_probs(nli_model, pairs), requests)
+    for got, want in zip(batched, direct):
+        np.testing.assert_allclose(got, want, atol=1e-6)
+    assert scheduler.metrics()  # the calls went through a shared batcher
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+from conftest import API_DIR
+
+
+def test_importing_the_app_does_not_start_the_warm_up():
+    code = ("import analyze, startup; assert startup.STARTUP._thread is None; "
+            "analyze.create_app(); assert startup.STARTUP._thread is not None")
+    env = {**os.environ, "ETHOS_WARM_UP": "1"}
+    result = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
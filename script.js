@@ -248,6 +248,65 @@ function renderAllFromData(d){
 /* Initial load -> show zeros */
 renderEmpty();
 
+const API_BASE = "http://127.0.0.1:5000";
+
+/* Revision of the last analysis kept by the server; edits are then re-analyzed incrementally */
+let lastRevision = null;
+
+async function analyzeIncremental(text){
+  const res = await fetch(API_BASE + "/api/analyze/incremental", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ source_text: text, candidate_text: text, revision: lastRevision })
+  });
+  if (!res.ok) throw new Error("Backend error " + res.status);
+  const data = await res.json();
+  lastRevision = data.revision;
+  return data.analysis;
+}
+
+/* Submit an analysis job and render sentences as the server streams them (SSE) */
+async function analyzeStreaming(text, btn){
+  const res = await fetch(API_BASE + "/api/jobs", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ source_text: text, candidate_text: text })
+  });
+  if (res.status === 429) {
+    const busy = new Error("Server busy, please retry shortly");
+    busy.noFallback = true;
+    throw busy;
+  }
+  if (!res.ok) throw new Error("Backend error " + res.status);
+  const job = await res.json();
+
+  const sentences = [];
+  renderSentences([]);
+  await new Promise((resolve, reject) => {
+    const es = new EventSource(API_BASE + job.stream_url);
+    es.addEventListener("sentence", ev => {
+      sentences.push(JSON.parse(ev.data));
+      btn.textContent = `Analyzing... (${sentences.length})`;
+      renderSentences(sentences);
+    });
+    es.addEventListener("done", ev => {
+      es.close();
+      const done = JSON.parse(ev.data);
+      // The job registered its result server-side: later edits are re-analyzed incrementally
+      lastRevision = done.revision;
+      renderAllFromData({ overall: done.overall, sentencewise: sentences });
+      resolve();
+    });
+    es.addEventListener("error", ev => {
+      es.close();
+      // Server-reported analysis failure (has data) vs. a dropped connection
+      const err = new Error(ev.data ? JSON.parse(ev.data) : "stream interrupted");
+      err.noFallback = Boolean(ev.data);
+      reject(err);
+    });
+  });
+}
+
 /* Analyze button behaviour — now connected to Flask backend */
 document.getElementById('analyzeBtn').addEventListener('click', async ()=>{
   const btn = document.getElementById('analyzeBtn');
@@ -263,25 +322,49 @@ document.getElementById('analyzeBtn').addEventListener('click', async ()=>{
     return;
   }
 
-  try {
-    const res = await fetch("http://127.0.0.1:5000/api/analyze", {
-  method: "POST",
-  headers: { "Content-Type": "application/json" },
-  body: JSON.stringify({
-    source_text: userText,
-    candidate_text: userText
-  })
-});
-
-    if (!res.ok) throw new Error("Backend error " + res.status);
-
-    const data = await res.json();
-    // Flask returns { analysis: {overall:..., sentencewise:...}}
-    renderAllFromData(data.analysis);
+  if (lastRevision) {
+    try {
+      renderAllFromData(await analyzeIncremental(userText));
+      btn.textContent = prev;
+      btn.disabled = false;
+      return;
+    } catch (err) {
+      console.warn("Incremental analysis failed, running a full analysis:", err);
+      lastRevision = null;
+    }
+  }
 
-  } catch (err) {
-    console.error(err);
-    alert("Error connecting to backend: " + err.message);
+  try {
+    await analyzeStreaming(userText, btn);
+  } catch (streamErr) {
+    if (streamErr.noFallback) {
+      alert("Analysis failed: " + streamErr.message);
+      btn.textContent = prev;
+      btn.disabled = false;
+      return;
+    }
+    // Job API unavailable (older backend) -> fall back to the blocking endpoint
+    console.warn("Streaming analysis failed, falling back:", streamErr);
+    try {
+      const res = await fetch(API_BASE + "/api/analyze", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          source_text: userText,
+          candidate_text: userText
+        })
+      });
+
+      if (!res.ok) throw new Error("Backend error " + res.status);
+
+      const data = await res.json();
+      // Flask returns { analysis: {overall:..., sentencewise:...}}
+      renderAllFromData(data.analysis);
+
+    } catch (err) {
+      console.error(err);
+      alert("Error connecting to backend: " + err.message);
+    }
   }
 
   btn.textContent = prev;